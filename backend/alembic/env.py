@@ -19,12 +19,19 @@ if config.config_file_name is not None:
 from app.db.base import Base
 
 # Import all model modules so their tables are registered on Base.metadata
+import app.models.auth_session  # noqa: F401
 import app.models.customer  # noqa: F401
+import app.models.customer_stats  # noqa: F401
 import app.models.invoice  # noqa: F401
+import app.models.invoice_idempotency_key  # noqa: F401
+import app.models.invoice_locator  # noqa: F401
 import app.models.invoice_item  # noqa: F401
 import app.models.payment  # noqa: F401
 import app.models.service  # noqa: F401
+import app.models.service_daily_stats  # noqa: F401
 import app.models.shop  # noqa: F401
+import app.models.shop_daily_sales  # noqa: F401
+import app.models.shop_hourly_sales  # noqa: F401
 import app.models.user  # noqa: F401
 
 
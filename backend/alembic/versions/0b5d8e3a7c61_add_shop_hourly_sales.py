@@ -0,0 +1,55 @@
+"""add shop hourly sales rollup
+
+Revision ID: 0b5d8e3a7c61
+Revises: f3a9c6e20b47
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0b5d8e3a7c61"
+down_revision: Union[str, Sequence[str], None] = "f3a9c6e20b47"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "shop_hourly_sales",
+        sa.Column("shop_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("hour", sa.SmallInteger(), nullable=False),
+        sa.Column("net_paise", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("bill_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["shop_id"], ["shops.id"], name="fk_shop_hourly_sales_shop_id_shops"),
+        sa.PrimaryKeyConstraint("shop_id", "day", "hour", name="pk_shop_hourly_sales"),
+    )
+
+    # Backfill from existing invoices (hours in Asia/Kolkata, the default
+    # report timezone). `python -m app.rollups rebuild` does the same.
+    op.execute(
+        """
+        INSERT INTO shop_hourly_sales (shop_id, day, hour, net_paise, bill_count, updated_at)
+        SELECT
+            shop_id,
+            (issued_at AT TIME ZONE 'Asia/Kolkata')::date,
+            extract(hour FROM issued_at AT TIME ZONE 'Asia/Kolkata')::smallint,
+            sum(total_paise),
+            count(id),
+            now()
+        FROM invoices
+        GROUP BY 1, 2, 3
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("shop_hourly_sales")
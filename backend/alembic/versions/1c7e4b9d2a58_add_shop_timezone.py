@@ -0,0 +1,32 @@
+"""add shop timezone
+
+Revision ID: 1c7e4b9d2a58
+Revises: 0b5d8e3a7c61
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "1c7e4b9d2a58"
+down_revision: Union[str, Sequence[str], None] = "0b5d8e3a7c61"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rollups were bucketed in Asia/Kolkata, so that is the zone
+    # every existing shop starts with.
+    op.add_column(
+        "shops",
+        sa.Column("timezone", sa.String(length=64), nullable=False, server_default="Asia/Kolkata"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("shops", "timezone")
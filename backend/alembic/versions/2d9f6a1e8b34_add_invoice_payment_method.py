@@ -0,0 +1,60 @@
+"""add invoice payment method
+
+Revision ID: 2d9f6a1e8b34
+Revises: 1c7e4b9d2a58
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "2d9f6a1e8b34"
+down_revision: Union[str, Sequence[str], None] = "1c7e4b9d2a58"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "invoices",
+        sa.Column("payment_method", sa.String(length=20), nullable=False, server_default="cash"),
+    )
+    # Copy the method of each invoice's first payment.
+    op.execute(
+        """
+        UPDATE invoices i
+        SET payment_method = p.method
+        FROM (
+            SELECT DISTINCT ON (invoice_id) invoice_id, method
+            FROM payments
+            ORDER BY invoice_id, created_at
+        ) p
+        WHERE p.invoice_id = i.id AND p.method <> 'cash'
+        """
+    )
+
+    # Built concurrently so live shops can keep billing during the migration.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_invoices_shop_upi_issued_at_id",
+            "invoices",
+            ["shop_id", sa.text("issued_at DESC"), sa.text("id DESC")],
+            unique=False,
+            postgresql_where=sa.text("payment_method = 'upi'"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_invoices_shop_upi_issued_at_id",
+            table_name="invoices",
+            postgresql_concurrently=True,
+        )
+    op.drop_column("invoices", "payment_method")
@@ -0,0 +1,69 @@
+"""add shop daily sales rollup
+
+Revision ID: 3d8e1f0a6b27
+Revises: 9c1b6f7d2a1e
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3d8e1f0a6b27"
+down_revision: Union[str, Sequence[str], None] = "9c1b6f7d2a1e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "shop_daily_sales",
+        sa.Column("shop_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("gross_paise", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("discount_paise", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("net_paise", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("bill_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("cash_net_paise", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("upi_net_paise", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["shop_id"], ["shops.id"], name="fk_shop_daily_sales_shop_id_shops"),
+        sa.PrimaryKeyConstraint("shop_id", "day", name="pk_shop_daily_sales"),
+    )
+
+    # Backfill from existing invoices (days in Asia/Kolkata, the default
+    # report timezone). `python -m app.rollups rebuild` does the same.
+    op.execute(
+        """
+        INSERT INTO shop_daily_sales (
+            shop_id, day, gross_paise, discount_paise, net_paise, bill_count,
+            cash_net_paise, upi_net_paise, updated_at
+        )
+        SELECT
+            i.shop_id,
+            (i.issued_at AT TIME ZONE 'Asia/Kolkata')::date,
+            sum(i.subtotal_paise),
+            sum(i.discount_paise),
+            sum(i.total_paise),
+            count(i.id),
+            coalesce(sum(i.total_paise) FILTER (WHERE p.method = 'cash'), 0),
+            coalesce(sum(i.total_paise) FILTER (WHERE p.method = 'upi'), 0),
+            now()
+        FROM invoices i
+        LEFT JOIN (
+            SELECT invoice_id, (array_agg(method ORDER BY created_at))[1] AS method
+            FROM payments
+            GROUP BY invoice_id
+        ) p ON p.invoice_id = i.id
+        GROUP BY i.shop_id, (i.issued_at AT TIME ZONE 'Asia/Kolkata')::date
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("shop_daily_sales")
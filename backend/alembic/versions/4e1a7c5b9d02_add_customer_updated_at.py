@@ -0,0 +1,31 @@
+"""add customer updated_at
+
+Revision ID: 4e1a7c5b9d02
+Revises: 2d9f6a1e8b34
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4e1a7c5b9d02"
+down_revision: Union[str, Sequence[str], None] = "2d9f6a1e8b34"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # now() is stable, so existing rows get the default without a rewrite.
+    op.add_column(
+        "customers",
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("customers", "updated_at")
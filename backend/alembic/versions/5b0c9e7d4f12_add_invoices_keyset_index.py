@@ -0,0 +1,40 @@
+"""add invoices keyset index
+
+Revision ID: 5b0c9e7d4f12
+Revises: 3d8e1f0a6b27
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5b0c9e7d4f12"
+down_revision: Union[str, Sequence[str], None] = "3d8e1f0a6b27"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Built concurrently so live shops can keep billing during the migration.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_invoices_shop_issued_at_id",
+            "invoices",
+            ["shop_id", sa.text("issued_at DESC"), sa.text("id DESC")],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_invoices_shop_issued_at_id",
+            table_name="invoices",
+            postgresql_concurrently=True,
+        )
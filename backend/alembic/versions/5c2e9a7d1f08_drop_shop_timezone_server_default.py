@@ -0,0 +1,30 @@
+"""drop shop timezone server default
+
+Revision ID: 5c2e9a7d1f08
+Revises: 8a3c5e7f1b24
+Create Date: 2026-10-18
+
+The default zone for new shops is settings.report_timezone, applied by the
+Shop model. The server default was only needed to backfill existing shops
+when the column was added.
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5c2e9a7d1f08"
+down_revision: Union[str, Sequence[str], None] = "8a3c5e7f1b24"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column("shops", "timezone", server_default=None)
+
+
+def downgrade() -> None:
+    op.alter_column("shops", "timezone", server_default="Asia/Kolkata")
@@ -0,0 +1,78 @@
+"""add sessions, drop users.refresh_token_*
+
+Revision ID: 6f2b8d4a1c93
+Revises: 4e1a7c5b9d02
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "6f2b8d4a1c93"
+down_revision: Union[str, Sequence[str], None] = "4e1a7c5b9d02"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sessions",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True, nullable=False),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("token_hash", sa.String(length=64), nullable=False),
+        sa.Column("family_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("parent_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("user_agent", sa.String(length=255), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("rotated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], name="fk_sessions_user_id_users"),
+    )
+    op.create_index("ix_sessions_token_hash", "sessions", ["token_hash"], unique=True)
+    op.create_index("ix_sessions_user_id", "sessions", ["user_id"], unique=False)
+    op.create_index("ix_sessions_family_id", "sessions", ["family_id"], unique=False)
+    op.create_index("ix_sessions_expires_at", "sessions", ["expires_at"], unique=False)
+
+    # Carry over each user's live refresh token so nobody is signed out.
+    op.execute(
+        """
+        INSERT INTO sessions (id, user_id, token_hash, family_id, created_at, expires_at)
+        SELECT gen_random_uuid(), id, refresh_token_hash, gen_random_uuid(), now(), refresh_token_expires_at
+        FROM users
+        WHERE refresh_token_hash IS NOT NULL AND refresh_token_expires_at > now()
+        """
+    )
+
+    op.drop_column("users", "refresh_token_expires_at")
+    op.drop_column("users", "refresh_token_hash")
+
+
+def downgrade() -> None:
+    op.add_column("users", sa.Column("refresh_token_hash", sa.String(), nullable=True))
+    op.add_column("users", sa.Column("refresh_token_expires_at", sa.DateTime(timezone=True), nullable=True))
+
+    # Users had one refresh token; keep the newest live session of each.
+    op.execute(
+        """
+        UPDATE users SET refresh_token_hash = s.token_hash, refresh_token_expires_at = s.expires_at
+        FROM (
+            SELECT DISTINCT ON (user_id) user_id, token_hash, expires_at
+            FROM sessions
+            WHERE rotated_at IS NULL AND expires_at > now()
+            ORDER BY user_id, created_at DESC
+        ) AS s
+        WHERE users.id = s.user_id
+        """
+    )
+
+    op.drop_index("ix_sessions_expires_at", table_name="sessions")
+    op.drop_index("ix_sessions_family_id", table_name="sessions")
+    op.drop_index("ix_sessions_user_id", table_name="sessions")
+    op.drop_index("ix_sessions_token_hash", table_name="sessions")
+    op.drop_table("sessions")
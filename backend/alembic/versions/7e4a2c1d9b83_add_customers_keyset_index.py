@@ -0,0 +1,39 @@
+"""add customers keyset index
+
+Revision ID: 7e4a2c1d9b83
+Revises: 5b0c9e7d4f12
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7e4a2c1d9b83"
+down_revision: Union[str, Sequence[str], None] = "5b0c9e7d4f12"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_customers_shop_created_at_id",
+            "customers",
+            ["shop_id", sa.text("created_at DESC"), sa.text("id DESC")],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_customers_shop_created_at_id",
+            table_name="customers",
+            postgresql_concurrently=True,
+        )
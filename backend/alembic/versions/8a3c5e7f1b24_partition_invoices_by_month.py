@@ -0,0 +1,279 @@
+"""partition invoices, invoice_items and payments by month
+
+Revision ID: 8a3c5e7f1b24
+Revises: 6f2b8d4a1c93
+Create Date: 2026-10-18
+
+Postgres cannot partition an existing table in place, so each table is
+recreated as a partitioned table and its rows copied over. This rewrites all
+invoice data under an exclusive lock: run it in a quiet window.
+
+invoices.idempotency_key moves to invoice_idempotency_keys, and a narrow
+invoice_locators table maps each invoice id to its issued_at, since neither
+can be enforced or looked up efficiently across partitions.
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8a3c5e7f1b24"
+down_revision: Union[str, Sequence[str], None] = "6f2b8d4a1c93"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ("invoices", "invoice_items", "payments")
+MONTHS_AHEAD = 3
+
+INVOICE_COLUMNS = (
+    "id, shop_id, customer_id, issued_at, status, subtotal_paise, discount_paise, total_paise, "
+    "payment_method, created_at"
+)
+ITEM_COLUMNS = "id, invoice_id, service_id, description, qty, unit_price_paise, total_paise, created_at"
+PAYMENT_COLUMNS = "id, invoice_id, method, amount_paise, reference, created_at"
+
+
+def _invoice_columns(with_idempotency_key: bool) -> list[sa.Column]:
+    columns = [
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("shop_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("customer_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("issued_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False, server_default="paid"),
+        sa.Column("subtotal_paise", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("discount_paise", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("total_paise", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("payment_method", sa.String(length=20), nullable=False, server_default="cash"),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    ]
+    if with_idempotency_key:
+        columns.insert(-1, sa.Column("idempotency_key", sa.String(length=100), nullable=True))
+    return columns
+
+
+def _item_columns(with_issued_at: bool) -> list[sa.Column]:
+    columns = [
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("invoice_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("service_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("description", sa.String(length=200), nullable=False),
+        sa.Column("qty", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column("unit_price_paise", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("total_paise", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    ]
+    if with_issued_at:
+        columns.insert(2, sa.Column("issued_at", sa.DateTime(timezone=True), nullable=False))
+    return columns
+
+
+def _payment_columns(with_issued_at: bool) -> list[sa.Column]:
+    columns = [
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("invoice_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("method", sa.String(length=20), nullable=False),
+        sa.Column("amount_paise", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("reference", sa.String(length=120), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    ]
+    if with_issued_at:
+        columns.insert(2, sa.Column("issued_at", sa.DateTime(timezone=True), nullable=False))
+    return columns
+
+
+def _create_invoice_indexes() -> None:
+    op.create_index("ix_invoices_shop_id", "invoices", ["shop_id"], unique=False)
+    op.create_index("ix_invoices_customer_id", "invoices", ["customer_id"], unique=False)
+    op.create_index(
+        "ix_invoices_shop_issued_at_id",
+        "invoices",
+        ["shop_id", sa.text("issued_at DESC"), sa.text("id DESC")],
+        unique=False,
+    )
+    op.create_index(
+        "ix_invoices_shop_upi_issued_at_id",
+        "invoices",
+        ["shop_id", sa.text("issued_at DESC"), sa.text("id DESC")],
+        unique=False,
+        postgresql_where=sa.text("payment_method = 'upi'"),
+    )
+    op.create_index("ix_invoice_items_invoice_id", "invoice_items", ["invoice_id"], unique=False)
+    op.create_index("ix_payments_invoice_id", "payments", ["invoice_id"], unique=False)
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.rename_table(table, f"{table}_unpartitioned")
+
+    # Constraints and indexes are added after the old tables are dropped,
+    # so they keep their names (and the copy skips index maintenance).
+    op.create_table("invoices", *_invoice_columns(False), postgresql_partition_by="RANGE (issued_at)")
+    op.create_table("invoice_items", *_item_columns(True), postgresql_partition_by="RANGE (issued_at)")
+    op.create_table("payments", *_payment_columns(True), postgresql_partition_by="RANGE (issued_at)")
+
+    # One partition per UTC month from the oldest invoice to MONTHS_AHEAD
+    # months from now (app.partitions keeps this going), and a default
+    # partition for anything outside that range.
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            first_month date := date_trunc(
+                'month', coalesce((SELECT min(issued_at) FROM invoices_unpartitioned), now()) AT TIME ZONE 'UTC'
+            );
+            last_month date := date_trunc('month', now() AT TIME ZONE 'UTC') + interval '{MONTHS_AHEAD} months';
+            m date;
+            t text;
+        BEGIN
+            FOREACH t IN ARRAY ARRAY['invoices', 'invoice_items', 'payments'] LOOP
+                EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', t || '_default', t);
+                m := first_month;
+                WHILE m <= last_month LOOP
+                    EXECUTE format(
+                        'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                        t || '_p' || to_char(m, 'YYYY_MM'),
+                        t,
+                        to_char(m, 'YYYY-MM-DD') || ' 00:00:00+00',
+                        to_char(m + interval '1 month', 'YYYY-MM-DD') || ' 00:00:00+00'
+                    );
+                    m := m + interval '1 month';
+                END LOOP;
+            END LOOP;
+        END
+        $$
+        """
+    )
+
+    op.execute(f"INSERT INTO invoices ({INVOICE_COLUMNS}) SELECT {INVOICE_COLUMNS} FROM invoices_unpartitioned")
+    op.execute(
+        f"""
+        INSERT INTO invoice_items (issued_at, {ITEM_COLUMNS})
+        SELECT i.issued_at, {", ".join("it." + c.strip() for c in ITEM_COLUMNS.split(","))}
+        FROM invoice_items_unpartitioned it
+        JOIN invoices_unpartitioned i ON i.id = it.invoice_id
+        """
+    )
+    op.execute(
+        f"""
+        INSERT INTO payments (issued_at, {PAYMENT_COLUMNS})
+        SELECT i.issued_at, {", ".join("p." + c.strip() for c in PAYMENT_COLUMNS.split(","))}
+        FROM payments_unpartitioned p
+        JOIN invoices_unpartitioned i ON i.id = p.invoice_id
+        """
+    )
+
+    # A unique index on a partitioned table must include the partition key,
+    # and a replayed bill may carry a different issued_at, so idempotency
+    # keys move to their own (unpartitioned) table.
+    op.create_table(
+        "invoice_idempotency_keys",
+        sa.Column("shop_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("idempotency_key", sa.String(length=100), nullable=False),
+        sa.Column("invoice_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("issued_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["shop_id"], ["shops.id"], name="fk_invoice_idempotency_keys_shop_id_shops"),
+        sa.PrimaryKeyConstraint("shop_id", "idempotency_key", name="pk_invoice_idempotency_keys"),
+    )
+    op.execute(
+        """
+        INSERT INTO invoice_idempotency_keys (shop_id, idempotency_key, invoice_id, issued_at, created_at)
+        SELECT shop_id, idempotency_key, id, issued_at, created_at
+        FROM invoices_unpartitioned
+        WHERE idempotency_key IS NOT NULL
+        """
+    )
+
+    op.create_table(
+        "invoice_locators",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("issued_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id", name="pk_invoice_locators"),
+    )
+    op.execute("INSERT INTO invoice_locators (id, issued_at) SELECT id, issued_at FROM invoices_unpartitioned")
+
+    op.drop_table("payments_unpartitioned")
+    op.drop_table("invoice_items_unpartitioned")
+    op.drop_table("invoices_unpartitioned")
+
+    op.create_primary_key("invoices_pkey", "invoices", ["id", "issued_at"])
+    op.create_primary_key("invoice_items_pkey", "invoice_items", ["id", "issued_at"])
+    op.create_primary_key("payments_pkey", "payments", ["id", "issued_at"])
+    op.create_foreign_key("fk_invoices_shop_id_shops", "invoices", "shops", ["shop_id"], ["id"])
+    op.create_foreign_key("fk_invoices_customer_id_customers", "invoices", "customers", ["customer_id"], ["id"])
+    op.create_foreign_key(
+        "fk_invoice_items_invoice_id_invoices",
+        "invoice_items",
+        "invoices",
+        ["invoice_id", "issued_at"],
+        ["id", "issued_at"],
+    )
+    op.create_foreign_key(
+        "fk_invoice_items_service_id_services", "invoice_items", "services", ["service_id"], ["id"]
+    )
+    op.create_foreign_key(
+        "fk_payments_invoice_id_invoices",
+        "payments",
+        "invoices",
+        ["invoice_id", "issued_at"],
+        ["id", "issued_at"],
+    )
+    _create_invoice_indexes()
+
+    for table in (*TABLES, "invoice_idempotency_keys", "invoice_locators"):
+        op.execute(f"ANALYZE {table}")
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.rename_table(table, f"{table}_partitioned")
+
+    op.create_table("invoices", *_invoice_columns(True))
+    op.create_table("invoice_items", *_item_columns(False))
+    op.create_table("payments", *_payment_columns(False))
+
+    op.execute(f"INSERT INTO invoices ({INVOICE_COLUMNS}) SELECT {INVOICE_COLUMNS} FROM invoices_partitioned")
+    op.execute(f"INSERT INTO invoice_items ({ITEM_COLUMNS}) SELECT {ITEM_COLUMNS} FROM invoice_items_partitioned")
+    op.execute(f"INSERT INTO payments ({PAYMENT_COLUMNS}) SELECT {PAYMENT_COLUMNS} FROM payments_partitioned")
+    op.execute(
+        """
+        UPDATE invoices i SET idempotency_key = k.idempotency_key
+        FROM invoice_idempotency_keys k
+        WHERE k.shop_id = i.shop_id AND k.invoice_id = i.id
+        """
+    )
+
+    op.drop_table("invoice_locators")
+    op.drop_table("invoice_idempotency_keys")
+    # Dropping a partitioned table drops its partitions (months already
+    # detached by app.partitions are separate tables and are left alone).
+    op.drop_table("payments_partitioned")
+    op.drop_table("invoice_items_partitioned")
+    op.drop_table("invoices_partitioned")
+
+    op.create_primary_key("invoices_pkey", "invoices", ["id"])
+    op.create_primary_key("invoice_items_pkey", "invoice_items", ["id"])
+    op.create_primary_key("payments_pkey", "payments", ["id"])
+    op.create_foreign_key("fk_invoices_shop_id_shops", "invoices", "shops", ["shop_id"], ["id"])
+    op.create_foreign_key("fk_invoices_customer_id_customers", "invoices", "customers", ["customer_id"], ["id"])
+    op.create_foreign_key(
+        "fk_invoice_items_invoice_id_invoices", "invoice_items", "invoices", ["invoice_id"], ["id"]
+    )
+    op.create_foreign_key(
+        "fk_invoice_items_service_id_services", "invoice_items", "services", ["service_id"], ["id"]
+    )
+    op.create_foreign_key("fk_payments_invoice_id_invoices", "payments", "invoices", ["invoice_id"], ["id"])
+    _create_invoice_indexes()
+    op.create_index(
+        "uq_invoices_shop_idempotency_key",
+        "invoices",
+        ["shop_id", "idempotency_key"],
+        unique=True,
+        postgresql_where=sa.text("idempotency_key IS NOT NULL"),
+    )
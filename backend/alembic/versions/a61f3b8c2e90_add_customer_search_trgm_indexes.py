@@ -0,0 +1,37 @@
+"""add customer search trigram indexes
+
+Revision ID: a61f3b8c2e90
+Revises: 7e4a2c1d9b83
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a61f3b8c2e90"
+down_revision: Union[str, Sequence[str], None] = "7e4a2c1d9b83"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_customers_name_trgm "
+            "ON customers USING gin (name gin_trgm_ops)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_customers_phone_digits_trgm "
+            "ON customers USING gin (regexp_replace(phone, '\\D', '', 'g') gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_customers_phone_digits_trgm")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_customers_name_trgm")
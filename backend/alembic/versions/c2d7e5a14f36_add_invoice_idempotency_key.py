@@ -0,0 +1,35 @@
+"""add invoice idempotency key
+
+Revision ID: c2d7e5a14f36
+Revises: a61f3b8c2e90
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c2d7e5a14f36"
+down_revision: Union[str, Sequence[str], None] = "a61f3b8c2e90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("invoices", sa.Column("idempotency_key", sa.String(length=100), nullable=True))
+    op.create_index(
+        "uq_invoices_shop_idempotency_key",
+        "invoices",
+        ["shop_id", "idempotency_key"],
+        unique=True,
+        postgresql_where=sa.text("idempotency_key IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_invoices_shop_idempotency_key", table_name="invoices")
+    op.drop_column("invoices", "idempotency_key")
@@ -0,0 +1,27 @@
+"""add shop rollups_stale_since
+
+Revision ID: d6a4c8e2f1b7
+Revises: 5c2e9a7d1f08
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d6a4c8e2f1b7"
+down_revision: Union[str, Sequence[str], None] = "5c2e9a7d1f08"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("shops", sa.Column("rollups_stale_since", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("shops", "rollups_stale_since")
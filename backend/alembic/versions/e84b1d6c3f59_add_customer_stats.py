@@ -0,0 +1,72 @@
+"""add customer stats rollup
+
+Revision ID: e84b1d6c3f59
+Revises: c2d7e5a14f36
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e84b1d6c3f59"
+down_revision: Union[str, Sequence[str], None] = "c2d7e5a14f36"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "customer_stats",
+        sa.Column("customer_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("shop_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("bill_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("gross_paise", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("discount_paise", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("net_paise", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("first_invoice_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_invoice_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["customer_id"], ["customers.id"], name="fk_customer_stats_customer_id_customers"),
+        sa.ForeignKeyConstraint(["shop_id"], ["shops.id"], name="fk_customer_stats_shop_id_shops"),
+        sa.PrimaryKeyConstraint("customer_id", name="pk_customer_stats"),
+    )
+    op.create_index(
+        "ix_customer_stats_shop_last_invoice_at",
+        "customer_stats",
+        ["shop_id", "last_invoice_at"],
+        unique=False,
+    )
+
+    # Backfill from existing invoices. `python -m app.rollups rebuild` does the same.
+    op.execute(
+        """
+        INSERT INTO customer_stats (
+            customer_id, shop_id, bill_count, gross_paise, discount_paise, net_paise,
+            first_invoice_at, last_invoice_at, updated_at
+        )
+        SELECT
+            customer_id,
+            shop_id,
+            count(id),
+            sum(subtotal_paise),
+            sum(discount_paise),
+            sum(total_paise),
+            min(issued_at),
+            max(issued_at),
+            now()
+        FROM invoices
+        WHERE customer_id IS NOT NULL
+        GROUP BY customer_id, shop_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_customer_stats_shop_last_invoice_at", table_name="customer_stats")
+    op.drop_table("customer_stats")
@@ -0,0 +1,62 @@
+"""add service daily stats rollup
+
+Revision ID: f3a9c6e20b47
+Revises: e84b1d6c3f59
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f3a9c6e20b47"
+down_revision: Union[str, Sequence[str], None] = "e84b1d6c3f59"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "service_daily_stats",
+        sa.Column("shop_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("service_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("qty", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("revenue_paise", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("invoice_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["shop_id"], ["shops.id"], name="fk_service_daily_stats_shop_id_shops"),
+        sa.ForeignKeyConstraint(["service_id"], ["services.id"], name="fk_service_daily_stats_service_id_services"),
+        sa.PrimaryKeyConstraint("shop_id", "day", "service_id", name="pk_service_daily_stats"),
+    )
+
+    # Backfill from existing line items (days in Asia/Kolkata, the default
+    # report timezone). `python -m app.rollups rebuild` does the same.
+    op.execute(
+        """
+        INSERT INTO service_daily_stats (
+            shop_id, day, service_id, qty, revenue_paise, invoice_count, updated_at
+        )
+        SELECT
+            i.shop_id,
+            (i.issued_at AT TIME ZONE 'Asia/Kolkata')::date,
+            it.service_id,
+            sum(it.qty),
+            sum(it.total_paise),
+            count(DISTINCT it.invoice_id),
+            now()
+        FROM invoice_items it
+        JOIN invoices i ON i.id = it.invoice_id
+        WHERE it.service_id IS NOT NULL
+        GROUP BY i.shop_id, (i.issued_at AT TIME ZONE 'Asia/Kolkata')::date, it.service_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("service_daily_stats")
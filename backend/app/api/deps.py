@@ -1,39 +1,75 @@
 import uuid
+from dataclasses import dataclass
 from datetime import datetime, timezone
 
 from fastapi import Cookie, Depends, HTTPException
-from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import TTLCache
 from app.core.config import settings
-from app.db.session import get_db
+from app.core.security import decode_access_token
+from app.db.session import get_async_db
+from app.models.shop import Shop
 from app.models.user import User
 
 
-def get_current_user(
-    db: Session = Depends(get_db),
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user and the shop (tenant) every query is scoped to.
+
+    Only ids, which never change: cached copies outlive edits to the shop, so
+    settings such as its timezone are read from `shops` where they are used.
+    """
+
+    id: uuid.UUID
+    shop_id: uuid.UUID
+
+
+_principal_cache = TTLCache(
+    maxsize=settings.principal_cache_size,
+    ttl=settings.principal_cache_ttl_seconds,
+)
+
+
+def invalidate_principal(user_id: uuid.UUID) -> None:
+    _principal_cache.pop(user_id)
+
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_async_db),
     access_token: str | None = Cookie(default=None),
-):
+) -> Principal:
     if not access_token:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
     try:
-        payload = jwt.decode(
-            access_token,
-            settings.jwt_secret,
-            algorithms=["HS256"],
-            audience="barber-app",
-            issuer="barber-app",
-        )
+        payload = decode_access_token(access_token)
         user_id = payload.get("sub")
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token")
         if datetime.now(timezone.utc).timestamp() > payload["exp"]:
             raise HTTPException(status_code=401, detail="Token expired")
-    except JWTError:
+        user_id = uuid.UUID(user_id)
+    except ValueError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = db.get(User, uuid.UUID(user_id))
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-    return user
+    principal = _principal_cache.get(user_id)
+    if principal is None:
+        row = (
+            await db.execute(
+                select(User.id, Shop.id)
+                .join(Shop, Shop.user_id == User.id)
+                .where(User.id == user_id)
+            )
+        ).one_or_none()
+        if not row:
+            raise HTTPException(status_code=401, detail="User not found")
+        principal = Principal(id=row[0], shop_id=row[1])
+        _principal_cache.set(user_id, principal)
+
+    # Tokens issued before the claim existed carry no shop_id.
+    claimed_shop_id = payload.get("shop_id")
+    if claimed_shop_id is not None and claimed_shop_id != str(principal.shop_id):
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return principal
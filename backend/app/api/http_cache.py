@@ -0,0 +1,30 @@
+import hashlib
+
+from fastapi import Request, Response
+
+
+# Responses are per shop and behind a cookie, so only the browser may keep
+# them, and it must revalidate (cheaply, via If-None-Match) before reuse.
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag over the values that fully determine a representation."""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def not_modified(request: Request, etag: str) -> Response | None:
+    """A 304 response if the client already holds `etag`, else None."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    candidates = {tag.strip() for tag in header.split(",")}
+    if "*" in candidates or etag in candidates or f"W/{etag}" in candidates:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    return None
+
+
+def set_validators(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
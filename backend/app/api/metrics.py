@@ -0,0 +1,210 @@
+"""Per-route request metrics, served as Prometheus text at /metrics.
+
+`MetricsMiddleware` records latency and response-size histograms, response
+counts by status and an in-flight gauge. Routes are labelled by their path
+template (`/api/invoices/{invoice_id}`), never the raw path, so the number
+of series is bounded by the number of routes.
+
+There are no locks: the middleware and the /metrics handler both run on the
+event loop thread (sync routes are off in the threadpool, but their
+requests are recorded by the middleware on the loop), so updates never
+race. On Lambda, each request is also written to stdout as a CloudWatch
+Embedded Metric Format (EMF) line by `flush_emf`, which the handler calls
+after every invocation.
+"""
+
+import json
+import os
+import time
+from bisect import bisect_left
+
+from app.core.config import settings
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+UNMATCHED = "unmatched"
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        # counts[i] is the number of values in (buckets[i-1], buckets[i]];
+        # the last slot is +Inf. Made cumulative when rendered.
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class RouteSeries:
+    __slots__ = ("latency", "size", "statuses")
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+        self.statuses: dict[int, int] = {}
+
+
+class RequestMetrics:
+    def __init__(self, emf: bool = False):
+        self.in_flight = 0
+        self.routes: dict[tuple[str, str], RouteSeries] = {}
+        self.emf = emf
+        self._pending: list[tuple[str, str, int, float, int]] = []
+
+    def record(self, method: str, route: str, status: int, seconds: float, size: int) -> None:
+        series = self.routes.get((method, route))
+        if series is None:
+            series = self.routes[(method, route)] = RouteSeries()
+        series.latency.observe(seconds)
+        series.size.observe(size)
+        series.statuses[status] = series.statuses.get(status, 0) + 1
+        if self.emf:
+            self._pending.append((method, route, status, seconds, size))
+
+    def flush_emf(self) -> None:
+        """Write the requests recorded since the last flush as EMF lines.
+
+        Mangum serves one request per invocation, so this is one line.
+        """
+        pending, self._pending = self._pending, []
+        for method, route, status, seconds, size in pending:
+            print(
+                json.dumps(
+                    {
+                        "_aws": {
+                            "Timestamp": int(time.time() * 1000),
+                            "CloudWatchMetrics": [
+                                {
+                                    "Namespace": settings.metrics_namespace,
+                                    # Per route, and across all routes.
+                                    "Dimensions": [["Route"], []],
+                                    "Metrics": [
+                                        {"Name": "Latency", "Unit": "Milliseconds"},
+                                        {"Name": "ResponseSize", "Unit": "Bytes"},
+                                        {"Name": "ServerErrors", "Unit": "Count"},
+                                    ],
+                                }
+                            ],
+                        },
+                        "Route": f"{method} {route}",
+                        "Status": status,
+                        "Latency": round(seconds * 1000, 3),
+                        "ResponseSize": size,
+                        "ServerErrors": int(status >= 500),
+                    }
+                ),
+                flush=True,
+            )
+
+
+request_metrics = RequestMetrics(emf=bool(os.getenv("AWS_LAMBDA_FUNCTION_NAME")))
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    if route is None:
+        return UNMATCHED
+    # Mounted routers (app.api.router) see paths relative to their mount
+    # point, which Starlette records in root_path.
+    return scope.get("root_path", "") + route.path
+
+
+class MetricsMiddleware:
+    def __init__(self, app, metrics: RequestMetrics = request_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        started = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_and_measure(message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            elif message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            metrics.in_flight -= 1
+            metrics.record(scope["method"], _route_label(scope), status, time.perf_counter() - started, size)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+
+
+def _histogram_lines(name: str, routes: dict[tuple[str, str], RouteSeries], attr: str) -> list[str]:
+    lines = []
+    for (method, route), series in sorted(routes.items()):
+        h = getattr(series, attr)
+        labels = _labels(method=method, route=route)
+        cumulative = 0
+        for bound, count in zip((*h.buckets, "+Inf"), h.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {h.sum}")
+        lines.append(f"{name}_count{{{labels}}} {cumulative}")
+    return lines
+
+
+# (metric, type, help, key in app.db.pool.pool_status)
+POOL_METRICS = (
+    ("db_pool_checkouts_total", "counter", "Connections checked out of the pool.", "checkouts"),
+    ("db_pool_timeouts_total", "counter", "Checkouts that timed out waiting for a connection.", "timeouts"),
+    ("db_pool_wait_seconds_total", "counter", "Time spent waiting for a connection.", "wait_seconds_total"),
+    ("db_pool_wait_seconds_max", "gauge", "Longest wait for a connection.", "wait_seconds_max"),
+    ("db_pool_in_use", "gauge", "Connections currently checked out.", "in_use"),
+    ("db_pool_in_use_max", "gauge", "Most connections checked out at once.", "in_use_max"),
+    ("db_pool_size", "gauge", "Configured pool size.", "size"),
+    ("db_pool_overflow", "gauge", "Connections open beyond the pool size.", "overflow"),
+)
+
+
+def render(metrics: RequestMetrics, pools: dict[str, dict]) -> str:
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines = [
+        "# HELP http_requests_in_flight Requests currently being served.",
+        "# TYPE http_requests_in_flight gauge",
+        f"http_requests_in_flight {metrics.in_flight}",
+        "# HELP http_responses_total Responses by route and status code.",
+        "# TYPE http_responses_total counter",
+    ]
+    for (method, route), series in sorted(metrics.routes.items()):
+        for status, count in sorted(series.statuses.items()):
+            lines.append(f"http_responses_total{{{_labels(method=method, route=route, status=status)}}} {count}")
+    lines += [
+        "# HELP http_request_duration_seconds Time from request start to the end of the response.",
+        "# TYPE http_request_duration_seconds histogram",
+        *_histogram_lines("http_request_duration_seconds", metrics.routes, "latency"),
+        "# HELP http_response_size_bytes Response body size.",
+        "# TYPE http_response_size_bytes histogram",
+        *_histogram_lines("http_response_size_bytes", metrics.routes, "size"),
+    ]
+    for name, kind, help_text, key in POOL_METRICS:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for engine, status in pools.items():
+            if key in status:
+                lines.append(f"{name}{{{_labels(engine=engine)}}} {status[key]}")
+    return "\n".join(lines) + "\n"
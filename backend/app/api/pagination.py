@@ -0,0 +1,25 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+
+from fastapi import HTTPException
+
+
+def encode_cursor(sort_value: datetime, row_id: uuid.UUID) -> str:
+    """Opaque keyset cursor for a (timestamp, id) ordered listing."""
+    raw = json.dumps([sort_value.isoformat(), str(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        # Anything else decodes as JSON too, but uuid.UUID(123) raises
+        # AttributeError rather than one of the errors below.
+        if not isinstance(sort_value, str) or not isinstance(row_id, str):
+            raise ValueError("cursor elements must be strings")
+        return datetime.fromisoformat(sort_value), uuid.UUID(row_id)
+    except (ValueError, TypeError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -1,12 +1,73 @@
-from fastapi import APIRouter
+"""API route modules, mounted under /api and imported on first use.
 
-from app.api.routes import auth, users, services, customers, invoices, reports
+Importing every route module (and with them passlib, python-jose, the
+models and the schemas) up front is most of a Lambda cold start. Each
+prefix is instead mounted as a `LazyRouter`, which imports its module the
+first time a request lands under that prefix. /openapi.json and /docs need
+every route, so generating the schema loads them all.
 
+Routes still resolve their dependencies through the app, so
+`app.dependency_overrides` applies to them as to any included router.
+"""
 
-api_router = APIRouter()
-api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
-api_router.include_router(users.router, prefix="/users", tags=["users"])
-api_router.include_router(services.router, prefix="/services", tags=["services"])
-api_router.include_router(customers.router, prefix="/customers", tags=["customers"])
-api_router.include_router(invoices.router, prefix="/invoices", tags=["invoices"])
-api_router.include_router(reports.router, prefix="/reports", tags=["reports"])
+import importlib
+
+from fastapi import APIRouter, FastAPI
+from fastapi.openapi.utils import get_openapi
+
+
+# Prefix -> module exposing `router`; the prefix doubles as the OpenAPI tag.
+ROUTE_MODULES = {
+    "auth": "app.api.routes.auth",
+    "users": "app.api.routes.users",
+    "services": "app.api.routes.services",
+    "customers": "app.api.routes.customers",
+    "invoices": "app.api.routes.invoices",
+    "reports": "app.api.routes.reports",
+    "exports": "app.api.routes.exports",
+}
+
+
+class LazyRouter:
+    """ASGI app that imports a route module on its first request."""
+
+    def __init__(self, module: str, app: FastAPI | None = None):
+        self.module = module
+        self.app = app
+        self._router: APIRouter | None = None
+
+    @property
+    def router(self) -> APIRouter:
+        if self._router is None:
+            # Re-included rather than used as is: a module's bare APIRouter
+            # builds its routes without the app, so they would never see
+            # the app's dependency_overrides.
+            router = APIRouter(dependency_overrides_provider=self.app)
+            router.include_router(importlib.import_module(self.module).router)
+            self._router = router
+        return self._router
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.router(scope, receive, send)
+
+
+def mount_api(app: FastAPI, prefix: str = "/api") -> None:
+    lazy = {name: LazyRouter(module, app) for name, module in ROUTE_MODULES.items()}
+    for name, router in lazy.items():
+        app.mount(f"{prefix}/{name}", router, name=name)
+
+    def openapi() -> dict:
+        if not app.openapi_schema:
+            api_router = APIRouter()
+            for name, router in lazy.items():
+                api_router.include_router(router.router, prefix=f"{prefix}/{name}", tags=[name])
+            app.openapi_schema = get_openapi(
+                title=app.title,
+                version=app.version,
+                openapi_version=app.openapi_version,
+                description=app.description,
+                routes=[*app.routes, *api_router.routes],
+            )
+        return app.openapi_schema
+
+    app.openapi = openapi
@@ -1,18 +1,25 @@
+import uuid
 from datetime import datetime, timedelta, timezone
 
-from fastapi import APIRouter, Cookie, Depends, HTTPException, Response
+from fastapi import APIRouter, Cookie, Depends, HTTPException, Request, Response
+from sqlalchemy import delete, select
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.deps import invalidate_principal
 from app.core.config import settings
 from app.core.security import (
+    HashingBusy,
     create_access_token,
     create_refresh_token,
     hash_password,
+    hash_pool,
     hash_refresh_token,
-    verify_password,
+    successor_refresh_token,
+    verify_and_update,
 )
-from app.db.session import get_db
+from app.db.session import get_async_db
+from app.models.auth_session import AuthSession
 from app.models.service import Service
 from app.models.shop import Shop
 from app.models.user import User
@@ -30,6 +37,9 @@ DEFAULT_SERVICES = [
     ("Haircut + Beard", 20000),
 ]
 
+REFRESH_COOKIE_PATH = "/api/auth"
+LEGACY_REFRESH_COOKIE_PATH = "/api/auth/refresh"
+
 
 def _set_auth_cookies(response: Response, access_token: str, refresh_token: str):
     secure_cookie = settings.environment != "dev"
@@ -49,103 +59,184 @@ def _set_auth_cookies(response: Response, access_token: str, refresh_token: str)
         httponly=True,
         secure=secure_cookie,
         samesite="lax",
-        path="/api/auth/refresh",
+        # Sent to /refresh and /logout (which revokes the session).
+        path=REFRESH_COOKIE_PATH,
         max_age=settings.refresh_token_expires_days * 24 * 60 * 60,
     )
+    # Clear the cookie from before it was widened to REFRESH_COOKIE_PATH.
+    response.delete_cookie("refresh_token", path=LEGACY_REFRESH_COOKIE_PATH)
+
+
+def _start_session(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    request: Request,
+    *,
+    family_id: uuid.UUID | None = None,
+    parent_id: uuid.UUID | None = None,
+    refresh_token: str | None = None,
+) -> str:
+    """Add a session row and return its (unhashed) refresh token."""
+    refresh_token = refresh_token or create_refresh_token()
+    db.add(
+        AuthSession(
+            user_id=user_id,
+            token_hash=hash_refresh_token(refresh_token),
+            family_id=family_id or uuid.uuid4(),
+            parent_id=parent_id,
+            user_agent=(request.headers.get("user-agent") or "")[:255] or None,
+            expires_at=datetime.now(timezone.utc) + timedelta(days=settings.refresh_token_expires_days),
+        )
+    )
+    return refresh_token
+
+
+async def _hashing(fn, *args):
+    try:
+        return await hash_pool.run(fn, *args)
+    except HashingBusy:
+        raise HTTPException(status_code=503, detail="Too many sign-ins, try again", headers={"Retry-After": "1"})
 
 
 @router.post("/register", response_model=TokenResponse)
-def register(payload: RegisterRequest, response: Response, db: Session = Depends(get_db)):
-    user = User(email=payload.email, password_hash=hash_password(payload.password))
+async def register(
+    payload: RegisterRequest,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Hash before touching the database, so no connection waits on argon2.
+    user = User(email=payload.email, password_hash=await _hashing(hash_password, payload.password))
     shop = Shop(user=user, name=payload.shop_name, pan=payload.pan.strip().upper())
     db.add(user)
     db.add(shop)
 
     try:
-        db.flush()
+        await db.flush()
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Email or PAN already exists")
 
     for name, price_paise in DEFAULT_SERVICES:
         db.add(Service(shop_id=shop.id, name=name, price_paise=price_paise))
 
-    refresh_token = create_refresh_token()
-    user.refresh_token_hash = hash_refresh_token(refresh_token)
-    user.refresh_token_expires_at = datetime.now(timezone.utc) + timedelta(
-        days=settings.refresh_token_expires_days
-    )
-
-    access_token, access_expires_at = create_access_token(subject=str(user.id))
+    refresh_token = _start_session(db, user.id, request)
+    access_token, access_expires_at = create_access_token(subject=str(user.id), shop_id=str(shop.id))
     _set_auth_cookies(response, access_token, refresh_token)
 
-    db.commit()
+    await db.commit()
     return TokenResponse(access_token_expires_at=access_expires_at.isoformat())
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(payload: LoginRequest, response: Response, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == payload.email).one_or_none()
-    if not user or not verify_password(payload.password, user.password_hash):
+async def login(
+    payload: LoginRequest,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+):
+    row = (
+        await db.execute(select(User, Shop.id).join(Shop, Shop.user_id == User.id).where(User.email == payload.email))
+    ).one_or_none()
+    # End the read transaction so the pooled connection is not held while
+    # argon2 runs (expire_on_commit=False keeps `user` loaded).
+    await db.commit()
+    if not row:
         raise HTTPException(status_code=400, detail="Invalid credentials")
+    user, shop_id = row
+    valid, new_hash = await _hashing(verify_and_update, payload.password, user.password_hash)
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid credentials")
+    if new_hash is not None:
+        # Stored with older argon2 parameters; upgrade it while we have the password.
+        user.password_hash = new_hash
 
-    refresh_token = create_refresh_token()
-    user.refresh_token_hash = hash_refresh_token(refresh_token)
-    user.refresh_token_expires_at = datetime.now(timezone.utc) + timedelta(
-        days=settings.refresh_token_expires_days
-    )
-
-    access_token, access_expires_at = create_access_token(subject=str(user.id))
+    # Each login is its own session, so other devices stay signed in.
+    refresh_token = _start_session(db, user.id, request)
+    access_token, access_expires_at = create_access_token(subject=str(user.id), shop_id=str(shop_id))
     _set_auth_cookies(response, access_token, refresh_token)
 
-    db.commit()
+    await db.commit()
     return TokenResponse(access_token_expires_at=access_expires_at.isoformat())
 
 
 @router.post("/refresh", response_model=TokenResponse)
-def refresh(
+async def refresh(
+    request: Request,
     response: Response,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     refresh_token: str | None = Cookie(default=None),
 ):
     if not refresh_token:
         raise HTTPException(status_code=401, detail="Missing refresh token")
 
-    token_hash = hash_refresh_token(refresh_token)
-    user = db.query(User).filter(User.refresh_token_hash == token_hash).one_or_none()
-    if not user or not user.refresh_token_expires_at:
+    # Unique index on token_hash; the row lock serialises concurrent
+    # refreshes of the same token.
+    row = (
+        await db.execute(
+            select(AuthSession, Shop.id)
+            .join(Shop, Shop.user_id == AuthSession.user_id)
+            .where(AuthSession.token_hash == hash_refresh_token(refresh_token))
+            .with_for_update(of=AuthSession)
+        )
+    ).one_or_none()
+    if not row:
         raise HTTPException(status_code=401, detail="Invalid refresh token")
-    if datetime.now(timezone.utc) >= user.refresh_token_expires_at:
+    session, shop_id = row
+    now = datetime.now(timezone.utc)
+    if now >= session.expires_at:
         raise HTTPException(status_code=401, detail="Refresh token expired")
 
-    # rotate refresh token
-    new_refresh_token = create_refresh_token()
-    user.refresh_token_hash = hash_refresh_token(new_refresh_token)
-    user.refresh_token_expires_at = datetime.now(timezone.utc) + timedelta(
-        days=settings.refresh_token_expires_days
-    )
-
-    access_token, access_expires_at = create_access_token(subject=str(user.id))
+    new_refresh_token = successor_refresh_token(refresh_token)
+    if session.rotated_at is not None:
+        # Already exchanged. Within the grace period this is a retry or a
+        # second tab racing the first, which get the successor issued the
+        # first time (not a second live session); later, the token was
+        # copied, so sign out every session descended from the same login.
+        if now - session.rotated_at > timedelta(seconds=settings.refresh_reuse_grace_seconds):
+            await db.execute(delete(AuthSession).where(AuthSession.family_id == session.family_id))
+            await db.commit()
+            raise HTTPException(status_code=401, detail="Refresh token reused")
+        successor = await db.scalar(
+            select(AuthSession.id).where(AuthSession.token_hash == hash_refresh_token(new_refresh_token))
+        )
+        if successor is None:
+            raise HTTPException(status_code=401, detail="Invalid refresh token")
+    else:
+        session.rotated_at = now
+        _start_session(
+            db,
+            session.user_id,
+            request,
+            family_id=session.family_id,
+            parent_id=session.id,
+            refresh_token=new_refresh_token,
+        )
+    access_token, access_expires_at = create_access_token(subject=str(session.user_id), shop_id=str(shop_id))
     _set_auth_cookies(response, access_token, new_refresh_token)
 
-    db.commit()
+    await db.commit()
+    invalidate_principal(session.user_id)
     return TokenResponse(access_token_expires_at=access_expires_at.isoformat())
 
 
 @router.post("/logout")
-def logout(
+async def logout(
     response: Response,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     refresh_token: str | None = Cookie(default=None),
 ):
     if refresh_token:
-        token_hash = hash_refresh_token(refresh_token)
-        user = db.query(User).filter(User.refresh_token_hash == token_hash).one_or_none()
-        if user:
-            user.refresh_token_hash = None
-            user.refresh_token_expires_at = None
-            db.commit()
+        # Only this device's session (and its rotated ancestors) goes.
+        session = await db.scalar(
+            select(AuthSession).where(AuthSession.token_hash == hash_refresh_token(refresh_token))
+        )
+        if session:
+            await db.execute(delete(AuthSession).where(AuthSession.family_id == session.family_id))
+            await db.commit()
+            invalidate_principal(session.user_id)
 
     response.delete_cookie("access_token", path="/")
-    response.delete_cookie("refresh_token", path="/api/auth/refresh")
+    response.delete_cookie("refresh_token", path=REFRESH_COOKIE_PATH)
+    response.delete_cookie("refresh_token", path=LEGACY_REFRESH_COOKIE_PATH)
     return {"ok": True}
@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func
+import re
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import case, func, literal_column, or_, select, tuple_
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user
-from app.db.session import get_db
+from app.api.http_cache import make_etag, not_modified, set_validators
+from app.api.pagination import decode_cursor, encode_cursor
+from app.core.report_cache import report_cache
+from app.db.session import get_async_db
 from app.models.customer import Customer
 from app.schemas.customer import CustomerCreate, CustomerListResponse, CustomerResponse, CustomerUpdate
 
@@ -12,28 +18,85 @@ from app.schemas.customer import CustomerCreate, CustomerListResponse, CustomerR
 router = APIRouter()
 
 
+def _like_escape(term: str) -> str:
+    # Backslash is Postgres' default LIKE escape character.
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _phone_digits():
+    # Must match the ix_customers_phone_digits_trgm expression verbatim
+    # (constants inlined) for the planner to use the index.
+    return func.regexp_replace(
+        Customer.phone, literal_column(r"'\D'"), literal_column("''"), literal_column("'g'")
+    )
+
+
 @router.get("/", response_model=CustomerListResponse)
-def list_customers(
+async def list_customers(
     q: str | None = Query(default=None, max_length=200),
     name: str | None = Query(default=None, max_length=200),
     page: int = Query(default=1, ge=1),
     limit: int = Query(default=20, ge=1, le=200),
-    db: Session = Depends(get_db),
+    paginate: bool = False,
+    cursor: str | None = None,
+    include_total: bool | None = None,
+    sort: Literal["recent", "relevance"] = "recent",
+    db: AsyncSession = Depends(get_async_db),
     user=Depends(get_current_user),
 ):
     raw_term = q if q is not None else name
     term = raw_term.strip() if raw_term else None
-    base_query = db.query(Customer).filter(Customer.shop_id == user.shop.id)
+    # Cursor mode pages by (created_at, id) over ix_customers_shop_created_at_id
+    # and skips the COUNT(*) unless asked for; offset mode keeps the old shape.
+    keyset = paginate or cursor is not None
+    if include_total is None:
+        include_total = not keyset
+    # Every parameter is checked before the first query runs.
+    if sort == "relevance" and not term:
+        raise HTTPException(status_code=400, detail="sort=relevance requires a search term")
+    if sort == "relevance" and keyset:
+        raise HTTPException(status_code=400, detail="sort=relevance does not support cursor pagination")
+    after = decode_cursor(cursor) if cursor is not None else None
+
+    base_query = select(Customer).where(Customer.shop_id == user.shop_id)
+    rank = None
     if term:
-        base_query = base_query.filter(Customer.name.ilike(f"%{term}%"))
-
-    total = base_query.with_entities(func.count()).scalar() or 0
-    customers = (
-        base_query.order_by(Customer.created_at.desc())
-        .offset((page - 1) * limit)
-        .limit(limit)
-        .all()
-    )
+        # Every branch is served by a pg_trgm GIN index: ILIKE and the
+        # similarity operator by ix_customers_name_trgm, digit substrings by
+        # ix_customers_phone_digits_trgm.
+        matches = [Customer.name.ilike(f"%{_like_escape(term)}%")]
+        if sort == "relevance":
+            # Fuzzy matches only make sense when results are ranked.
+            matches.append(Customer.name.op("%")(term))
+        rank = func.greatest(
+            func.similarity(Customer.name, term),
+            func.word_similarity(term, Customer.name),
+        )
+        digits = re.sub(r"\D", "", term)
+        if len(digits) >= 3:
+            phone_match = _phone_digits().like(f"%{digits}%")
+            matches.append(phone_match)
+            rank = func.greatest(rank, case((phone_match, 1.0), else_=0.0))
+        base_query = base_query.where(or_(*matches))
+
+    total = ((await db.scalar(base_query.with_only_columns(func.count()))) or 0) if include_total else None
+
+    ordered = base_query.order_by(Customer.created_at.desc(), Customer.id.desc())
+    if sort == "relevance":
+        ordered = base_query.order_by(rank.desc(), Customer.created_at.desc(), Customer.id.desc())
+    next_cursor = None
+    if keyset:
+        if after is not None:
+            ordered = ordered.where(tuple_(Customer.created_at, Customer.id) < tuple_(*after))
+        customers = (await db.scalars(ordered.limit(limit + 1))).all()
+        has_more = len(customers) > limit
+        customers = customers[:limit]
+        if has_more:
+            next_cursor = encode_cursor(customers[-1].created_at, customers[-1].id)
+    else:
+        customers = (await db.scalars(ordered.offset((page - 1) * limit).limit(limit + 1))).all()
+        has_more = len(customers) > limit
+        customers = customers[:limit]
 
     items = [
         CustomerResponse(
@@ -51,20 +114,20 @@ def list_customers(
         )
         for c in customers
     ]
-    has_more = page * limit < total
     return CustomerListResponse(
         items=items,
         page=page,
         limit=limit,
         total=total,
         has_more=has_more,
+        next_cursor=next_cursor,
     )
 
 
 @router.post("/", response_model=CustomerResponse)
-def create_customer(payload: CustomerCreate, db: Session = Depends(get_db), user=Depends(get_current_user)):
+async def create_customer(payload: CustomerCreate, db: AsyncSession = Depends(get_async_db), user=Depends(get_current_user)):
     customer = Customer(
-        shop_id=user.shop.id,
+        shop_id=user.shop_id,
         name=payload.name,
         phone=payload.phone,
         email=payload.email,
@@ -78,13 +141,14 @@ def create_customer(payload: CustomerCreate, db: Session = Depends(get_db), user
     )
     db.add(customer)
     try:
-        db.commit()
+        await db.commit()
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         if payload.phone:
             raise HTTPException(status_code=400, detail="Customer phone already exists")
         raise HTTPException(status_code=400, detail="Failed to create customer")
-    db.refresh(customer)
+    await report_cache.bump(user.shop_id)
+    await db.refresh(customer)
     return CustomerResponse(
         id=customer.id,
         name=customer.name,
@@ -101,10 +165,22 @@ def create_customer(payload: CustomerCreate, db: Session = Depends(get_db), user
 
 
 @router.get("/{customer_id}", response_model=CustomerResponse)
-def get_customer(customer_id: str, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    customer = db.get(Customer, customer_id)
-    if not customer or customer.shop_id != user.shop.id:
+async def get_customer(
+    customer_id: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+):
+    customer = await db.get(Customer, customer_id)
+    if not customer or customer.shop_id != user.shop_id:
         raise HTTPException(status_code=404, detail="Customer not found")
+
+    etag = make_etag("customer", customer.id, customer.updated_at)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    set_validators(response, etag)
     return CustomerResponse(
         id=customer.id,
         name=customer.name,
@@ -121,9 +197,9 @@ def get_customer(customer_id: str, db: Session = Depends(get_db), user=Depends(g
 
 
 @router.patch("/{customer_id}", response_model=CustomerResponse)
-def update_customer(customer_id: str, payload: CustomerUpdate, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    customer = db.get(Customer, customer_id)
-    if not customer or customer.shop_id != user.shop.id:
+async def update_customer(customer_id: str, payload: CustomerUpdate, db: AsyncSession = Depends(get_async_db), user=Depends(get_current_user)):
+    customer = await db.get(Customer, customer_id)
+    if not customer or customer.shop_id != user.shop_id:
         raise HTTPException(status_code=404, detail="Customer not found")
 
     fields = getattr(payload, "model_fields_set", set())
@@ -149,14 +225,15 @@ def update_customer(customer_id: str, payload: CustomerUpdate, db: Session = Dep
         customer.notes = payload.notes
 
     try:
-        db.commit()
+        await db.commit()
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         if payload.phone:
             raise HTTPException(status_code=400, detail="Customer phone already exists")
         raise HTTPException(status_code=400, detail="Failed to update customer")
+    await report_cache.bump(user.shop_id)
 
-    db.refresh(customer)
+    await db.refresh(customer)
     return CustomerResponse(
         id=customer.id,
         name=customer.name,
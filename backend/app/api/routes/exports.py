@@ -0,0 +1,216 @@
+import csv
+import io
+import os
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user
+from app.core.config import settings
+from app.db.session import get_db
+from app.models.customer import Customer
+from app.models.invoice import Invoice
+from app.models.invoice_item import InvoiceItem
+from app.models.payment import Payment
+from app.models.shop import Shop
+
+
+router = APIRouter()
+
+
+# Rows fetched per server-side cursor round trip; memory stays bounded by
+# this, not by the size of the export.
+EXPORT_BATCH_ROWS = 2000
+
+# Mangum (Lambda) collects the whole body before returning it, so nothing
+# streams there and the response must fit API Gateway's payload limit.
+BUFFERED_RESPONSE = bool(os.getenv("AWS_LAMBDA_FUNCTION_NAME"))
+# Typical CSV row size per export (loadtest.export_rss, plus room for
+# customer names), for estimating a buffered body's size from a row count.
+ROW_BYTES = {"invoices.csv": 130, "invoice-items.csv": 135, "payments.csv": 125}
+
+
+def _rupees(paise: int | None) -> str:
+    paise = int(paise or 0)
+    sign = "-" if paise < 0 else ""
+    paise = abs(paise)
+    return f"{sign}{paise // 100}.{paise % 100:02d}"
+
+
+def _check_buffered_size(db: Session, stmt, row_bytes: int) -> None:
+    # Counts at most one row past the cap, so refusing a huge export stays
+    # cheap.
+    max_rows = settings.export_max_buffered_bytes // row_bytes
+    rows = db.scalar(select(func.count()).select_from(stmt.order_by(None).limit(max_rows + 1).subquery()))
+    if rows > max_rows:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Export too large for one download (over {max_rows} rows); choose a shorter start/end range",
+        )
+
+
+def _stream_csv(db: Session, shop_id, filename: str, header: list[str], stmt, format_row) -> StreamingResponse:
+    if BUFFERED_RESPONSE:
+        _check_buffered_size(db, stmt, ROW_BYTES[filename])
+    # The shop's current zone, not the cached principal's copy.
+    zone = ZoneInfo(db.scalar(select(Shop.timezone).where(Shop.id == shop_id)))
+
+    def generate():
+        # get_db is request-scoped, so the session stays open until the
+        # stream finishes. yield_per makes psycopg use a server-side cursor.
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(header)
+        result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_ROWS))
+        for partition in result.partitions():
+            for row in partition:
+                writer.writerow(format_row(row, zone))
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate(0)
+        # Header only, for an empty export.
+        if buf.tell():
+            yield buf.getvalue()
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def _in_range(stmt, shop_id, start: datetime | None, end: datetime | None, child=None):
+    stmt = stmt.where(Invoice.shop_id == shop_id)
+    # Items and payments are partitioned on their own copy of issued_at;
+    # bounding it too prunes their partitions as well as the invoices'.
+    for issued_at in (Invoice.issued_at, child.issued_at) if child is not None else (Invoice.issued_at,):
+        if start is not None:
+            stmt = stmt.where(issued_at >= start)
+        if end is not None:
+            stmt = stmt.where(issued_at < end)
+    return stmt.order_by(Invoice.issued_at.asc(), Invoice.id.asc())
+
+
+@router.get("/invoices.csv")
+def export_invoices(
+    start: datetime | None = None,
+    end: datetime | None = None,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    stmt = _in_range(
+        select(
+            Invoice.id,
+            Invoice.issued_at,
+            Customer.name,
+            Customer.phone,
+            Invoice.subtotal_paise,
+            Invoice.discount_paise,
+            Invoice.total_paise,
+            Invoice.payment_method,
+            Invoice.status,
+        ).outerjoin(Customer, Customer.id == Invoice.customer_id),
+        user.shop_id,
+        start,
+        end,
+    )
+    return _stream_csv(
+        db,
+        user.shop_id,
+        "invoices.csv",
+        ["invoice_id", "issued_at", "customer_name", "customer_phone", "gross", "discount", "net", "payment_method", "status"],
+        stmt,
+        lambda r, tz: [
+            r[0],
+            r[1].astimezone(tz).isoformat(),
+            r[2] or "",
+            r[3] or "",
+            _rupees(r[4]),
+            _rupees(r[5]),
+            _rupees(r[6]),
+            (r[7] or "").upper(),
+            r[8],
+        ],
+    )
+
+
+@router.get("/invoice-items.csv")
+def export_invoice_items(
+    start: datetime | None = None,
+    end: datetime | None = None,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    stmt = _in_range(
+        select(
+            InvoiceItem.invoice_id,
+            Invoice.issued_at,
+            InvoiceItem.service_id,
+            InvoiceItem.description,
+            InvoiceItem.qty,
+            InvoiceItem.unit_price_paise,
+            InvoiceItem.total_paise,
+        ).join(Invoice, (Invoice.id == InvoiceItem.invoice_id) & (Invoice.issued_at == InvoiceItem.issued_at)),
+        user.shop_id,
+        start,
+        end,
+        InvoiceItem,
+    ).order_by(InvoiceItem.created_at.asc())
+    return _stream_csv(
+        db,
+        user.shop_id,
+        "invoice-items.csv",
+        ["invoice_id", "issued_at", "service_id", "description", "qty", "unit_price", "total"],
+        stmt,
+        lambda r, tz: [
+            r[0],
+            r[1].astimezone(tz).isoformat(),
+            r[2] or "",
+            r[3],
+            r[4],
+            _rupees(r[5]),
+            _rupees(r[6]),
+        ],
+    )
+
+
+@router.get("/payments.csv")
+def export_payments(
+    start: datetime | None = None,
+    end: datetime | None = None,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    stmt = _in_range(
+        select(
+            Payment.id,
+            Payment.invoice_id,
+            Invoice.issued_at,
+            Payment.method,
+            Payment.amount_paise,
+            Payment.reference,
+        ).join(Invoice, (Invoice.id == Payment.invoice_id) & (Invoice.issued_at == Payment.issued_at)),
+        user.shop_id,
+        start,
+        end,
+        Payment,
+    ).order_by(Payment.created_at.asc())
+    return _stream_csv(
+        db,
+        user.shop_id,
+        "payments.csv",
+        ["payment_id", "invoice_id", "issued_at", "method", "amount", "reference"],
+        stmt,
+        lambda r, tz: [
+            r[0],
+            r[1],
+            r[2].astimezone(tz).isoformat(),
+            (r[3] or "").upper(),
+            _rupees(r[4]),
+            r[5] or "",
+        ],
+    )
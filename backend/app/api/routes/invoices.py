@@ -1,63 +1,49 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import uuid
+from dataclasses import dataclass
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import insert, literal, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
 from app.api.deps import get_current_user
-from app.db.session import get_db
+from app.api.pagination import decode_cursor, encode_cursor
+from app.core.config import settings
+from app.core.report_cache import report_cache
+from app.db.session import get_async_db
 from app.models.customer import Customer
 from app.models.invoice import Invoice
+from app.models.invoice_idempotency_key import InvoiceIdempotencyKey
 from app.models.invoice_item import InvoiceItem
+from app.models.invoice_locator import InvoiceLocator
 from app.models.payment import Payment
 from app.models.service import Service
-from app.schemas.invoice import InvoiceCreate, InvoiceResponse, InvoiceSummaryResponse
+from app.models.shop import Shop
+from app.partitions import add_months, month_floor
+from app.rollups import InvoiceFacts, assume_utc, invoice_rollup_statements
+from app.schemas.invoice import (
+    InvoiceBulkCreate,
+    InvoiceBulkResponse,
+    InvoiceBulkResult,
+    InvoiceCreate,
+    InvoicePageResponse,
+    InvoiceResponse,
+    InvoiceSummaryResponse,
+)
 
 
 router = APIRouter()
 
 
-@router.get("/", response_model=list[InvoiceSummaryResponse])
-def list_invoices(
-    customer_id: uuid.UUID | None = None,
-    start: datetime | None = None,
-    end: datetime | None = None,
-    db: Session = Depends(get_db),
-    user=Depends(get_current_user),
-):
-    q = (
-        db.query(Invoice, Customer.name)
-        .outerjoin(Customer, Customer.id == Invoice.customer_id)
-        .filter(Invoice.shop_id == user.shop.id)
-    )
-    if customer_id is not None:
-        q = q.filter(Invoice.customer_id == customer_id)
+LIST_LIMIT = 200
 
-    if start is not None:
-        q = q.filter(Invoice.issued_at >= start)
-    if end is not None:
-        q = q.filter(Invoice.issued_at < end)
-
-    rows = q.order_by(Invoice.issued_at.desc()).limit(200).all()
-
-    invoices = [inv for inv, _ in rows]
-    invoice_ids = [inv.id for inv in invoices]
-    payments = (
-        db.query(Payment)
-        .filter(Payment.invoice_id.in_(invoice_ids))
-        .order_by(Payment.created_at.asc())
-        .all()
-        if invoice_ids
-        else []
-    )
-    method_by_invoice: dict[uuid.UUID, str] = {}
-    for p in payments:
-        if p.invoice_id not in method_by_invoice:
-            method_by_invoice[p.invoice_id] = p.method
 
+def _summaries(rows) -> list[InvoiceSummaryResponse]:
     summaries: list[InvoiceSummaryResponse] = []
     for inv, customer_name in rows:
-        method = (method_by_invoice.get(inv.id) or "cash").upper()
+        method = (inv.payment_method or "cash").upper()
         if method not in ("CASH", "UPI"):
             method = "CASH"
         summaries.append(
@@ -74,40 +60,84 @@ def list_invoices(
     return summaries
 
 
-@router.get("/{invoice_id}", response_model=InvoiceResponse)
-def get_invoice(invoice_id: uuid.UUID, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    invoice = (
-        db.query(Invoice)
-        .filter(Invoice.id == invoice_id, Invoice.shop_id == user.shop.id)
-        .first()
+@router.get("/", response_model=list[InvoiceSummaryResponse] | InvoicePageResponse)
+async def list_invoices(
+    customer_id: uuid.UUID | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    paginate: bool = False,
+    cursor: str | None = None,
+    limit: int = Query(default=50, ge=1, le=LIST_LIMIT),
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+):
+    q = (
+        select(Invoice, Customer.name)
+        .outerjoin(Customer, Customer.id == Invoice.customer_id)
+        .where(Invoice.shop_id == user.shop_id)
     )
-    if not invoice:
-        raise HTTPException(status_code=404, detail="Invoice not found")
+    if customer_id is not None:
+        q = q.where(Invoice.customer_id == customer_id)
 
-    customer_name: str | None = None
-    customer_phone: str | None = None
-    if invoice.customer_id is not None:
-        customer = (
-            db.query(Customer)
-            .filter(Customer.id == invoice.customer_id, Customer.shop_id == user.shop.id)
-            .first()
+    if start is not None:
+        q = q.where(Invoice.issued_at >= start)
+    if end is not None:
+        q = q.where(Invoice.issued_at < end)
+
+    # (issued_at, id) desc matches ix_invoices_shop_issued_at_id, so each page
+    # is an index range scan no matter how deep the cursor is.
+    q = q.order_by(Invoice.issued_at.desc(), Invoice.id.desc())
+
+    if not paginate and cursor is None:
+        # Legacy mode: a bare list, capped.
+        return _summaries((await db.execute(q.limit(LIST_LIMIT))).all())
+
+    if cursor is not None:
+        after_issued_at, after_id = decode_cursor(cursor)
+        q = q.where(tuple_(Invoice.issued_at, Invoice.id) < tuple_(after_issued_at, after_id))
+
+    rows = (await db.execute(q.limit(limit + 1))).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more:
+        last = rows[-1][0]
+        next_cursor = encode_cursor(last.issued_at, last.id)
+    return InvoicePageResponse(items=_summaries(rows), next_cursor=next_cursor)
+
+
+async def load_invoice(
+    db: AsyncSession,
+    shop_id: uuid.UUID,
+    invoice_id: uuid.UUID,
+    issued_at: datetime | None = None,
+) -> Invoice | None:
+    """Fetch an invoice with its customer, items and payments in one statement.
+
+    Without `issued_at` it is taken from invoice_locators in the same
+    statement, so either way only that month's partitions are read.
+    """
+    q = (
+        select(Invoice)
+        .options(
+            joinedload(Invoice.customer),
+            joinedload(Invoice.items),
+            joinedload(Invoice.payments),
         )
-        customer_name = customer.name if customer else None
-        customer_phone = customer.phone if customer else None
-
-    items = (
-        db.query(InvoiceItem)
-        .filter(InvoiceItem.invoice_id == invoice.id)
-        .order_by(InvoiceItem.created_at.asc())
-        .all()
-    )
-    payments = (
-        db.query(Payment)
-        .filter(Payment.invoice_id == invoice.id)
-        .order_by(Payment.created_at.asc())
-        .all()
+        .where(Invoice.id == invoice_id, Invoice.shop_id == shop_id)
     )
+    if issued_at is None:
+        issued_at = select(InvoiceLocator.issued_at).where(InvoiceLocator.id == invoice_id).scalar_subquery()
+    q = q.where(Invoice.issued_at == issued_at)
+    result = await db.execute(q)
+    return result.unique().scalar_one_or_none()
+
 
+def _invoice_response(
+    invoice: Invoice,
+    customer_name: str | None = None,
+    customer_phone: str | None = None,
+) -> InvoiceResponse:
     return InvoiceResponse(
         id=invoice.id,
         customer_id=invoice.customer_id,
@@ -127,7 +157,7 @@ def get_invoice(invoice_id: uuid.UUID, db: Session = Depends(get_db), user=Depen
                 "unit_price_paise": it.unit_price_paise,
                 "total_paise": it.total_paise,
             }
-            for it in items
+            for it in invoice.items
         ],
         payments=[
             {
@@ -136,123 +166,338 @@ def get_invoice(invoice_id: uuid.UUID, db: Session = Depends(get_db), user=Depen
                 "amount_paise": p.amount_paise,
                 "reference": p.reference,
             }
-            for p in payments
+            for p in invoice.payments
         ],
     )
 
 
-@router.post("/", response_model=InvoiceResponse)
-def create_invoice(payload: InvoiceCreate, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    customer_name: str | None = None
-    customer_phone: str | None = None
-    if payload.customer_id is not None:
-        customer = (
-            db.query(Customer)
-            .filter(Customer.id == payload.customer_id, Customer.shop_id == user.shop.id)
-            .first()
+@dataclass
+class _NewInvoice:
+    """Column values for one bill, ready to insert."""
+
+    invoice: dict
+    items: list[dict]
+    payment: dict
+    # The invoice_locators row.
+    locator: dict
+    # The invoice_idempotency_keys row, when the client sent a key.
+    key: dict | None = None
+
+    def facts(self) -> InvoiceFacts:
+        return InvoiceFacts(
+            shop_id=self.invoice["shop_id"],
+            customer_id=self.invoice["customer_id"],
+            issued_at=self.invoice["issued_at"],
+            subtotal_paise=self.invoice["subtotal_paise"],
+            discount_paise=self.invoice["discount_paise"],
+            total_paise=self.invoice["total_paise"],
+            payment_method=self.invoice["payment_method"],
+            lines=tuple(
+                (it["service_id"], it["qty"], it["total_paise"]) for it in self.items if it["service_id"] is not None
+            ),
         )
-        if not customer:
-            raise HTTPException(status_code=400, detail="Customer not found")
-        customer_name = customer.name
-        customer_phone = customer.phone
 
-    service_ids = [it.service_id for it in payload.items]
-    services = (
-        db.query(Service)
-        .filter(Service.shop_id == user.shop.id, Service.id.in_(service_ids))
-        .all()
-    )
-    service_by_id = {s.id: s for s in services}
+    def response(self, customer_name: str | None, customer_phone: str | None) -> InvoiceResponse:
+        return InvoiceResponse(
+            **self.invoice,
+            customer_name=customer_name,
+            customer_phone=customer_phone,
+            items=self.items,
+            payments=[self.payment],
+        )
 
-    missing = [str(sid) for sid in service_ids if sid not in service_by_id]
-    if missing:
-        raise HTTPException(status_code=400, detail=f"Invalid service(s): {', '.join(missing)}")
 
-    subtotal_paise = 0
-    for it in payload.items:
-        s = service_by_id[it.service_id]
-        subtotal_paise += int(s.price_paise) * int(it.qty)
+def _check_issued_at(issued_at: datetime, now: datetime) -> datetime:
+    """Return `issued_at` as an aware timestamp, or 422 when it is too far
+    from `now` to have a partition (see settings.invoice_max_backdate_days)."""
+    issued_at = assume_utc(issued_at)
+    earliest = now - timedelta(days=settings.invoice_max_backdate_days)
+    if settings.invoice_retention_months is not None:
+        # The first month app.partitions.detach_old keeps attached.
+        cutoff = add_months(month_floor(now.date()), -settings.invoice_retention_months)
+        earliest = max(earliest, datetime.combine(cutoff, datetime.min.time(), timezone.utc))
+    latest = now + timedelta(seconds=settings.invoice_max_future_skew_seconds)
+    if not earliest <= issued_at <= latest:
+        raise HTTPException(
+            status_code=422,
+            detail=f"issued_at must be between {earliest.isoformat()} and {latest.isoformat()}",
+        )
+    return issued_at
 
-    discount_paise = min(int(payload.discount_paise or 0), subtotal_paise)
-    total_paise = max(0, subtotal_paise - discount_paise)
 
-    issued_at = payload.issued_at or datetime.now(timezone.utc)
+def _build_invoice(shop_id: uuid.UUID, payload: InvoiceCreate, service_by_id: dict) -> _NewInvoice:
+    """Price `payload` and return the rows to insert for it.
 
-    invoice = Invoice(
-        shop_id=user.shop.id,
-        customer_id=payload.customer_id,
-        issued_at=issued_at,
-        status="paid",
-        subtotal_paise=subtotal_paise,
-        discount_paise=discount_paise,
-        total_paise=total_paise,
-    )
-    db.add(invoice)
-    db.flush()
+    Ids and timestamps are assigned here rather than by the database, so
+    bills can be written without any read-back. Plain dicts (not ORM objects)
+    keep this cheap enough for bulk ingestion.
+    """
+    now = datetime.now(timezone.utc)
+    invoice_id = uuid.uuid4()
+    # Items and payments are partitioned on their invoice's issued_at too.
+    issued_at = now if payload.issued_at is None else _check_issued_at(payload.issued_at, now)
 
-    items: list[InvoiceItem] = []
-    for it in payload.items:
+    items: list[dict] = []
+    subtotal_paise = 0
+    for n, it in enumerate(payload.items):
         s = service_by_id[it.service_id]
         unit = int(s.price_paise)
         qty = int(it.qty)
         total = unit * qty
+        subtotal_paise += total
         items.append(
-            InvoiceItem(
-                invoice_id=invoice.id,
-                service_id=s.id,
-                description=s.name,
-                qty=qty,
-                unit_price_paise=unit,
-                total_paise=total,
-            )
+            {
+                "id": uuid.uuid4(),
+                "invoice_id": invoice_id,
+                "issued_at": issued_at,
+                "service_id": s.id,
+                "description": s.name,
+                "qty": qty,
+                "unit_price_paise": unit,
+                "total_paise": total,
+                # Items are read back ordered by created_at; keep entry order.
+                "created_at": now + timedelta(microseconds=n),
+            }
         )
-    db.add_all(items)
+
+    discount_paise = min(int(payload.discount_paise or 0), subtotal_paise)
+    total_paise = max(0, subtotal_paise - discount_paise)
 
     method = payload.payment_method.lower()
     reference = payload.upi_ref.strip() if payload.upi_ref and method == "upi" else None
-    payment = Payment(
-        invoice_id=invoice.id,
-        method=method,
-        amount_paise=total_paise,
-        reference=reference or None,
+    payment = {
+        "id": uuid.uuid4(),
+        "invoice_id": invoice_id,
+        "issued_at": issued_at,
+        "method": method,
+        "amount_paise": total_paise,
+        "reference": reference or None,
+        "created_at": now,
+    }
+
+    invoice = {
+        "id": invoice_id,
+        "shop_id": shop_id,
+        "customer_id": payload.customer_id,
+        "issued_at": issued_at,
+        "status": "paid",
+        "subtotal_paise": subtotal_paise,
+        "discount_paise": discount_paise,
+        "total_paise": total_paise,
+        "payment_method": method,
+        "created_at": now,
+    }
+    key = None
+    if payload.idempotency_key is not None:
+        key = {
+            "shop_id": shop_id,
+            "idempotency_key": payload.idempotency_key,
+            "invoice_id": invoice_id,
+            "issued_at": issued_at,
+            "created_at": now,
+        }
+    locator = {"id": invoice_id, "issued_at": issued_at}
+    return _NewInvoice(invoice=invoice, items=items, payment=payment, locator=locator, key=key)
+
+
+def _write_statement(bill: _NewInvoice, tz: str):
+    """One statement that inserts a bill with its items and payment and
+    updates every rollup (bucketed in the shop's zone `tz`), using
+    data-modifying CTEs."""
+    ctes = [
+        insert(Invoice).values(bill.invoice).cte("new_invoice"),
+        insert(InvoiceItem).values(bill.items).cte("new_invoice_items"),
+        insert(Payment).values(bill.payment).cte("new_payment"),
+        insert(InvoiceLocator).values(bill.locator).cte("new_invoice_locator"),
+    ]
+    if bill.key is not None:
+        ctes.append(insert(InvoiceIdempotencyKey).values(bill.key).cte("new_idempotency_key"))
+    for n, stmt in enumerate(invoice_rollup_statements([bill.facts()], tz)):
+        ctes.append(stmt.cte(f"rollup_{n}"))
+    return select(literal(1)).add_cte(*ctes)
+
+
+async def _bulk_write(db: AsyncSession, bills: list[_NewInvoice], tz: str) -> None:
+    """Insert many bills with one executemany per table.
+
+    psycopg pipelines executemany, so each table costs about one round trip
+    and the statements compile once regardless of batch size.
+    """
+    await db.execute(insert(Invoice), [b.invoice for b in bills])
+    await db.execute(insert(InvoiceItem), [it for b in bills for it in b.items])
+    await db.execute(insert(Payment), [b.payment for b in bills])
+    await db.execute(insert(InvoiceLocator), [b.locator for b in bills])
+    keys = [b.key for b in bills if b.key is not None]
+    if keys:
+        await db.execute(insert(InvoiceIdempotencyKey), keys)
+    for stmt in invoice_rollup_statements([b.facts() for b in bills], tz):
+        await db.execute(stmt)
+
+
+@router.get("/{invoice_id}", response_model=InvoiceResponse)
+async def get_invoice(invoice_id: uuid.UUID, db: AsyncSession = Depends(get_async_db), user=Depends(get_current_user)):
+    invoice = await load_invoice(db, user.shop_id, invoice_id)
+    if not invoice:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+
+    customer = invoice.customer
+    if customer is not None and customer.shop_id != user.shop_id:
+        customer = None
+    return _invoice_response(
+        invoice,
+        customer.name if customer else None,
+        customer.phone if customer else None,
     )
-    db.add(payment)
 
-    db.commit()
-    db.refresh(invoice)
 
-    # Re-query items/payments for response
-    db.refresh(payment)
-    for item in items:
-        db.refresh(item)
+@router.post("/", response_model=InvoiceResponse)
+async def create_invoice(payload: InvoiceCreate, db: AsyncSession = Depends(get_async_db), user=Depends(get_current_user)):
+    # Round trip 1: services and the shop's zone, plus the customer (if any)
+    # via an outer join. The zone is read under a key-share lock (the same
+    # lock the invoice FK takes anyway) rather than from the cached principal,
+    # so a concurrent zone change cannot re-bucket between read and write.
+    service_ids = [it.service_id for it in payload.items]
+    q = select(Service.id, Service.name, Service.price_paise, Shop.timezone).join(Shop, Shop.id == Service.shop_id)
+    if payload.customer_id is not None:
+        q = q.add_columns(Customer.name, Customer.phone).outerjoin(
+            Customer,
+            (Customer.id == payload.customer_id) & (Customer.shop_id == user.shop_id),
+        )
+    rows = (
+        await db.execute(
+            q.where(Service.shop_id == user.shop_id, Service.id.in_(service_ids))
+            .with_for_update(key_share=True, read=True, of=Shop)
+        )
+    ).all()
+    service_by_id = {r.id: r for r in rows}
 
-    return InvoiceResponse(
-        id=invoice.id,
-        customer_id=invoice.customer_id,
-        customer_name=customer_name,
-        customer_phone=customer_phone,
-        issued_at=invoice.issued_at,
-        status=invoice.status,
-        subtotal_paise=invoice.subtotal_paise,
-        discount_paise=invoice.discount_paise,
-        total_paise=invoice.total_paise,
-        items=[
-            {
-                "id": it.id,
-                "service_id": it.service_id,
-                "description": it.description,
-                "qty": it.qty,
-                "unit_price_paise": it.unit_price_paise,
-                "total_paise": it.total_paise,
-            }
-            for it in items
-        ],
-        payments=[
-            {
-                "id": payment.id,
-                "method": payment.method,
-                "amount_paise": payment.amount_paise,
-                "reference": payment.reference,
-            }
-        ],
+    customer_name: str | None = None
+    customer_phone: str | None = None
+    if payload.customer_id is not None and rows:
+        customer_name, customer_phone = rows[0][4], rows[0][5]
+        if customer_name is None:
+            raise HTTPException(status_code=400, detail="Customer not found")
+
+    missing = [str(sid) for sid in service_ids if sid not in service_by_id]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Invalid service(s): {', '.join(missing)}")
+
+    bill = _build_invoice(user.shop_id, payload, service_by_id)
+
+    # Round trips 2-3: one INSERT ... WITH statement, then COMMIT.
+    try:
+        await db.execute(_write_statement(bill, rows[0].timezone))
+        await db.commit()
+        await report_cache.bump(user.shop_id)
+    except IntegrityError:
+        await db.rollback()
+        if payload.idempotency_key is None:
+            raise HTTPException(status_code=400, detail="Failed to create invoice")
+        # A replay of a bill that was already saved: return the original.
+        saved = (
+            await db.execute(
+                select(InvoiceIdempotencyKey.invoice_id, InvoiceIdempotencyKey.issued_at).where(
+                    InvoiceIdempotencyKey.shop_id == user.shop_id,
+                    InvoiceIdempotencyKey.idempotency_key == payload.idempotency_key,
+                )
+            )
+        ).one_or_none()
+        existing = await load_invoice(db, user.shop_id, saved.invoice_id, saved.issued_at) if saved else None
+        if existing is None:
+            raise HTTPException(status_code=400, detail="Failed to create invoice")
+        return _invoice_response(existing, customer_name, customer_phone)
+
+    return bill.response(customer_name, customer_phone)
+
+
+@router.post("/bulk", response_model=InvoiceBulkResponse)
+async def bulk_create_invoices(
+    payload: InvoiceBulkCreate,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+):
+    # Services, customers and idempotency keys are each checked with one
+    # query for the whole batch.
+    service_ids = {it.service_id for inv in payload.invoices for it in inv.items}
+    service_rows = await db.execute(
+        select(Service.id, Service.name, Service.price_paise, Shop.timezone)
+        .join(Shop, Shop.id == Service.shop_id)
+        .where(Service.shop_id == user.shop_id, Service.id.in_(service_ids))
+        .with_for_update(key_share=True, read=True, of=Shop)
+    )
+    service_by_id = {r.id: r for r in service_rows}
+
+    customer_ids = {inv.customer_id for inv in payload.invoices if inv.customer_id is not None}
+    known_customers: set[uuid.UUID] = set()
+    if customer_ids:
+        known_customers = set(
+            await db.scalars(
+                select(Customer.id).where(Customer.shop_id == user.shop_id, Customer.id.in_(customer_ids))
+            )
+        )
+
+    keys = [inv.idempotency_key for inv in payload.invoices]
+    invoice_id_by_key: dict[str, uuid.UUID] = dict(
+        (
+            await db.execute(
+                select(InvoiceIdempotencyKey.idempotency_key, InvoiceIdempotencyKey.invoice_id).where(
+                    InvoiceIdempotencyKey.shop_id == user.shop_id, InvoiceIdempotencyKey.idempotency_key.in_(keys)
+                )
+            )
+        ).all()
+    )
+
+    results: list[InvoiceBulkResult] = []
+    to_insert: list[_NewInvoice] = []
+    for index, item in enumerate(payload.invoices):
+        key = item.idempotency_key
+        if key in invoice_id_by_key:
+            results.append(
+                InvoiceBulkResult(index=index, idempotency_key=key, status="duplicate", invoice_id=invoice_id_by_key[key])
+            )
+            continue
+
+        error = None
+        if item.customer_id is not None and item.customer_id not in known_customers:
+            error = "Customer not found"
+        else:
+            missing = [str(it.service_id) for it in item.items if it.service_id not in service_by_id]
+            if missing:
+                error = f"Invalid service(s): {', '.join(missing)}"
+        if error:
+            results.append(InvoiceBulkResult(index=index, idempotency_key=key, status="error", error=error))
+            continue
+
+        try:
+            bill = _build_invoice(user.shop_id, item, service_by_id)
+        except HTTPException as exc:
+            # An out-of-range issued_at (typically a counter that was offline
+            # past the backdate window) fails only this bill.
+            results.append(InvoiceBulkResult(index=index, idempotency_key=key, status="error", error=exc.detail))
+            continue
+        invoice_id_by_key[key] = bill.invoice["id"]
+        to_insert.append(bill)
+        results.append(
+            InvoiceBulkResult(index=index, idempotency_key=key, status="created", invoice_id=bill.invoice["id"])
+        )
+
+    if to_insert:
+        # One transaction: the valid part of the batch lands entirely or not
+        # at all.
+        try:
+            await _bulk_write(db, to_insert, next(iter(service_by_id.values())).timezone)
+            await db.commit()
+            await report_cache.bump(user.shop_id)
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(
+                status_code=409,
+                detail="Some invoices in this batch were saved concurrently; retry the batch",
+            )
+
+    return InvoiceBulkResponse(
+        created=sum(1 for r in results if r.status == "created"),
+        duplicates=sum(1 for r in results if r.status == "duplicate"),
+        errors=sum(1 for r in results if r.status == "error"),
+        results=results,
     )
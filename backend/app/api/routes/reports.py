@@ -1,46 +1,209 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 
-from fastapi import APIRouter, Depends
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import and_, extract, func, literal, or_, select, tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user
-from app.db.session import get_db
+from app.api.pagination import decode_cursor, encode_cursor
+from app.core.report_cache import report_cache
+from app.db.session import get_async_db
 from app.models.customer import Customer
+from app.models.customer_stats import CustomerStats
 from app.models.invoice import Invoice
 from app.models.invoice_item import InvoiceItem
+from app.models.payment import Payment
 from app.models.service import Service
+from app.models.service_daily_stats import ServiceDailyStats
+from app.models.shop import Shop
+from app.models.shop_daily_sales import ShopDailySales
+from app.models.shop_hourly_sales import ShopHourlySales
+from app.rollups import assume_utc, local_midnight, whole_local_days
 from app.schemas.reports import (
     CustomerInsightsResponse,
     CustomerInsightRow,
+    DailySalesRow,
     DormantCustomerRow,
+    PaymentMethodSplitRow,
+    PaymentsReportResponse,
+    ReportCacheStatsResponse,
+    SalesHeatmapResponse,
+    SalesSummaryResponse,
     ServicePerformanceResponse,
     ServicePerformanceRow,
+    UpiTransactionRow,
 )
 
 
 router = APIRouter()
 
 
+MAX_SUMMARY_DAYS = 3660
+
+
+async def _shop_timezone(db: AsyncSession, shop_id) -> str:
+    # Read per report rather than from the cached principal, which another
+    # process may hold from before a zone change.
+    return await db.scalar(select(Shop.timezone).where(Shop.id == shop_id))
+
+
+@router.get("/cache-stats", response_model=ReportCacheStatsResponse)
+def cache_stats(user=Depends(get_current_user)):
+    # Process-wide counters for the report cache.
+    return ReportCacheStatsResponse(**report_cache.stats())
+
+
+@router.get("/summary", response_model=SalesSummaryResponse)
+async def sales_summary(
+    start: date,
+    end: date,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+):
+    key, cached = await report_cache.lookup(user.shop_id, "summary", {"start": start, "end": end})
+    if cached is not None:
+        return cached
+
+    # Local days (in the shop's zone) in [start, end), answered from the
+    # daily rollup only.
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if (end - start).days > MAX_SUMMARY_DAYS:
+        raise HTTPException(status_code=400, detail="Date range too large")
+
+    rows = (
+        await db.scalars(
+            select(ShopDailySales).where(
+                ShopDailySales.shop_id == user.shop_id,
+                ShopDailySales.day >= start,
+                ShopDailySales.day < end,
+            )
+        )
+    ).all()
+    by_day = {r.day: r for r in rows}
+
+    days: list[DailySalesRow] = []
+    d = start
+    while d < end:
+        r = by_day.get(d)
+        bill_count = int(r.bill_count) if r else 0
+        net_paise = int(r.net_paise) if r else 0
+        days.append(
+            DailySalesRow(
+                day=d,
+                gross_paise=int(r.gross_paise) if r else 0,
+                discount_paise=int(r.discount_paise) if r else 0,
+                net_paise=net_paise,
+                bill_count=bill_count,
+                avg_bill_paise=net_paise // bill_count if bill_count else 0,
+                cash_net_paise=int(r.cash_net_paise) if r else 0,
+                upi_net_paise=int(r.upi_net_paise) if r else 0,
+            )
+        )
+        d += timedelta(days=1)
+
+    bill_count = sum(x.bill_count for x in days)
+    net_paise = sum(x.net_paise for x in days)
+    response = SalesSummaryResponse(
+        start=start,
+        end=end,
+        timezone=await _shop_timezone(db, user.shop_id),
+        gross_paise=sum(x.gross_paise for x in days),
+        discount_paise=sum(x.discount_paise for x in days),
+        net_paise=net_paise,
+        bill_count=bill_count,
+        avg_bill_paise=net_paise // bill_count if bill_count else 0,
+        cash_net_paise=sum(x.cash_net_paise for x in days),
+        upi_net_paise=sum(x.upi_net_paise for x in days),
+        days=days,
+    )
+    return await report_cache.store(key, response)
+
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+@router.get("/heatmap", response_model=SalesHeatmapResponse)
+async def sales_heatmap(
+    start: date,
+    end: date,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+):
+    key, cached = await report_cache.lookup(user.shop_id, "heatmap", {"start": start, "end": end})
+    if cached is not None:
+        return cached
+
+    # Local days in [start, end), folded onto weekday x local hour. At most
+    # 7 * 24 rows come back from the hourly rollup.
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if (end - start).days > MAX_SUMMARY_DAYS:
+        raise HTTPException(status_code=400, detail="Date range too large")
+
+    weekday = (extract("isodow", ShopHourlySales.day) - 1).label("weekday")
+    rows = (
+        await db.execute(
+            select(
+                weekday,
+                ShopHourlySales.hour,
+                func.sum(ShopHourlySales.net_paise),
+                func.sum(ShopHourlySales.bill_count),
+            )
+            .where(
+                ShopHourlySales.shop_id == user.shop_id,
+                ShopHourlySales.day >= start,
+                ShopHourlySales.day < end,
+            )
+            .group_by(weekday, ShopHourlySales.hour)
+        )
+    ).all()
+
+    net_paise = [[0] * 24 for _ in WEEKDAYS]
+    bill_count = [[0] * 24 for _ in WEEKDAYS]
+    for wd, hour, net, bills in rows:
+        net_paise[int(wd)][int(hour)] = int(net or 0)
+        bill_count[int(wd)][int(hour)] = int(bills or 0)
+
+    response = SalesHeatmapResponse(
+        start=start,
+        end=end,
+        timezone=await _shop_timezone(db, user.shop_id),
+        weekdays=WEEKDAYS,
+        net_paise=net_paise,
+        bill_count=bill_count,
+    )
+    return await report_cache.store(key, response)
+
+
 @router.get("/customers", response_model=CustomerInsightsResponse)
-def customer_insights(
+async def customer_insights(
     start: datetime,
     end: datetime,
     dormant_days: int = 30,
     include_never: bool = True,
     limit: int = 10,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user=Depends(get_current_user),
 ):
+    key, cached = await report_cache.lookup(
+        user.shop_id,
+        "customers",
+        {"start": start, "end": end, "dormant_days": dormant_days, "include_never": include_never, "limit": limit},
+    )
+    if cached is not None:
+        return cached
+
     # Normalize params
     dormant_days = max(1, min(int(dormant_days), 3650))
     limit = max(1, min(int(limit), 100))
 
-    # Range aggregates (only invoices with a saved customer)
+    # Range aggregates (only invoices with a saved customer), ranked both
+    # ways in one pass; a customer can appear in either list or both.
     range_base = (
-        db.query(
+        select(
             Invoice.customer_id.label("customer_id"),
             func.count(Invoice.id).label("bill_count"),
             func.coalesce(func.sum(Invoice.subtotal_paise), 0).label("gross_paise"),
@@ -48,8 +211,8 @@ def customer_insights(
             func.coalesce(func.sum(Invoice.total_paise), 0).label("net_paise"),
             func.max(Invoice.issued_at).label("last_invoice_at"),
         )
-        .filter(
-            Invoice.shop_id == user.shop.id,
+        .where(
+            Invoice.shop_id == user.shop_id,
             Invoice.customer_id.isnot(None),
             Invoice.issued_at >= start,
             Invoice.issued_at < end,
@@ -57,82 +220,92 @@ def customer_insights(
         .group_by(Invoice.customer_id)
         .subquery()
     )
+    ranked = select(
+        range_base,
+        func.row_number()
+        .over(order_by=(range_base.c.bill_count.desc(), range_base.c.net_paise.desc()))
+        .label("repeat_rank"),
+        func.row_number()
+        .over(order_by=(range_base.c.net_paise.desc(), range_base.c.bill_count.desc()))
+        .label("top_rank"),
+    ).subquery()
 
-    repeat_rows = (
-        db.query(
-            Customer.id,
-            Customer.name,
-            range_base.c.bill_count,
-            range_base.c.gross_paise,
-            range_base.c.discount_paise,
-            range_base.c.net_paise,
-            range_base.c.last_invoice_at,
+    range_rows = (
+        await db.execute(
+            select(
+                Customer.id,
+                Customer.name,
+                ranked.c.bill_count,
+                ranked.c.gross_paise,
+                ranked.c.discount_paise,
+                ranked.c.net_paise,
+                ranked.c.last_invoice_at,
+                ranked.c.repeat_rank,
+                ranked.c.top_rank,
+            )
+            .join(ranked, ranked.c.customer_id == Customer.id)
+            .where(
+                Customer.shop_id == user.shop_id,
+                or_(
+                    and_(ranked.c.bill_count >= 2, ranked.c.repeat_rank <= limit),
+                    ranked.c.top_rank <= limit,
+                ),
+            )
         )
-        .join(range_base, range_base.c.customer_id == Customer.id)
-        .filter(Customer.shop_id == user.shop.id, range_base.c.bill_count >= 2)
-        .order_by(range_base.c.bill_count.desc(), range_base.c.net_paise.desc())
-        .limit(limit)
-        .all()
-    )
+    ).all()
+    repeat_rows = sorted((r for r in range_rows if r[2] >= 2 and r[7] <= limit), key=lambda r: r[7])
+    top_rows = sorted((r for r in range_rows if r[8] <= limit), key=lambda r: r[8])
 
-    top_rows = (
-        db.query(
-            Customer.id,
-            Customer.name,
-            range_base.c.bill_count,
-            range_base.c.gross_paise,
-            range_base.c.discount_paise,
-            range_base.c.net_paise,
-            range_base.c.last_invoice_at,
+    # Lifetime leaders and dormant customers come from customer_stats, so
+    # their cost does not grow with invoice history.
+    lifetime_rows = (
+        await db.execute(
+            select(
+                Customer.id,
+                Customer.name,
+                CustomerStats.bill_count,
+                CustomerStats.gross_paise,
+                CustomerStats.discount_paise,
+                CustomerStats.net_paise,
+                CustomerStats.last_invoice_at,
+            )
+            .select_from(CustomerStats)
+            .join(Customer, Customer.id == CustomerStats.customer_id)
+            .where(CustomerStats.shop_id == user.shop_id)
+            .order_by(CustomerStats.net_paise.desc(), CustomerStats.bill_count.desc())
+            .limit(limit)
         )
-        .join(range_base, range_base.c.customer_id == Customer.id)
-        .filter(Customer.shop_id == user.shop.id)
-        .order_by(range_base.c.net_paise.desc(), range_base.c.bill_count.desc())
-        .limit(limit)
-        .all()
-    )
+    ).all()
 
-    # Dormant customers: based on last invoice all-time
     cutoff = datetime.now(timezone.utc) - timedelta(days=dormant_days)
 
-    last_all_time = (
-        db.query(
-            Invoice.customer_id.label("customer_id"),
-            func.count(Invoice.id).label("bill_count_all_time"),
-            func.max(Invoice.issued_at).label("last_invoice_at"),
-        )
-        .filter(Invoice.shop_id == user.shop.id, Invoice.customer_id.isnot(None))
-        .group_by(Invoice.customer_id)
-        .subquery()
-    )
-
-    dormant_query = (
-        db.query(
-            Customer.id,
-            Customer.name,
-            last_all_time.c.last_invoice_at,
-            func.coalesce(last_all_time.c.bill_count_all_time, 0).label("bill_count_all_time"),
-        )
-        .outerjoin(last_all_time, last_all_time.c.customer_id == Customer.id)
-        .filter(Customer.shop_id == user.shop.id)
-    )
-
+    dormant_rows = []
     if include_never:
-        dormant_query = dormant_query.filter(
-            (last_all_time.c.last_invoice_at.is_(None))
-            | (last_all_time.c.last_invoice_at < cutoff)
-        )
-        dormant_query = dormant_query.order_by(
-            last_all_time.c.last_invoice_at.isnot(None).asc(),
-            last_all_time.c.last_invoice_at.asc().nullsfirst(),
-        )
-    else:
-        dormant_query = dormant_query.filter(last_all_time.c.last_invoice_at < cutoff)
-        dormant_query = dormant_query.order_by(last_all_time.c.last_invoice_at.asc())
-
-    dormant_rows = dormant_query.limit(limit).all()
+        # Never-billed customers have no stats row and are listed first,
+        # longest-standing first (ix_customers_shop_created_at_id), so the
+        # same ones come back on every call.
+        dormant_rows = (
+            await db.execute(
+                select(Customer.id, Customer.name, literal(None), literal(0))
+                .outerjoin(CustomerStats, CustomerStats.customer_id == Customer.id)
+                .where(Customer.shop_id == user.shop_id, CustomerStats.customer_id.is_(None))
+                .order_by(Customer.created_at, Customer.id)
+                .limit(limit)
+            )
+        ).all()
+    if len(dormant_rows) < limit:
+        dormant_rows += (
+            await db.execute(
+                select(Customer.id, Customer.name, CustomerStats.last_invoice_at, CustomerStats.bill_count)
+                .select_from(CustomerStats)
+                .join(Customer, Customer.id == CustomerStats.customer_id)
+                .where(CustomerStats.shop_id == user.shop_id, CustomerStats.last_invoice_at < cutoff)
+                .order_by(CustomerStats.last_invoice_at.asc(), CustomerStats.customer_id)
+                .limit(limit - len(dormant_rows))
+            )
+        ).all()
 
-    return CustomerInsightsResponse(
+    response = CustomerInsightsResponse(
         start=start,
         end=end,
         dormant_days=dormant_days,
@@ -160,6 +333,18 @@ def customer_insights(
             )
             for r in top_rows
         ],
+        lifetime_top_customers=[
+            CustomerInsightRow(
+                customer_id=r[0],
+                customer_name=r[1],
+                bill_count=int(r[2] or 0),
+                gross_paise=int(r[3] or 0),
+                discount_paise=int(r[4] or 0),
+                net_paise=int(r[5] or 0),
+                last_invoice_at=r[6],
+            )
+            for r in lifetime_rows
+        ],
         dormant_customers=[
             DormantCustomerRow(
                 customer_id=r[0],
@@ -170,61 +355,212 @@ def customer_insights(
             for r in dormant_rows
         ],
     )
+    return await report_cache.store(key, response)
 
 
 @router.get("/services", response_model=ServicePerformanceResponse)
-def service_performance(
+async def service_performance(
     start: datetime,
     end: datetime,
     limit: int = 10,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user=Depends(get_current_user),
 ):
+    key, cached = await report_cache.lookup(user.shop_id, "services", {"start": start, "end": end, "limit": limit})
+    if cached is not None:
+        return cached
+
     limit = max(1, min(int(limit), 100))
+    tz = await _shop_timezone(db, user.shop_id)
 
-    base = (
-        db.query(
-            InvoiceItem.service_id.label("service_id"),
-            Service.name.label("service_name"),
-            func.coalesce(func.sum(InvoiceItem.qty), 0).label("qty"),
-            func.coalesce(func.sum(InvoiceItem.total_paise), 0).label("revenue_paise"),
-            func.count(func.distinct(InvoiceItem.invoice_id)).label("invoice_count"),
-        )
-        .join(Invoice, Invoice.id == InvoiceItem.invoice_id)
-        .join(Service, Service.id == InvoiceItem.service_id)
-        .filter(
-            Invoice.shop_id == user.shop.id,
-            Invoice.issued_at >= start,
-            Invoice.issued_at < end,
-            Service.shop_id == user.shop.id,
+    def scan(span_start: datetime, span_end: datetime):
+        return (
+            select(
+                InvoiceItem.service_id.label("service_id"),
+                func.sum(InvoiceItem.qty).label("qty"),
+                func.sum(InvoiceItem.total_paise).label("revenue_paise"),
+                func.count(func.distinct(InvoiceItem.invoice_id)).label("invoice_count"),
+            )
+            .join(Invoice, (Invoice.id == InvoiceItem.invoice_id) & (Invoice.issued_at == InvoiceItem.issued_at))
+            .where(
+                Invoice.shop_id == user.shop_id,
+                Invoice.issued_at >= span_start,
+                Invoice.issued_at < span_end,
+                # Bounds the items' own partitions too.
+                InvoiceItem.issued_at >= span_start,
+                InvoiceItem.issued_at < span_end,
+                InvoiceItem.service_id.isnot(None),
+            )
+            .group_by(InvoiceItem.service_id)
         )
-        .group_by(InvoiceItem.service_id, Service.name)
-    )
 
-    by_revenue = (
-        base.order_by(func.coalesce(func.sum(InvoiceItem.total_paise), 0).desc())
-        .limit(limit)
-        .all()
+    # Whole local days come from the daily rollup; only the partial days at
+    # either end of the range are read from line items.
+    days = whole_local_days(start, end, tz)
+    if days is None:
+        parts = [scan(start, end)]
+    else:
+        first, stop = days
+        head_end, tail_start = local_midnight(first, tz), local_midnight(stop, tz)
+        parts = [
+            select(
+                ServiceDailyStats.service_id.label("service_id"),
+                func.sum(ServiceDailyStats.qty).label("qty"),
+                func.sum(ServiceDailyStats.revenue_paise).label("revenue_paise"),
+                func.sum(ServiceDailyStats.invoice_count).label("invoice_count"),
+            )
+            .where(
+                ServiceDailyStats.shop_id == user.shop_id,
+                ServiceDailyStats.day >= first,
+                ServiceDailyStats.day < stop,
+            )
+            .group_by(ServiceDailyStats.service_id)
+        ]
+        if assume_utc(start) < head_end:
+            parts.append(scan(start, head_end))
+        if tail_start < assume_utc(end):
+            parts.append(scan(tail_start, end))
+    combined = union_all(*parts).subquery() if len(parts) > 1 else parts[0].subquery()
+
+    totals = (
+        select(
+            combined.c.service_id,
+            func.sum(combined.c.qty).label("qty"),
+            func.sum(combined.c.revenue_paise).label("revenue_paise"),
+            func.sum(combined.c.invoice_count).label("invoice_count"),
+        )
+        .group_by(combined.c.service_id)
+        .subquery()
     )
-    by_qty = (
-        base.order_by(func.coalesce(func.sum(InvoiceItem.qty), 0).desc())
-        .limit(limit)
-        .all()
+    # One pass ranks services both ways and computes each one's mix share.
+    ranked = (
+        select(
+            totals,
+            Service.name.label("service_name"),
+            func.row_number().over(order_by=(totals.c.revenue_paise.desc(), totals.c.qty.desc())).label("revenue_rank"),
+            func.row_number().over(order_by=(totals.c.qty.desc(), totals.c.revenue_paise.desc())).label("qty_rank"),
+            func.sum(totals.c.revenue_paise).over().label("total_revenue_paise"),
+            func.sum(totals.c.qty).over().label("total_qty"),
+        )
+        .join(Service, Service.id == totals.c.service_id)
+        .where(Service.shop_id == user.shop_id)
+        .subquery()
     )
+    rows = (
+        await db.execute(select(ranked).where(or_(ranked.c.revenue_rank <= limit, ranked.c.qty_rank <= limit)))
+    ).all()
+
+    total_revenue_paise = int(rows[0].total_revenue_paise or 0) if rows else 0
+    total_qty = int(rows[0].total_qty or 0) if rows else 0
+
+    def share(part, whole: int) -> float:
+        return round(100.0 * int(part or 0) / whole, 2) if whole else 0.0
 
     def to_row(r) -> ServicePerformanceRow:
         return ServicePerformanceRow(
-            service_id=r[0],
-            service_name=r[1],
-            qty=int(r[2] or 0),
-            revenue_paise=int(r[3] or 0),
-            invoice_count=int(r[4] or 0),
+            service_id=r.service_id,
+            service_name=r.service_name,
+            qty=int(r.qty or 0),
+            revenue_paise=int(r.revenue_paise or 0),
+            invoice_count=int(r.invoice_count or 0),
+            revenue_mix_pct=share(r.revenue_paise, total_revenue_paise),
+            qty_mix_pct=share(r.qty, total_qty),
         )
 
-    return ServicePerformanceResponse(
+    response = ServicePerformanceResponse(
         start=start,
         end=end,
         limit=limit,
-        top_by_revenue=[to_row(r) for r in by_revenue],
-        top_by_quantity=[to_row(r) for r in by_qty],
+        total_revenue_paise=total_revenue_paise,
+        total_qty=total_qty,
+        top_by_revenue=[to_row(r) for r in sorted((r for r in rows if r.revenue_rank <= limit), key=lambda r: r.revenue_rank)],
+        top_by_quantity=[to_row(r) for r in sorted((r for r in rows if r.qty_rank <= limit), key=lambda r: r.qty_rank)],
+    )
+    return await report_cache.store(key, response)
+
+
+UPI_PAGE_LIMIT = 200
+
+
+@router.get("/payments", response_model=PaymentsReportResponse)
+async def payments_report(
+    start: datetime,
+    end: datetime,
+    cursor: str | None = None,
+    limit: int = Query(default=50, ge=1, le=UPI_PAGE_LIMIT),
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+):
+    # A bad cursor fails before any query runs.
+    after = decode_cursor(cursor) if cursor is not None else None
+    key, cached = await report_cache.lookup(
+        user.shop_id, "payments", {"start": start, "end": end, "cursor": cursor, "limit": limit}
+    )
+    if cached is not None:
+        return cached
+
+    in_range = (
+        Invoice.shop_id == user.shop_id,
+        Invoice.issued_at >= start,
+        Invoice.issued_at < end,
+    )
+
+    # Query 1: totals per method, from the method stored on each invoice.
+    split_rows = (
+        await db.execute(
+            select(
+                Invoice.payment_method,
+                func.count(Invoice.id),
+                func.coalesce(func.sum(Invoice.total_paise), 0),
+            )
+            .where(*in_range)
+            .group_by(Invoice.payment_method)
+            .order_by(Invoice.payment_method)
+        )
+    ).all()
+
+    # Query 2: one page of UPI payments with their references, newest first
+    # (ix_invoices_shop_upi_issued_at_id).
+    q = (
+        select(
+            Invoice.id,
+            Invoice.issued_at,
+            Customer.name,
+            Payment.id,
+            Payment.amount_paise,
+            Payment.reference,
+        )
+        .join(
+            Payment,
+            (Payment.invoice_id == Invoice.id) & (Payment.issued_at == Invoice.issued_at) & (Payment.method == "upi"),
+        )
+        .outerjoin(Customer, Customer.id == Invoice.customer_id)
+        .where(*in_range, Invoice.payment_method == "upi", Payment.issued_at >= start, Payment.issued_at < end)
+    )
+    if after is not None:
+        q = q.where(tuple_(Invoice.issued_at, Invoice.id) < tuple_(*after))
+    rows = (await db.execute(q.order_by(Invoice.issued_at.desc(), Invoice.id.desc()).limit(limit + 1))).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    response = PaymentsReportResponse(
+        start=start,
+        end=end,
+        methods=[
+            PaymentMethodSplitRow(method=method.upper(), bill_count=int(bills), net_paise=int(net))
+            for method, bills, net in split_rows
+        ],
+        upi_transactions=[
+            UpiTransactionRow(
+                invoice_id=r[0],
+                issued_at=r[1],
+                customer_name=r[2],
+                payment_id=r[3],
+                amount_paise=int(r[4] or 0),
+                reference=r[5],
+            )
+            for r in rows
+        ],
+        next_cursor=encode_cursor(rows[-1][1], rows[-1][0]) if has_more else None,
     )
+    return await report_cache.store(key, response)
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import func, select
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user
-from app.db.session import get_db
+from app.api.http_cache import make_etag, not_modified, set_validators
+from app.core.report_cache import report_cache
+from app.db.session import get_async_db
 from app.models.service import Service
 from app.schemas.service import ServiceCreate, ServiceResponse, ServiceUpdate
 
@@ -12,13 +15,28 @@ router = APIRouter()
 
 
 @router.get("/", response_model=list[ServiceResponse])
-def list_services(db: Session = Depends(get_db), user=Depends(get_current_user)):
+async def list_services(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+):
+    # Services are never deleted and every write moves updated_at, so the
+    # count and latest updated_at version the whole catalog.
+    count, last_updated_at = (
+        await db.execute(
+            select(func.count(Service.id), func.max(Service.updated_at)).where(Service.shop_id == user.shop_id)
+        )
+    ).one()
+    etag = make_etag("services", user.shop_id, count, last_updated_at)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    set_validators(response, etag)
+
     services = (
-        db.query(Service)
-        .filter(Service.shop_id == user.shop.id)
-        .order_by(Service.name.asc())
-        .all()
-    )
+        await db.scalars(select(Service).where(Service.shop_id == user.shop_id).order_by(Service.name.asc()))
+    ).all()
     return [
         ServiceResponse(id=s.id, name=s.name, price_paise=s.price_paise, active=s.active)
         for s in services
@@ -26,22 +44,23 @@ def list_services(db: Session = Depends(get_db), user=Depends(get_current_user))
 
 
 @router.post("/", response_model=ServiceResponse)
-def create_service(payload: ServiceCreate, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    service = Service(shop_id=user.shop.id, name=payload.name, price_paise=payload.price_paise)
+async def create_service(payload: ServiceCreate, db: AsyncSession = Depends(get_async_db), user=Depends(get_current_user)):
+    service = Service(shop_id=user.shop_id, name=payload.name, price_paise=payload.price_paise)
     db.add(service)
     try:
-        db.commit()
+        await db.commit()
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Service name already exists")
-    db.refresh(service)
+    await report_cache.bump(user.shop_id)
+    await db.refresh(service)
     return ServiceResponse(id=service.id, name=service.name, price_paise=service.price_paise, active=service.active)
 
 
 @router.patch("/{service_id}", response_model=ServiceResponse)
-def update_service(service_id: str, payload: ServiceUpdate, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    service = db.get(Service, service_id)
-    if not service or service.shop_id != user.shop.id:
+async def update_service(service_id: str, payload: ServiceUpdate, db: AsyncSession = Depends(get_async_db), user=Depends(get_current_user)):
+    service = await db.get(Service, service_id)
+    if not service or service.shop_id != user.shop_id:
         raise HTTPException(status_code=404, detail="Service not found")
 
     if payload.name is not None:
@@ -52,10 +71,11 @@ def update_service(service_id: str, payload: ServiceUpdate, db: Session = Depend
         service.active = payload.active
 
     try:
-        db.commit()
+        await db.commit()
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Service name already exists")
+    await report_cache.bump(user.shop_id)
 
-    db.refresh(service)
+    await db.refresh(service)
     return ServiceResponse(id=service.id, name=service.name, price_paise=service.price_paise, active=service.active)
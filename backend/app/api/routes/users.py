@@ -1,15 +1,96 @@
-from fastapi import APIRouter, Depends
+import os
+import uuid
+from datetime import datetime, timezone
+
+from anyio import from_thread
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user
-from app.db.session import get_db
-from app.schemas.user import UserMeResponse
+from app.core.report_cache import report_cache
+from app.db import query_stats
+from app.db.session import SessionLocal, get_db
+from app.models.shop import Shop
+from app.models.user import User
+from app.rollups import rebuild_stale_zone
+from app.schemas.user import ShopSettingsUpdate, UserMeResponse
 
 
 router = APIRouter()
 
 
+def _me(db: Session, user) -> UserMeResponse:
+    row = (
+        db.query(User.email, Shop.name, Shop.timezone, Shop.rollups_stale_since)
+        .join(Shop, Shop.user_id == User.id)
+        .filter(User.id == user.id)
+        .one_or_none()
+    )
+    if not row:
+        raise HTTPException(status_code=401, detail="User not found")
+    email, shop_name, tz, stale_since = row
+    return UserMeResponse(
+        id=user.id,
+        email=email,
+        shop_id=user.shop_id,
+        shop_name=shop_name,
+        timezone=tz,
+        rollups_stale_since=stale_since,
+    )
+
+
+def _rebuild_rollups(shop_id: uuid.UUID) -> None:
+    # Runs after the response, on a worker thread, with its own session. Its
+    # statements are not the request's, so they stay out of its query budget.
+    token = query_stats.suspend()
+    db = SessionLocal()
+    try:
+        rebuilt = rebuild_stale_zone(db, shop_id)
+    finally:
+        db.close()
+        query_stats.stop(token)
+    if rebuilt:
+        from_thread.run(report_cache.bump, shop_id)
+
+
 @router.get("/me", response_model=UserMeResponse)
 def me(db: Session = Depends(get_db), user=Depends(get_current_user)):
-    shop = user.shop
-    return UserMeResponse(id=user.id, email=user.email, shop_id=shop.id, shop_name=shop.name)
+    return _me(db, user)
+
+
+@router.patch("/me/shop", response_model=UserMeResponse)
+def update_shop_settings(
+    payload: ShopSettingsUpdate,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    # Bills key-share lock the shop row when they read the zone, so this
+    # waits for in-flight bills and later ones see the new zone.
+    shop = db.query(Shop).filter(Shop.id == user.shop_id).with_for_update().one()
+    if shop.timezone != payload.timezone:
+        # The schema checks Python's tz database (tzdata), but rollups and
+        # reports bucket with Postgres' own; the zone must exist in both.
+        known = db.scalar(
+            text("SELECT EXISTS (SELECT 1 FROM pg_timezone_names WHERE name = :tz)"), {"tz": payload.timezone}
+        )
+        if not known:
+            raise HTTPException(status_code=422, detail="Timezone not known to the database")
+        shop.timezone = payload.timezone
+        # Local days and hours moved. Re-bucketing the whole history here
+        # would hold this lock, and the shop's bills, for as long as that
+        # takes, so the rollups are rebuilt a month at a time afterwards:
+        # after the response here, or by the scheduled rebuild-stale job on
+        # Lambda, where nothing runs once the response is returned.
+        shop.rollups_stale_since = datetime.now(timezone.utc)
+        db.commit()
+        if not os.getenv("AWS_LAMBDA_FUNCTION_NAME"):
+            background_tasks.add_task(_rebuild_rollups, shop.id)
+        response.status_code = 202
+    else:
+        db.commit()
+    # Sync route, on a worker thread: hand the bump to the event loop.
+    from_thread.run(report_cache.bump, user.shop_id)
+    return _me(db, user)
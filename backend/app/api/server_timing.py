@@ -0,0 +1,53 @@
+"""Server-Timing header and query-budget reporting for every request.
+
+A plain ASGI middleware rather than BaseHTTPMiddleware, so it neither
+buffers streaming responses (CSV exports) nor runs the route in a separate
+task from the one that opened the request's `QueryStats`.
+"""
+
+import logging
+import time
+
+from app.core.config import settings
+from app.db import query_stats
+
+
+logger = logging.getLogger(__name__)
+
+
+class ServerTimingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        stats, token = query_stats.start()
+
+        async def send_with_timing(message) -> None:
+            if message["type"] == "http.response.start" and settings.server_timing:
+                total_ms = (time.perf_counter() - started) * 1000
+                timing = (
+                    f'db;dur={stats.seconds * 1000:.1f};desc="{stats.statements} queries", '
+                    f"total;dur={total_ms:.1f}"
+                )
+                message["headers"] = [*message.get("headers", []), (b"server-timing", timing.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            query_stats.stop(token)
+            if stats.mode != "off":
+                self._report(scope, stats)
+
+    @staticmethod
+    def _report(scope, stats: query_stats.QueryStats) -> None:
+        route = f"{scope['method']} {scope['path']}"
+        if stats.over_budget:
+            logger.warning("%s ran %d queries (budget %d)", route, stats.statements, stats.budget)
+        if stats.lazy_loads:
+            logger.warning("%s lazy-loaded %s", route, ", ".join(stats.lazy_loads))
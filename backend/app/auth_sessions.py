@@ -0,0 +1,65 @@
+"""Purge expired refresh-token sessions.
+
+Every refresh rotates a session into a new `sessions` row and keeps the old
+one until it expires (so a replayed token can be detected), so the table
+grows with every refresh until expired rows are removed. `purge_expired`
+deletes them in short batches, each in its own transaction, so the purge
+never holds locks that a login or refresh would wait on. It runs on a
+daily schedule (cdk/stacks/app_stack.py) and from the command line:
+
+    python -m app.auth_sessions purge [--batch-size 5000]
+"""
+
+import argparse
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.models.auth_session import AuthSession
+
+
+BATCH_SIZE = 5000
+
+
+def purge_expired(db: Session, now: datetime | None = None, batch_size: int = BATCH_SIZE) -> int:
+    """Delete sessions that expired before `now`; return how many."""
+    now = now or datetime.now(timezone.utc)
+    purged = 0
+    while True:
+        batch = select(AuthSession.id).where(AuthSession.expires_at < now).limit(batch_size).scalar_subquery()
+        result = db.execute(
+            delete(AuthSession).where(AuthSession.id.in_(batch)),
+            execution_options={"synchronize_session": False},
+        )
+        db.commit()
+        purged += result.rowcount
+        if result.rowcount < batch_size:
+            return purged
+
+
+def handler(event, context):
+    from app.db.session import SessionLocal
+
+    batch_size = (event or {}).get("batch_size") or BATCH_SIZE
+    db = SessionLocal()
+    try:
+        purged = purge_expired(db, batch_size=int(batch_size))
+    finally:
+        db.close()
+    return {"status": "ok", "purged": purged}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.auth_sessions")
+    sub = parser.add_subparsers(dest="command", required=True)
+    purge_cmd = sub.add_parser("purge", help="delete expired sessions")
+    purge_cmd.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    if args.command == "purge":
+        print(handler({"batch_size": args.batch_size}, None))
+
+
+if __name__ == "__main__":
+    main()
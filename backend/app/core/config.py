@@ -16,6 +16,80 @@ class Settings(BaseSettings):
     jwt_secret: str
     access_token_expires_minutes: int = 43200
     refresh_token_expires_days: int = 30
+    # A rotated refresh token presented again within this window is treated
+    # as a retry; later, as theft (its whole session family is revoked).
+    refresh_reuse_grace_seconds: int = 30
+
+    # Connection pool. `db_runtime` picks a profile from app.db.session
+    # (lambda | container | migration; auto = lambda when running on Lambda,
+    # else container); the db_pool_* / db_max_overflow values override it.
+    # db_null_pool disables client-side pooling, for use behind a proxy.
+    db_runtime: str = "auto"
+    db_pool_size: int | None = None
+    db_max_overflow: int | None = None
+    db_pool_timeout: float | None = None
+    db_pool_recycle_seconds: int = 300
+    db_null_pool: bool = False
+
+    # Per-request statement count and DB time, sent as a Server-Timing
+    # header. query_budget_mode: off | warn (log requests over query_budget
+    # statements or that lazy-load a relationship) | raise (fail them) |
+    # auto (warn in dev/test, off elsewhere). 0 disables the budget.
+    server_timing: bool = True
+    query_budget: int = 20
+    query_budget_mode: str = "auto"
+
+    # /metrics (Prometheus text) and /health/pool require
+    # `Authorization: Bearer <metrics_token>`; outside dev and test they
+    # return 404 while it is unset. On Lambda every request is also logged
+    # as an EMF line under metrics_namespace.
+    metrics_token: str | None = None
+    metrics_namespace: str = "Groomly"
+
+    # argon2 cost parameters (defaults match passlib's, so existing hashes
+    # stay current); changing them rehashes each password at its next login.
+    # Hashing runs on its own password_hash_workers threads; beyond
+    # password_hash_queue waiting requests, or after the timeout, login and
+    # register answer 503.
+    password_hash_time_cost: int = 3
+    password_hash_memory_kib: int = 65536
+    password_hash_parallelism: int = 4
+    password_hash_workers: int = 2
+    password_hash_queue: int = 16
+    password_hash_timeout_seconds: float = 5.0
+
+    # Authenticated principals (user id -> shop id) cached per process so
+    # most requests resolve the tenant without touching the database.
+    principal_cache_size: int = 1024
+    principal_cache_ttl_seconds: int = 60
+
+    # Report responses cached per shop and data version. 0 entries disables
+    # the cache; a redis:// URL shares it across processes instead of keeping
+    # it in memory, and is required for any caching on Lambda.
+    report_cache_size: int = 512
+    report_cache_ttl_seconds: int = 60
+    report_cache_url: str | None = None
+
+    # On Lambda, Mangum buffers a whole response and API Gateway caps it at
+    # 6 MB, so CSV exports estimated above this size are refused with 413
+    # there instead of failing after the body is built. Elsewhere exports
+    # stream and have no cap.
+    export_max_buffered_bytes: int = 5_000_000
+
+    # IANA zone given to new shops; each shop's own `timezone` then decides
+    # which local calendar day an invoice belongs to in reports.
+    report_timezone: str = "Asia/Kolkata"
+
+    # Monthly invoice partitions (app.partitions): how many months ahead to
+    # create, and how many past months to keep attached (None keeps all;
+    # detached months stay in the database as plain tables).
+    invoice_partitions_ahead_months: int = 3
+    invoice_retention_months: int | None = None
+    # How far from now a client-supplied invoice `issued_at` may be. Bills
+    # outside this window would land in the default partition (or a month
+    # already detached) and are rejected.
+    invoice_max_backdate_days: int = 90
+    invoice_max_future_skew_seconds: int = 300
 
     # Comma-separated string or JSON array string.
     # Kept as string to avoid pydantic-settings auto JSON decoding errors.
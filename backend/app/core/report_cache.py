@@ -0,0 +1,180 @@
+"""Per-shop cache for report responses.
+
+Every write that can change a shop's reports (invoices, customers, services,
+shop settings) calls `bump(shop_id)` after it commits. Cache keys include the
+shop's current data version, so a bump makes all of that shop's cached
+reports unreachable at once; they then age out of the backend on their own.
+
+The default backend is an in-process LRU. With several processes (e.g. Lambda
+containers) a bump is only seen by the process that made it, so other
+processes can serve a report up to `report_cache_ttl_seconds` old, so on
+Lambda the cache stays off unless `report_cache_url` points at Redis (or
+anything speaking its protocol) to share versions and entries between
+processes. The Redis client is asyncio-based, so a lookup never blocks the
+event loop the report routes run on.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import Any, Protocol
+
+from fastapi import Response
+from pydantic import BaseModel
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend(Protocol):
+    name: str
+
+    async def get(self, key: str) -> bytes | None: ...
+
+    async def set(self, key: str, value: bytes) -> None: ...
+
+    async def version(self, shop_key: str) -> int: ...
+
+    async def bump(self, shop_key: str) -> None: ...
+
+    def size(self) -> int | None: ...
+
+
+class MemoryBackend:
+    name = "memory"
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        # One counter per shop; never evicted, or a shop could fall back to
+        # a version whose entries are still cached.
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> bytes | None:
+        return self._entries.get(key)
+
+    async def set(self, key: str, value: bytes) -> None:
+        self._entries.set(key, value)
+
+    async def version(self, shop_key: str) -> int:
+        return self._versions.get(shop_key, 0)
+
+    async def bump(self, shop_key: str) -> None:
+        with self._lock:
+            self._versions[shop_key] = self._versions.get(shop_key, 0) + 1
+
+    def size(self) -> int | None:
+        return len(self._entries)
+
+
+class RedisBackend:
+    name = "redis"
+
+    def __init__(self, url: str, ttl: float):
+        # Imported here: only processes configured for Redis pay for it.
+        from redis import asyncio as redis
+
+        self._client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self._ttl = max(1, int(ttl))
+
+    async def get(self, key: str) -> bytes | None:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: bytes) -> None:
+        await self._client.set(key, value, ex=self._ttl)
+
+    async def version(self, shop_key: str) -> int:
+        return int(await self._client.get(shop_key) or 0)
+
+    async def bump(self, shop_key: str) -> None:
+        await self._client.incr(shop_key)
+
+    def size(self) -> int | None:
+        return None
+
+
+class ReportCache:
+    def __init__(self, backend: CacheBackend | None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def _count(self, field: str) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    @staticmethod
+    def _shop_key(shop_id: uuid.UUID) -> str:
+        return f"report:v:{shop_id}"
+
+    async def lookup(self, shop_id: uuid.UUID, route: str, params: dict[str, Any]) -> tuple[str | None, Response | None]:
+        """Return (key, cached response). Pass `key` to `store` on a miss.
+
+        The key pins the data version read here, so a write that lands while
+        the report is being computed cannot be cached under the newer version.
+        """
+        if self.backend is None:
+            return None, None
+        try:
+            version = await self.backend.version(self._shop_key(shop_id))
+            digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+            key = f"report:{shop_id}:{version}:{route}:{digest}"
+            raw = await self.backend.get(key)
+        except Exception:
+            logger.warning("report cache lookup failed", exc_info=True)
+            self._count("errors")
+            return None, None
+        if raw is None:
+            self._count("misses")
+            return key, None
+        self._count("hits")
+        return key, Response(content=raw, media_type="application/json")
+
+    async def store(self, key: str | None, response: BaseModel) -> BaseModel:
+        if key is not None:
+            try:
+                await self.backend.set(key, response.model_dump_json().encode("utf-8"))
+            except Exception:
+                logger.warning("report cache store failed", exc_info=True)
+                self._count("errors")
+        return response
+
+    async def bump(self, shop_id: uuid.UUID) -> None:
+        if self.backend is None:
+            return
+        try:
+            await self.backend.bump(self._shop_key(shop_id))
+        except Exception:
+            logger.warning("report cache bump failed", exc_info=True)
+            self._count("errors")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "backend": self.backend.name if self.backend is not None else "off",
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "entries": self.backend.size() if self.backend is not None else 0,
+        }
+
+
+def _make_backend() -> CacheBackend | None:
+    if settings.report_cache_size <= 0:
+        return None
+    if settings.report_cache_url:
+        return RedisBackend(settings.report_cache_url, settings.report_cache_ttl_seconds)
+    if os.getenv("AWS_LAMBDA_FUNCTION_NAME"):
+        # Containers would not see each other's bumps.
+        return None
+    return MemoryBackend(settings.report_cache_size, settings.report_cache_ttl_seconds)
+
+
+report_cache = ReportCache(_make_backend())
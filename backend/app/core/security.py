@@ -1,43 +1,148 @@
+import asyncio
+import base64
+import functools
 import hashlib
+import hmac
+import logging
 import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 
-from jose import jwt
-from passlib.context import CryptContext
-
 from app.core.config import settings
 
 
-# Use argon2 to avoid bcrypt backend/version incompatibilities in containers
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+logger = logging.getLogger(__name__)
+
+
+# passlib/argon2 and python-jose (which pulls in `cryptography`) are imported
+# on first use rather than at startup; only the auth routes hash passwords,
+# and /health or a preflight never touch a token.
+
+
+@functools.cache
+def _pwd_context():
+    from passlib.context import CryptContext
+
+    # Use argon2 to avoid bcrypt backend/version incompatibilities in containers.
+    # Hashes made with other cost parameters still verify, and are reported
+    # as needing an update so login can rehash them.
+    return CryptContext(
+        schemes=["argon2"],
+        deprecated="auto",
+        argon2__rounds=settings.password_hash_time_cost,
+        argon2__memory_cost=settings.password_hash_memory_kib,
+        argon2__parallelism=settings.password_hash_parallelism,
+    )
 
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return _pwd_context().hash(password)
 
 
 def verify_password(password: str, password_hash: str) -> bool:
-    return pwd_context.verify(password, password_hash)
+    return _pwd_context().verify(password, password_hash)
+
+
+def verify_and_update(password: str, password_hash: str) -> tuple[bool, str | None]:
+    """(valid, new hash if the stored one uses outdated parameters)."""
+    return _pwd_context().verify_and_update(password, password_hash)
+
+
+class HashingBusy(Exception):
+    """The password hashing queue is full, or the wait for a slot timed out."""
+
+
+class HashPool:
+    """A small dedicated executor for argon2, kept apart from the request threadpool.
 
+    argon2 releases the GIL, so worker threads hash in parallel. Work beyond
+    `workers + queue_limit` is rejected at once instead of queueing, and a
+    caller stops waiting after `timeout` seconds (a job still queued is
+    cancelled), so a burst of logins costs at most `workers` cores and
+    never ties up the threads that serve billing.
+    """
 
-def create_access_token(*, subject: str) -> tuple[str, datetime]:
+    def __init__(self, workers: int, queue_limit: int, timeout: float):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="argon2")
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self.rejected = 0
+        self.timeouts = 0
+
+    async def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            logger.warning("password hashing queue full; rejecting request")
+            raise HashingBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise HashingBusy() from None
+
+
+hash_pool = HashPool(
+    workers=settings.password_hash_workers,
+    queue_limit=settings.password_hash_queue,
+    timeout=settings.password_hash_timeout_seconds,
+)
+
+
+def create_access_token(*, subject: str, shop_id: str) -> tuple[str, datetime]:
     expires_at = datetime.now(timezone.utc) + timedelta(
         minutes=settings.access_token_expires_minutes
     )
     payload = {
         "sub": subject,
+        "shop_id": shop_id,
         "exp": expires_at,
         "iat": datetime.now(timezone.utc),
         "aud": "barber-app",
         "iss": "barber-app",
     }
+    from jose import jwt
+
     token = jwt.encode(payload, settings.jwt_secret, algorithm="HS256")
     return token, expires_at
 
 
+def decode_access_token(token: str) -> dict:
+    """Verify signature, audience and issuer; raise ValueError if any fail."""
+    from jose import JWTError, jwt
+
+    try:
+        return jwt.decode(
+            token,
+            settings.jwt_secret,
+            algorithms=["HS256"],
+            audience="barber-app",
+            issuer="barber-app",
+        )
+    except JWTError as e:
+        raise ValueError("invalid access token") from e
+
+
 def create_refresh_token() -> str:
     return secrets.token_urlsafe(48)
 
 
 def hash_refresh_token(token: str) -> str:
     return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def successor_refresh_token(token: str) -> str:
+    """The token that `token` rotates into.
+
+    Derived rather than random so that presenting `token` again (a retried
+    or racing refresh) yields the same successor instead of a second one.
+    Only the server can compute it, and only from the previous token.
+    """
+    digest = hmac.new(settings.jwt_secret.encode("utf-8"), token.encode("utf-8"), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
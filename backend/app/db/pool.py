@@ -0,0 +1,112 @@
+"""Connection pools that record checkout telemetry.
+
+Counters are process-wide, one set for the sync engine (`pool_stats`) and
+one for the async engine (`async_pool_stats`); a recreated pool (after
+`dispose()`) keeps adding to the same set.
+"""
+
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.in_use = 0
+            self.in_use_max = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+
+    def checked_out(self, waited: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.in_use_max = max(self.in_use_max, self.in_use)
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def checked_in(self) -> None:
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    def timed_out(self, waited: float) -> None:
+        with self._lock:
+            self.timeouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "in_use": self.in_use,
+                "in_use_max": self.in_use_max,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+            }
+
+
+pool_stats = PoolStats()
+async_pool_stats = PoolStats()
+
+
+class _TimedCheckout:
+    stats = pool_stats
+
+    # `_do_get` covers both waiting for a free connection and opening a new
+    # one, which is the latency a request actually sees.
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timed_out(time.perf_counter() - started)
+            raise
+        self.stats.checked_out(time.perf_counter() - started)
+        return record
+
+    def _do_return_conn(self, record) -> None:
+        self.stats.checked_in()
+        super()._do_return_conn(record)
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class InstrumentedNullPool(_TimedCheckout, NullPool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    stats = async_pool_stats
+
+
+class InstrumentedAsyncNullPool(_TimedCheckout, NullPool):
+    stats = async_pool_stats
+
+
+def pool_status(pool) -> dict:
+    """Live gauges plus the cumulative counters."""
+    status = {"pool": type(pool).__name__, **pool.stats.snapshot()}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            # QueuePool counts overflow from -pool_size; only positive values
+            # are connections beyond the pool size.
+            overflow=max(0, pool.overflow()),
+        )
+    return status
@@ -0,0 +1,113 @@
+"""Per-request statement counts and database time.
+
+`ServerTimingMiddleware` (app.api.server_timing) opens a `QueryStats` for
+each request; the engine and session events below add to whichever one is
+current. Sync routes run in a worker thread with a copy of the request's
+context and async routes run their statements in a greenlet that shares it,
+so both paths record into the same object.
+
+With `query_budget_mode = "raise"` the statement that goes over the budget,
+or the lazy load itself, raises instead of running, so the traceback points
+at the loop or attribute access responsible.
+"""
+
+import contextvars
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from app.core.config import settings
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+@dataclass(slots=True)
+class QueryStats:
+    budget: int
+    mode: str
+    statements: int = 0
+    seconds: float = 0.0
+    lazy_loads: list[str] = field(default_factory=list)
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget > 0 and self.statements > self.budget
+
+
+_current: contextvars.ContextVar[QueryStats | None] = contextvars.ContextVar("query_stats", default=None)
+
+
+def budget_mode() -> str:
+    """off | warn | raise; auto warns in dev and test and is off elsewhere."""
+    mode = settings.query_budget_mode
+    if mode == "auto":
+        return "warn" if settings.environment in ("dev", "test") else "off"
+    return mode
+
+
+def start() -> tuple[QueryStats, contextvars.Token]:
+    stats = QueryStats(budget=settings.query_budget, mode=budget_mode())
+    return stats, _current.set(stats)
+
+
+def stop(token: contextvars.Token) -> None:
+    _current.reset(token)
+
+
+def suspend() -> contextvars.Token:
+    """Stop recording into the current request's stats, e.g. for a background
+    task that runs after its response; undo with `stop`."""
+    return _current.set(None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    stats = _current.get()
+    if stats is None:
+        return
+    if stats.mode == "raise" and 0 < stats.budget <= stats.statements:
+        raise QueryBudgetExceeded(f"statement {stats.statements + 1} exceeds the query budget of {stats.budget}")
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    stats = _current.get()
+    started = conn.info.get("query_started")
+    if stats is None or not started:
+        return
+    stats.statements += 1
+    stats.seconds += time.perf_counter() - started.pop()
+
+
+def _handle_error(exception_context) -> None:
+    # A failed statement never reaches after_cursor_execute.
+    conn = exception_context.connection
+    started = conn.info.get("query_started") if conn is not None else None
+    if started:
+        started.pop()
+
+
+def instrument(engine) -> None:
+    """Attach the statement timers to a (sync) Engine."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _detect_lazy_load(state: ORMExecuteState) -> None:
+    stats = _current.get()
+    # lazy_loaded_from raises for anything but a SELECT.
+    if stats is None or not state.is_select or state.lazy_loaded_from is None:
+        return
+    # is_relationship_load is also true for selectinload/subqueryload;
+    # only a lazy load carries the instance it was loaded from.
+    mapper = state.lazy_loaded_from.mapper
+    target = state.bind_arguments.get("mapper")
+    name = f"{mapper.class_.__name__} -> {target.class_.__name__ if target is not None else '?'}"
+    if stats.mode == "raise":
+        raise QueryBudgetExceeded(f"lazy load of {name}; eager-load it in the query")
+    stats.lazy_loads.append(name)
@@ -1,19 +1,113 @@
+import os
+from dataclasses import dataclass, replace
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.db.pool import (
+    InstrumentedAsyncNullPool,
+    InstrumentedAsyncQueuePool,
+    InstrumentedNullPool,
+    InstrumentedQueuePool,
+)
+from app.db.query_stats import instrument
 
 
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
-    pool_size=1,
-    max_overflow=0,
-    pool_recycle=300,
-    pool_timeout=30,
-)
+@dataclass(frozen=True)
+class PoolProfile:
+    pool_size: int
+    max_overflow: int
+    pool_timeout: float
+    null_pool: bool = False
+
+
+POOL_PROFILES = {
+    # One request per execution environment at a time; a second connection
+    # would only add load on the database. Pooled by the async engine only
+    # (see below).
+    "lambda": PoolProfile(pool_size=1, max_overflow=0, pool_timeout=30),
+    # uvicorn runs sync routes on a 40-thread pool; keep most of them busy
+    # without opening a connection per thread.
+    "container": PoolProfile(pool_size=10, max_overflow=10, pool_timeout=10),
+    # One-shot processes (migrations, rebuilds): nothing worth keeping open.
+    "migration": PoolProfile(pool_size=1, max_overflow=0, pool_timeout=30, null_pool=True),
+}
+
+
+def resolve_runtime() -> str:
+    runtime = settings.db_runtime
+    if runtime == "auto":
+        runtime = "lambda" if os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "container"
+    if runtime not in POOL_PROFILES:
+        raise ValueError(f"Unknown db_runtime {runtime!r}; expected one of {', '.join(POOL_PROFILES)} or auto")
+    return runtime
+
+
+def pool_profile(runtime: str | None = None) -> PoolProfile:
+    """The profile for `runtime`, with any explicit settings applied on top."""
+    base = POOL_PROFILES[runtime or resolve_runtime()]
+    return PoolProfile(
+        pool_size=settings.db_pool_size if settings.db_pool_size is not None else base.pool_size,
+        max_overflow=settings.db_max_overflow if settings.db_max_overflow is not None else base.max_overflow,
+        pool_timeout=settings.db_pool_timeout if settings.db_pool_timeout is not None else base.pool_timeout,
+        null_pool=settings.db_null_pool or base.null_pool,
+    )
+
+
+def make_engine(profile: PoolProfile, url: str | None = None):
+    url = url or settings.database_url
+    if profile.null_pool:
+        # Behind a connection proxy (e.g. RDS Proxy / PgBouncer) pooling
+        # happens there; each checkout opens a fresh, cheap proxy connection.
+        return create_engine(url, poolclass=InstrumentedNullPool)
+    return create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_pre_ping=True,
+        pool_size=profile.pool_size,
+        max_overflow=profile.max_overflow,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        pool_timeout=profile.pool_timeout,
+    )
+
+
+def make_async_engine(profile: PoolProfile, url: str | None = None):
+    """Async twin of `make_engine`; psycopg serves both from the same URL."""
+    url = url or settings.database_url
+    if profile.null_pool:
+        return create_async_engine(url, poolclass=InstrumentedAsyncNullPool)
+    return create_async_engine(
+        url,
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_pre_ping=True,
+        pool_size=profile.pool_size,
+        max_overflow=profile.max_overflow,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        pool_timeout=profile.pool_timeout,
+    )
+
+
+_runtime = resolve_runtime()
+
+# On Lambda the container's one pooled connection belongs to the async
+# engine, which serves every hot route. The sync engine (users, exports and
+# the scheduled jobs) opens a connection per session and closes it after,
+# so a warm container keeps one idle connection, not one per engine.
+_sync_profile = pool_profile(_runtime)
+if _runtime == "lambda":
+    _sync_profile = replace(_sync_profile, null_pool=True)
+engine = make_engine(_sync_profile)
+instrument(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Used by the `async def` routes. Connections are opened on first use, so a
+# process only holds connections in the pools it actually uses.
+async_engine = make_async_engine(pool_profile(_runtime))
+instrument(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 def get_db():
     db = SessionLocal()
@@ -21,3 +115,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,9 +1,16 @@
-from fastapi import FastAPI
+import secrets
+
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from mangum import Mangum
 
 from app.core.config import settings
-from app.api.router import api_router
+from app.api.metrics import MetricsMiddleware, render, request_metrics
+from app.api.router import mount_api
+from app.api.server_timing import ServerTimingMiddleware
+from app.db.pool import pool_status
+from app.db.session import async_engine, engine
 
 
 app = FastAPI(title=settings.app_name)
@@ -15,6 +22,21 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"]
 )
+# Added last, so they wrap CORS handling too; metrics is the outermost.
+app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+
+def require_metrics_token(request: Request) -> None:
+    # Outside dev and test these endpoints are served only with a token;
+    # without one configured they do not exist.
+    if not settings.metrics_token:
+        if settings.environment not in ("dev", "test"):
+            raise HTTPException(status_code=404, detail="Not Found")
+        return
+    supplied = request.headers.get("authorization", "").removeprefix("Bearer ")
+    if not secrets.compare_digest(supplied, settings.metrics_token):
+        raise HTTPException(status_code=401, detail="Not authenticated")
 
 
 @app.get("/health")
@@ -22,7 +44,28 @@ def health():
     return {"status": "ok"}
 
 
-app.include_router(api_router, prefix="/api")
+@app.get("/health/pool", dependencies=[Depends(require_metrics_token)])
+def health_pool():
+    # Connection pool gauges and checkout wait counters for this process.
+    return {"sync": pool_status(engine.pool), "async": pool_status(async_engine.sync_engine.pool)}
+
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+async def metrics():
+    # async def: renders on the event loop, the only thread that updates
+    # the counters.
+    pools = {"sync": pool_status(engine.pool), "async": pool_status(async_engine.sync_engine.pool)}
+    return PlainTextResponse(render(request_metrics, pools), media_type="text/plain; version=0.0.4")
+
+
+mount_api(app)
 
 # Lambda entrypoint for API Gateway + Lambda.
-handler = Mangum(app)
+_mangum = Mangum(app)
+
+
+def handler(event, context):
+    try:
+        return _mangum(event, context)
+    finally:
+        request_metrics.flush_emf()
@@ -1,17 +1,31 @@
 from app.models.user import User
+from app.models.auth_session import AuthSession
 from app.models.shop import Shop
 from app.models.service import Service
 from app.models.customer import Customer
 from app.models.invoice import Invoice
+from app.models.invoice_idempotency_key import InvoiceIdempotencyKey
+from app.models.invoice_locator import InvoiceLocator
 from app.models.invoice_item import InvoiceItem
 from app.models.payment import Payment
+from app.models.shop_daily_sales import ShopDailySales
+from app.models.shop_hourly_sales import ShopHourlySales
+from app.models.customer_stats import CustomerStats
+from app.models.service_daily_stats import ServiceDailyStats
 
 __all__ = [
     "User",
+    "AuthSession",
     "Shop",
     "Service",
     "Customer",
     "Invoice",
+    "InvoiceIdempotencyKey",
+    "InvoiceLocator",
     "InvoiceItem",
     "Payment",
+    "ShopDailySales",
+    "ShopHourlySales",
+    "CustomerStats",
+    "ServiceDailyStats",
 ]
@@ -1,7 +1,7 @@
 import uuid
 from datetime import date, datetime, timezone
 
-from sqlalchemy import Boolean, Date, DateTime, ForeignKey, String, Text, UniqueConstraint
+from sqlalchemy import Boolean, Date, DateTime, ForeignKey, Index, String, Text, UniqueConstraint, func, literal_column
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -29,6 +29,38 @@ class Customer(Base):
     notes: Mapped[str | None] = mapped_column(Text, nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
 
     shop = relationship("Shop", back_populates="customers")
     invoices = relationship("Invoice", back_populates="customer")
+
+
+# Keyset pagination over a shop's customers, newest first.
+Index(
+    "ix_customers_shop_created_at_id",
+    Customer.shop_id,
+    Customer.created_at.desc(),
+    Customer.id.desc(),
+)
+
+# pg_trgm indexes behind customer search (ILIKE / similarity on name,
+# substring match on the digits of phone).
+Index(
+    "ix_customers_name_trgm",
+    Customer.name,
+    postgresql_using="gin",
+    postgresql_ops={"name": "gin_trgm_ops"},
+)
+Index(
+    "ix_customers_phone_digits_trgm",
+    func.regexp_replace(
+        Customer.phone, literal_column(r"'\D'"), literal_column("''"), literal_column("'g'")
+    ).label("phone_digits"),
+    postgresql_using="gin",
+    postgresql_ops={"phone_digits": "gin_trgm_ops"},
+)
@@ -0,0 +1,35 @@
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, Integer
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class CustomerStats(Base):
+    """Lifetime invoice totals for one customer.
+
+    Maintained incrementally by `app.rollups` in the same transaction as each
+    invoice write; customers without any invoice have no row.
+    """
+
+    __tablename__ = "customer_stats"
+
+    customer_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("customers.id"), primary_key=True)
+    shop_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("shops.id"), nullable=False)
+
+    bill_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    gross_paise: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    discount_paise: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    net_paise: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    first_invoice_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    last_invoice_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+
+
+# Dormant customers: an index range scan per shop, oldest visit first.
+Index("ix_customer_stats_shop_last_invoice_at", CustomerStats.shop_id, CustomerStats.last_invoice_at)
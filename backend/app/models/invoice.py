@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime, timezone
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -9,22 +9,57 @@ from app.db.base import Base
 
 
 class Invoice(Base):
+    """A bill.
+
+    Range-partitioned by month on `issued_at` (see app.partitions), so the
+    primary key, and the foreign keys items and payments hold on it, include
+    `issued_at`; filtering on it lets queries skip whole months. Lookups by
+    id go through InvoiceLocator, and client idempotency keys live in
+    InvoiceIdempotencyKey, since neither can be unique across partitions here.
+    """
+
     __tablename__ = "invoices"
+    __table_args__ = {"postgresql_partition_by": "RANGE (issued_at)"}
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     shop_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("shops.id"), nullable=False, index=True)
     customer_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("customers.id"), nullable=True, index=True)
 
-    issued_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    issued_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, default=lambda: datetime.now(timezone.utc), nullable=False
+    )
     status: Mapped[str] = mapped_column(String(20), nullable=False, default="paid")
 
     subtotal_paise: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     discount_paise: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     total_paise: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
 
+    # Method of the first payment (cash|upi), copied at creation so listings
+    # and reports never have to look at `payments` for it.
+    payment_method: Mapped[str] = mapped_column(String(20), nullable=False, default="cash")
+
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
 
     shop = relationship("Shop", back_populates="invoices")
     customer = relationship("Customer", back_populates="invoices")
-    items = relationship("InvoiceItem", back_populates="invoice")
-    payments = relationship("Payment", back_populates="invoice")
+    items = relationship("InvoiceItem", back_populates="invoice", order_by="InvoiceItem.created_at")
+    payments = relationship("Payment", back_populates="invoice", order_by="Payment.created_at")
+
+
+# Keyset pagination and range scans over a shop's invoices, newest first.
+Index(
+    "ix_invoices_shop_issued_at_id",
+    Invoice.shop_id,
+    Invoice.issued_at.desc(),
+    Invoice.id.desc(),
+)
+
+
+# UPI reconciliation: the same ordering, UPI bills only.
+Index(
+    "ix_invoices_shop_upi_issued_at_id",
+    Invoice.shop_id,
+    Invoice.issued_at.desc(),
+    Invoice.id.desc(),
+    postgresql_where=Invoice.payment_method == "upi",
+)
@@ -0,0 +1,23 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import DateTime
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class InvoiceLocator(Base):
+    """Which monthly partition an invoice id lives in.
+
+    `invoices` is partitioned on issued_at, so a lookup by id alone would
+    probe every month's primary key index. This narrow, unpartitioned table
+    maps the id to its issued_at (one index probe), and the invoice is then
+    read from that month only. Written in the same statement as the invoice.
+    """
+
+    __tablename__ = "invoice_locators"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    issued_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime, timezone
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String
+from sqlalchemy import DateTime, ForeignKeyConstraint, Integer, String
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -10,9 +10,19 @@ from app.db.base import Base
 
 class Payment(Base):
     __tablename__ = "payments"
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["invoice_id", "issued_at"],
+            ["invoices.id", "invoices.issued_at"],
+            name="fk_payments_invoice_id_invoices",
+        ),
+        {"postgresql_partition_by": "RANGE (issued_at)"},
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    invoice_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("invoices.id"), nullable=False, index=True)
+    invoice_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False, index=True)
+    # The invoice's issued_at, copied so payments share its monthly partitions.
+    issued_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True, nullable=False)
 
     method: Mapped[str] = mapped_column(String(20), nullable=False)  # cash|upi|card|other
     amount_paise: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -0,0 +1,28 @@
+import uuid
+from datetime import date, datetime, timezone
+
+from sqlalchemy import BigInteger, Date, DateTime, ForeignKey, Integer
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class ServiceDailyStats(Base):
+    """Per-service line item totals for one shop and local calendar day.
+
+    Maintained incrementally by `app.rollups` in the same transaction as each
+    invoice write; never edited directly by routes.
+    """
+
+    __tablename__ = "service_daily_stats"
+
+    shop_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("shops.id"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    service_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("services.id"), primary_key=True)
+
+    qty: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    revenue_paise: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    invoice_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
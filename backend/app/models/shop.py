@@ -5,6 +5,7 @@ from sqlalchemy import DateTime, ForeignKey, String
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from app.core.config import settings
 from app.db.base import Base
 
 
@@ -16,6 +17,12 @@ class Shop(Base):
 
     name: Mapped[str] = mapped_column(String(200), nullable=False)
     pan: Mapped[str] = mapped_column(String(20), unique=True, index=True, nullable=False)
+    # IANA zone that defines the shop's local calendar day for reports. New
+    # shops get settings.report_timezone; the column has no server default.
+    timezone: Mapped[str] = mapped_column(String(64), nullable=False, default=lambda: settings.report_timezone)
+    # Set when the zone changes, until the day and hour rollups have been
+    # re-bucketed in it (app.rollups.rebuild_stale_zone).
+    rollups_stale_since: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
 
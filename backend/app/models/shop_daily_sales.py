@@ -0,0 +1,30 @@
+import uuid
+from datetime import date, datetime, timezone
+
+from sqlalchemy import BigInteger, Date, DateTime, ForeignKey, Integer
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class ShopDailySales(Base):
+    """Per-shop sales totals for one local calendar day.
+
+    Maintained incrementally by `app.rollups` in the same transaction as each
+    invoice write; never edited directly by routes.
+    """
+
+    __tablename__ = "shop_daily_sales"
+
+    shop_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("shops.id"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+
+    gross_paise: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    discount_paise: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    net_paise: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    bill_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cash_net_paise: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    upi_net_paise: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
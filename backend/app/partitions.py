@@ -0,0 +1,232 @@
+"""Monthly range partitions for invoices, invoice_items and payments.
+
+All three tables are partitioned on `issued_at` (items and payments carry a
+copy of their invoice's), one partition per UTC month named
+`<table>_pYYYY_MM`, plus a `<table>_default` partition that catches rows
+outside every month created so far. Queries that filter on `issued_at`
+only touch the months in range, and vacuum and index upkeep work one month
+at a time.
+
+`maintain` runs daily (cdk/stacks/app_stack.py):
+
+- it creates the current month and `invoice_partitions_ahead_months` more,
+  so new bills never land in the default partition (rows already there for
+  a month being created are moved into it);
+- with `invoice_retention_months` set, it detaches months older than that.
+  A detached month stays in the database as a plain table, to archive or
+  drop by hand. Reports keep their history through the rollups, but
+  `app.rollups rebuild` only sees attached months.
+
+    python -m app.partitions maintain [--ahead-months 3] [--retention-months 36]
+"""
+
+import argparse
+import re
+from datetime import date, datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+
+PARTITIONED_TABLES = ("invoices", "invoice_items", "payments")
+# Tables whose rows reference an invoice partition of the same month.
+CHILD_TABLES = ("invoice_items", "payments")
+
+# Creating or detaching a partition takes a lock on the parent table; give up
+# rather than queue behind a long report and block the writes queued after it.
+LOCK_TIMEOUT = "5s"
+
+
+def month_floor(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, n: int) -> date:
+    year, index = divmod(month.year * 12 + month.month - 1 + n, 12)
+    return date(year, index + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+def _bound(month: date) -> str:
+    # Explicit UTC offset: a bare date would be read in the session's zone.
+    return f"{month.isoformat()} 00:00:00+00"
+
+
+def attached_months(db: Session, table: str) -> set[date]:
+    names = db.scalars(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:parent AS regclass)"
+        ),
+        {"parent": table},
+    )
+    months = set()
+    for name in names:
+        match = re.fullmatch(rf"{table}_p(\d{{4}})_(\d{{2}})", name)
+        if match:
+            months.add(date(int(match[1]), int(match[2]), 1))
+    return months
+
+
+def _in_default(db: Session, month: date) -> bool:
+    return db.scalar(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM invoices_default WHERE issued_at >= :lo AND issued_at < :hi) "
+            "OR EXISTS (SELECT 1 FROM invoice_items_default WHERE issued_at >= :lo AND issued_at < :hi) "
+            "OR EXISTS (SELECT 1 FROM payments_default WHERE issued_at >= :lo AND issued_at < :hi)"
+        ),
+        {"lo": _bound(month), "hi": _bound(add_months(month, 1))},
+    )
+
+
+def _create_month(db: Session, table: str, month: date) -> str:
+    name = partition_name(table, month)
+    db.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{_bound(month)}') TO ('{_bound(add_months(month, 1))}')"
+        )
+    )
+    return name
+
+
+def _create_month_from_default(db: Session, tables: list[str], month: date) -> list[str]:
+    # Postgres refuses to create a month while the default partition holds
+    # rows for it, so the defaults are detached, the month created, its rows
+    # moved over (invoices first, for the foreign keys) and the defaults
+    # reattached, all in the caller's transaction.
+    for table in CHILD_TABLES:
+        db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {table}_default"))
+        _drop_invoice_foreign_keys(db, f"{table}_default")
+    db.execute(text("ALTER TABLE invoices DETACH PARTITION invoices_default"))
+
+    created = [_create_month(db, table, month) for table in tables]
+    bounds = {"lo": _bound(month), "hi": _bound(add_months(month, 1))}
+    for table in PARTITIONED_TABLES:
+        db.execute(
+            text(
+                f"WITH moved AS (DELETE FROM {table}_default WHERE issued_at >= :lo AND issued_at < :hi "
+                f"RETURNING *) INSERT INTO {table} SELECT * FROM moved"
+            ),
+            bounds,
+        )
+
+    # Attaching recreates the children's foreign keys to invoices.
+    for table in PARTITIONED_TABLES:
+        db.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {table}_default DEFAULT"))
+    return created
+
+
+def ensure_partitions(db: Session, first: date, last: date) -> list[str]:
+    """Create the monthly partitions for `first`..`last` (inclusive) that are
+    missing; return their names. Each month commits on its own."""
+    existing = {table: attached_months(db, table) for table in PARTITIONED_TABLES}
+    created = []
+    month = month_floor(first)
+    while month <= last:
+        missing = [table for table in PARTITIONED_TABLES if month not in existing[table]]
+        if missing:
+            db.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+            if _in_default(db, month):
+                created += _create_month_from_default(db, missing, month)
+            else:
+                created += [_create_month(db, table, month) for table in missing]
+            db.commit()
+        month = add_months(month, 1)
+    return created
+
+
+def _drop_invoice_foreign_keys(db: Session, table_name: str) -> None:
+    # A detached partition keeps its copy of the parent's foreign key to
+    # invoices, which would stop that month of invoices being detached.
+    names = db.scalars(
+        text(
+            "SELECT conname FROM pg_constraint WHERE conrelid = CAST(:t AS regclass) "
+            "AND contype = 'f' AND confrelid = CAST('invoices' AS regclass)"
+        ),
+        {"t": table_name},
+    ).all()
+    for name in names:
+        db.execute(text(f'ALTER TABLE {table_name} DROP CONSTRAINT "{name}"'))
+
+
+def detach_old(db: Session, retention_months: int, today: date) -> list[str]:
+    """Detach every month that ended more than `retention_months` months
+    before `today`'s month; return the detached tables. One transaction per
+    month, items and payments before their invoices."""
+    cutoff = add_months(month_floor(today), -retention_months)
+    attached = {table: attached_months(db, table) for table in PARTITIONED_TABLES}
+    detached = []
+    for month in sorted(m for m in attached["invoices"] if m < cutoff):
+        db.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+        for table in CHILD_TABLES:
+            if month in attached[table]:
+                name = partition_name(table, month)
+                db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+                _drop_invoice_foreign_keys(db, name)
+                detached.append(name)
+        name = partition_name("invoices", month)
+        db.execute(text(f"ALTER TABLE invoices DETACH PARTITION {name}"))
+        detached.append(name)
+        # Keys and locators of detached bills would only point at rows that
+        # are gone.
+        end = {"end": datetime.combine(add_months(month, 1), datetime.min.time(), timezone.utc)}
+        db.execute(text("DELETE FROM invoice_idempotency_keys WHERE issued_at < :end"), end)
+        db.execute(text("DELETE FROM invoice_locators WHERE issued_at < :end"), end)
+        db.commit()
+    return detached
+
+
+def maintain(
+    db: Session,
+    today: date | None = None,
+    ahead_months: int | None = None,
+    retention_months: int | None = None,
+) -> dict[str, list[str]]:
+    today = today or datetime.now(timezone.utc).date()
+    if ahead_months is None:
+        ahead_months = settings.invoice_partitions_ahead_months
+    if retention_months is None:
+        retention_months = settings.invoice_retention_months
+
+    current = month_floor(today)
+    created = ensure_partitions(db, current, add_months(current, ahead_months))
+    detached = detach_old(db, retention_months, today) if retention_months is not None else []
+    return {"created": created, "detached": detached}
+
+
+def handler(event, context):
+    from app.db.session import SessionLocal
+
+    event = event or {}
+    db = SessionLocal()
+    try:
+        result = maintain(
+            db,
+            ahead_months=event.get("ahead_months"),
+            retention_months=event.get("retention_months"),
+        )
+    finally:
+        db.close()
+    return {"status": "ok", **result}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.partitions")
+    sub = parser.add_subparsers(dest="command", required=True)
+    maintain_cmd = sub.add_parser("maintain", help="create upcoming months, detach expired ones")
+    maintain_cmd.add_argument("--ahead-months", type=int, default=None)
+    maintain_cmd.add_argument("--retention-months", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == "maintain":
+        print(handler({"ahead_months": args.ahead_months, "retention_months": args.retention_months}, None))
+
+
+if __name__ == "__main__":
+    main()
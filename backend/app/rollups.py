@@ -0,0 +1,589 @@
+"""Incrementally maintained reporting rollups.
+
+Invoice writes call `invoice_rollup_statements` and execute the returned
+statements in the same transaction as the invoice insert, so report endpoints
+can read a handful of pre-aggregated rows instead of scanning `invoices`.
+Days and hours are local to each shop's `timezone`. `rebuild` recomputes the
+rollups from the invoice history (after a backfill, or if they ever drift),
+one shop per transaction. `rebuild_stale` re-buckets shops whose zone
+changed, a month of local days per transaction.
+
+    python -m app.rollups rebuild [--shop-id <uuid>]
+    python -m app.rollups rebuild-stale
+"""
+
+import argparse
+import asyncio
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import Date, SmallInteger, cast, delete, extract, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.customer_stats import CustomerStats
+from app.models.invoice import Invoice
+from app.models.invoice_item import InvoiceItem
+from app.models.service_daily_stats import ServiceDailyStats
+from app.models.shop import Shop
+from app.models.shop_daily_sales import ShopDailySales
+from app.models.shop_hourly_sales import ShopHourlySales
+from app.partitions import add_months, month_floor
+
+
+# First key of `rebuild`'s per-shop advisory locks (the second is the shop).
+REBUILD_LOCK_NAMESPACE = 7301
+
+
+@dataclass(frozen=True)
+class InvoiceFacts:
+    """The parts of a saved invoice that feed the rollups."""
+
+    shop_id: uuid.UUID
+    customer_id: uuid.UUID | None
+    issued_at: datetime
+    subtotal_paise: int
+    discount_paise: int
+    total_paise: int
+    payment_method: str  # cash|upi
+    # (service_id, qty, total_paise) per line item; ad-hoc lines are skipped.
+    lines: tuple[tuple[uuid.UUID, int, int], ...] = ()
+
+
+def assume_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        # Naive timestamps are stored as UTC by the session.
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def local_day(issued_at: datetime, tz: str) -> date:
+    return assume_utc(issued_at).astimezone(ZoneInfo(tz)).date()
+
+
+def local_hour(issued_at: datetime, tz: str) -> tuple[date, int]:
+    local = assume_utc(issued_at).astimezone(ZoneInfo(tz))
+    return local.date(), local.hour
+
+
+def whole_local_days(start: datetime, end: datetime, tz: str) -> tuple[date, date] | None:
+    """The local days lying entirely inside [start, end), as [first, stop).
+
+    Returns None when the range does not cover a whole day. The parts of the
+    range before `first` and from `stop` onward must be read from invoices.
+    """
+    zone = ZoneInfo(tz)
+    start_local = assume_utc(start).astimezone(zone)
+    first = start_local.date()
+    if start_local.time() != time.min:
+        first += timedelta(days=1)
+    stop = assume_utc(end).astimezone(zone).date()
+    if first >= stop:
+        return None
+    return first, stop
+
+
+def local_midnight(day: date, tz: str) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=ZoneInfo(tz))
+
+
+@dataclass(frozen=True)
+class LocalDays:
+    """Local days [first, stop) in zone `tz`; a missing end is unbounded."""
+
+    tz: str
+    first: date | None = None
+    stop: date | None = None
+
+    def bound_issued_at(self, stmt, *columns):
+        # Bounds on issued_at itself, so only the partitions in range are read.
+        for column in columns:
+            if self.first is not None:
+                stmt = stmt.where(column >= local_midnight(self.first, self.tz))
+            if self.stop is not None:
+                stmt = stmt.where(column < local_midnight(self.stop, self.tz))
+        return stmt
+
+    def bound_day(self, stmt, column):
+        if self.first is not None:
+            stmt = stmt.where(column >= self.first)
+        if self.stop is not None:
+            stmt = stmt.where(column < self.stop)
+        return stmt
+
+
+def local_day_expr(column):
+    """SQL twin of `local_day`, in the zone of the shop joined as `shops`."""
+    return cast(func.timezone(Shop.timezone, column), Date)
+
+
+def local_hour_expr(column):
+    """SQL twin of the hour returned by `local_hour`."""
+    return cast(extract("hour", func.timezone(Shop.timezone, column)), SmallInteger)
+
+
+def shop_daily_sales_upsert(rows: list[dict]):
+    """Add per-day deltas to `shop_daily_sales`, creating missing days.
+
+    `rows` must hold at most one entry per (shop_id, day).
+    """
+    stmt = pg_insert(ShopDailySales).values(rows)
+    excluded = stmt.excluded
+    table = ShopDailySales.__table__
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.shop_id, table.c.day],
+        set_={
+            "gross_paise": table.c.gross_paise + excluded.gross_paise,
+            "discount_paise": table.c.discount_paise + excluded.discount_paise,
+            "net_paise": table.c.net_paise + excluded.net_paise,
+            "bill_count": table.c.bill_count + excluded.bill_count,
+            "cash_net_paise": table.c.cash_net_paise + excluded.cash_net_paise,
+            "upi_net_paise": table.c.upi_net_paise + excluded.upi_net_paise,
+            "updated_at": excluded.updated_at,
+        },
+    )
+
+
+def customer_stats_upsert(rows: list[dict]):
+    """Add per-customer deltas to `customer_stats`, creating missing customers.
+
+    `rows` must hold at most one entry per customer_id.
+    """
+    stmt = pg_insert(CustomerStats).values(rows)
+    excluded = stmt.excluded
+    table = CustomerStats.__table__
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.customer_id],
+        set_={
+            "bill_count": table.c.bill_count + excluded.bill_count,
+            "gross_paise": table.c.gross_paise + excluded.gross_paise,
+            "discount_paise": table.c.discount_paise + excluded.discount_paise,
+            "net_paise": table.c.net_paise + excluded.net_paise,
+            # Backdated bills can move either end of the range.
+            "first_invoice_at": func.least(table.c.first_invoice_at, excluded.first_invoice_at),
+            "last_invoice_at": func.greatest(table.c.last_invoice_at, excluded.last_invoice_at),
+            "updated_at": excluded.updated_at,
+        },
+    )
+
+
+def shop_hourly_sales_upsert(rows: list[dict]):
+    """Add per-hour deltas to `shop_hourly_sales`, creating missing hours.
+
+    `rows` must hold at most one entry per (shop_id, day, hour).
+    """
+    stmt = pg_insert(ShopHourlySales).values(rows)
+    excluded = stmt.excluded
+    table = ShopHourlySales.__table__
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.shop_id, table.c.day, table.c.hour],
+        set_={
+            "net_paise": table.c.net_paise + excluded.net_paise,
+            "bill_count": table.c.bill_count + excluded.bill_count,
+            "updated_at": excluded.updated_at,
+        },
+    )
+
+
+def service_daily_stats_upsert(rows: list[dict]):
+    """Add per-service deltas to `service_daily_stats`, creating missing rows.
+
+    `rows` must hold at most one entry per (shop_id, day, service_id).
+    """
+    stmt = pg_insert(ServiceDailyStats).values(rows)
+    excluded = stmt.excluded
+    table = ServiceDailyStats.__table__
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.shop_id, table.c.day, table.c.service_id],
+        set_={
+            "qty": table.c.qty + excluded.qty,
+            "revenue_paise": table.c.revenue_paise + excluded.revenue_paise,
+            "invoice_count": table.c.invoice_count + excluded.invoice_count,
+            "updated_at": excluded.updated_at,
+        },
+    )
+
+
+def invoice_rollup_statements(facts: list[InvoiceFacts], tz: str) -> list:
+    """Statements that fold `facts` (all from shops in zone `tz`) into every
+    rollup table."""
+    now = datetime.now(timezone.utc)
+
+    daily: dict[tuple[uuid.UUID, date], dict] = {}
+    hourly: dict[tuple[uuid.UUID, date, int], dict] = {}
+    customers: dict[uuid.UUID, dict] = {}
+    services: dict[tuple[uuid.UUID, date, uuid.UUID], dict] = {}
+    for f in facts:
+        key = (f.shop_id, local_day(f.issued_at, tz))
+        row = daily.get(key)
+        if row is None:
+            row = daily[key] = {
+                "shop_id": key[0],
+                "day": key[1],
+                "gross_paise": 0,
+                "discount_paise": 0,
+                "net_paise": 0,
+                "bill_count": 0,
+                "cash_net_paise": 0,
+                "upi_net_paise": 0,
+                "updated_at": now,
+            }
+        row["gross_paise"] += f.subtotal_paise
+        row["discount_paise"] += f.discount_paise
+        row["net_paise"] += f.total_paise
+        row["bill_count"] += 1
+        if f.payment_method == "cash":
+            row["cash_net_paise"] += f.total_paise
+        elif f.payment_method == "upi":
+            row["upi_net_paise"] += f.total_paise
+
+        hkey = (f.shop_id, *local_hour(f.issued_at, tz))
+        hrow = hourly.get(hkey)
+        if hrow is None:
+            hrow = hourly[hkey] = {
+                "shop_id": hkey[0],
+                "day": hkey[1],
+                "hour": hkey[2],
+                "net_paise": 0,
+                "bill_count": 0,
+                "updated_at": now,
+            }
+        hrow["net_paise"] += f.total_paise
+        hrow["bill_count"] += 1
+
+        counted: set[uuid.UUID] = set()
+        for service_id, qty, total_paise in f.lines:
+            skey = (*key, service_id)
+            srow = services.get(skey)
+            if srow is None:
+                srow = services[skey] = {
+                    "shop_id": key[0],
+                    "day": key[1],
+                    "service_id": service_id,
+                    "qty": 0,
+                    "revenue_paise": 0,
+                    "invoice_count": 0,
+                    "updated_at": now,
+                }
+            srow["qty"] += qty
+            srow["revenue_paise"] += total_paise
+            if service_id not in counted:
+                counted.add(service_id)
+                srow["invoice_count"] += 1
+
+        if f.customer_id is None:
+            continue
+        issued_at = assume_utc(f.issued_at)
+        stats = customers.get(f.customer_id)
+        if stats is None:
+            stats = customers[f.customer_id] = {
+                "customer_id": f.customer_id,
+                "shop_id": f.shop_id,
+                "bill_count": 0,
+                "gross_paise": 0,
+                "discount_paise": 0,
+                "net_paise": 0,
+                "first_invoice_at": issued_at,
+                "last_invoice_at": issued_at,
+                "updated_at": now,
+            }
+        stats["bill_count"] += 1
+        stats["gross_paise"] += f.subtotal_paise
+        stats["discount_paise"] += f.discount_paise
+        stats["net_paise"] += f.total_paise
+        stats["first_invoice_at"] = min(stats["first_invoice_at"], issued_at)
+        stats["last_invoice_at"] = max(stats["last_invoice_at"], issued_at)
+
+    statements = []
+    if daily:
+        statements.append(shop_daily_sales_upsert(list(daily.values())))
+    if hourly:
+        statements.append(shop_hourly_sales_upsert(list(hourly.values())))
+    if services:
+        statements.append(service_daily_stats_upsert(list(services.values())))
+    if customers:
+        statements.append(customer_stats_upsert(list(customers.values())))
+    return statements
+
+
+def rebuild_shop_daily_sales(db: Session, shop_id: uuid.UUID | None = None, days: LocalDays | None = None) -> None:
+    day = local_day_expr(Invoice.issued_at)
+    source = (
+        select(
+            Invoice.shop_id,
+            day,
+            func.sum(Invoice.subtotal_paise),
+            func.sum(Invoice.discount_paise),
+            func.sum(Invoice.total_paise),
+            func.count(Invoice.id),
+            func.coalesce(func.sum(Invoice.total_paise).filter(Invoice.payment_method == "cash"), 0),
+            func.coalesce(func.sum(Invoice.total_paise).filter(Invoice.payment_method == "upi"), 0),
+            literal(datetime.now(timezone.utc)),
+        )
+        .join(Shop, Shop.id == Invoice.shop_id)
+        .group_by(Invoice.shop_id, day)
+    )
+    clear = delete(ShopDailySales)
+    if shop_id is not None:
+        source = source.where(Invoice.shop_id == shop_id)
+        clear = clear.where(ShopDailySales.shop_id == shop_id)
+    if days is not None:
+        source = days.bound_issued_at(source, Invoice.issued_at)
+        clear = days.bound_day(clear, ShopDailySales.day)
+
+    db.execute(clear)
+    db.execute(
+        pg_insert(ShopDailySales).from_select(
+            [
+                "shop_id",
+                "day",
+                "gross_paise",
+                "discount_paise",
+                "net_paise",
+                "bill_count",
+                "cash_net_paise",
+                "upi_net_paise",
+                "updated_at",
+            ],
+            source,
+        )
+    )
+
+
+def rebuild_shop_hourly_sales(db: Session, shop_id: uuid.UUID | None = None, days: LocalDays | None = None) -> None:
+    day = local_day_expr(Invoice.issued_at)
+    hour = local_hour_expr(Invoice.issued_at)
+    source = (
+        select(
+            Invoice.shop_id,
+            day,
+            hour,
+            func.sum(Invoice.total_paise),
+            func.count(Invoice.id),
+            literal(datetime.now(timezone.utc)),
+        )
+        .join(Shop, Shop.id == Invoice.shop_id)
+        .group_by(Invoice.shop_id, day, hour)
+    )
+    clear = delete(ShopHourlySales)
+    if shop_id is not None:
+        source = source.where(Invoice.shop_id == shop_id)
+        clear = clear.where(ShopHourlySales.shop_id == shop_id)
+    if days is not None:
+        source = days.bound_issued_at(source, Invoice.issued_at)
+        clear = days.bound_day(clear, ShopHourlySales.day)
+
+    db.execute(clear)
+    db.execute(
+        pg_insert(ShopHourlySales).from_select(
+            ["shop_id", "day", "hour", "net_paise", "bill_count", "updated_at"],
+            source,
+        )
+    )
+
+
+def rebuild_service_daily_stats(db: Session, shop_id: uuid.UUID | None = None, days: LocalDays | None = None) -> None:
+    day = local_day_expr(Invoice.issued_at)
+    source = (
+        select(
+            Invoice.shop_id,
+            day,
+            InvoiceItem.service_id,
+            func.sum(InvoiceItem.qty),
+            func.sum(InvoiceItem.total_paise),
+            func.count(func.distinct(InvoiceItem.invoice_id)),
+            literal(datetime.now(timezone.utc)),
+        )
+        .join(Invoice, (Invoice.id == InvoiceItem.invoice_id) & (Invoice.issued_at == InvoiceItem.issued_at))
+        .join(Shop, Shop.id == Invoice.shop_id)
+        .where(InvoiceItem.service_id.isnot(None))
+        .group_by(Invoice.shop_id, day, InvoiceItem.service_id)
+    )
+    clear = delete(ServiceDailyStats)
+    if shop_id is not None:
+        source = source.where(Invoice.shop_id == shop_id)
+        clear = clear.where(ServiceDailyStats.shop_id == shop_id)
+    if days is not None:
+        source = days.bound_issued_at(source, Invoice.issued_at, InvoiceItem.issued_at)
+        clear = days.bound_day(clear, ServiceDailyStats.day)
+
+    db.execute(clear)
+    db.execute(
+        pg_insert(ServiceDailyStats).from_select(
+            ["shop_id", "day", "service_id", "qty", "revenue_paise", "invoice_count", "updated_at"],
+            source,
+        )
+    )
+
+
+def rebuild_customer_stats(db: Session, shop_id: uuid.UUID | None = None) -> None:
+    source = (
+        select(
+            Invoice.customer_id,
+            Invoice.shop_id,
+            func.count(Invoice.id),
+            func.sum(Invoice.subtotal_paise),
+            func.sum(Invoice.discount_paise),
+            func.sum(Invoice.total_paise),
+            func.min(Invoice.issued_at),
+            func.max(Invoice.issued_at),
+            literal(datetime.now(timezone.utc)),
+        )
+        .where(Invoice.customer_id.isnot(None))
+        .group_by(Invoice.customer_id, Invoice.shop_id)
+    )
+    clear = delete(CustomerStats)
+    if shop_id is not None:
+        source = source.where(Invoice.shop_id == shop_id)
+        clear = clear.where(CustomerStats.shop_id == shop_id)
+
+    db.execute(clear)
+    db.execute(
+        pg_insert(CustomerStats).from_select(
+            [
+                "customer_id",
+                "shop_id",
+                "bill_count",
+                "gross_paise",
+                "discount_paise",
+                "net_paise",
+                "first_invoice_at",
+                "last_invoice_at",
+                "updated_at",
+            ],
+            source,
+        )
+    )
+
+
+def lock_shop_rollups(db: Session, shop_id: uuid.UUID) -> None:
+    """Hold the shop's rollups until the transaction ends.
+
+    The advisory lock serialises rebuilds of the same shop; the row lock
+    makes new bills, which key-share lock the shop row, wait rather than add
+    to rows a rebuild is about to replace.
+    """
+    db.execute(select(func.pg_advisory_xact_lock(REBUILD_LOCK_NAMESPACE, func.hashtext(str(shop_id)))))
+    db.execute(select(Shop.id).where(Shop.id == shop_id).with_for_update())
+
+
+def rebuild(db: Session, shop_id: uuid.UUID | None = None) -> None:
+    """Recompute every rollup for one shop in one transaction; without
+    `shop_id`, for each shop in turn."""
+    if shop_id is None:
+        for each in db.scalars(select(Shop.id).order_by(Shop.id)).all():
+            rebuild(db, each)
+        return
+    lock_shop_rollups(db, shop_id)
+    rebuild_shop_daily_sales(db, shop_id)
+    rebuild_shop_hourly_sales(db, shop_id)
+    rebuild_service_daily_stats(db, shop_id)
+    rebuild_customer_stats(db, shop_id)
+    # Bucketed in the current zone, so any pending re-bucket is done too.
+    db.execute(update(Shop).where(Shop.id == shop_id).values(rollups_stale_since=None))
+    db.commit()
+
+
+def rebuild_stale_zone(db: Session, shop_id: uuid.UUID) -> bool:
+    """Re-bucket a shop's day and hour rollups after a zone change.
+
+    Each local month (in the new zone) is rebuilt in its own transaction, so
+    the shop's new bills only ever wait for one month; they already bucket
+    in the new zone, which the months not yet rebuilt catch up with. The
+    first and last chunks are open-ended, to clear rows the old zone put
+    outside the new range. Returns False if the zone changed again meanwhile,
+    leaving the shop for the run that change queued.
+    """
+    stale_since, tz = db.execute(
+        select(Shop.rollups_stale_since, Shop.timezone).where(Shop.id == shop_id)
+    ).one()
+    if stale_since is None:
+        return True
+    first_at, last_at = db.execute(
+        select(func.min(Invoice.issued_at), func.max(Invoice.issued_at)).where(Invoice.shop_id == shop_id)
+    ).one()
+    db.commit()
+
+    bounds: list[date | None] = [None, None]
+    if first_at is not None:
+        month, last = add_months(month_floor(local_day(first_at, tz)), 1), local_day(last_at, tz)
+        while month <= last:
+            bounds.insert(-1, month)
+            month = add_months(month, 1)
+    for first, stop in zip(bounds, bounds[1:]):
+        lock_shop_rollups(db, shop_id)
+        if db.scalar(select(Shop.rollups_stale_since).where(Shop.id == shop_id)) != stale_since:
+            db.rollback()
+            return False
+        days = LocalDays(tz, first, stop)
+        rebuild_shop_daily_sales(db, shop_id, days)
+        rebuild_shop_hourly_sales(db, shop_id, days)
+        rebuild_service_daily_stats(db, shop_id, days)
+        db.commit()
+
+    # customer_stats holds instants, not local days, so it stays as it is.
+    db.execute(
+        update(Shop)
+        .where(Shop.id == shop_id, Shop.rollups_stale_since == stale_since)
+        .values(rollups_stale_since=None)
+    )
+    db.commit()
+    return True
+
+
+def rebuild_stale(db: Session) -> list[uuid.UUID]:
+    """Run `rebuild_stale_zone` for every shop waiting for one; returns the
+    shops it finished."""
+    stale = db.scalars(select(Shop.id).where(Shop.rollups_stale_since.isnot(None)).order_by(Shop.id)).all()
+    db.commit()
+    return [shop_id for shop_id in stale if rebuild_stale_zone(db, shop_id)]
+
+
+def handler(event, context):
+    from app.db.session import SessionLocal
+
+    shop_id = (event or {}).get("shop_id")
+    db = SessionLocal()
+    try:
+        rebuild(db, uuid.UUID(shop_id) if shop_id else None)
+    finally:
+        db.close()
+    return {"status": "ok"}
+
+
+def rebuild_stale_handler(event, context):
+    from app.core.report_cache import report_cache
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        rebuilt = rebuild_stale(db)
+    finally:
+        db.close()
+
+    async def bump_all():
+        for shop_id in rebuilt:
+            await report_cache.bump(shop_id)
+
+    asyncio.run(bump_all())
+    return {"status": "ok", "rebuilt": [str(shop_id) for shop_id in rebuilt]}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.rollups")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebuild_cmd = sub.add_parser("rebuild", help="recompute rollups from invoices")
+    rebuild_cmd.add_argument("--shop-id", default=None)
+    sub.add_parser("rebuild-stale", help="re-bucket shops whose timezone changed")
+    args = parser.parse_args(argv)
+
+    if args.command == "rebuild":
+        handler({"shop_id": args.shop_id}, None)
+    elif args.command == "rebuild-stale":
+        print(rebuild_stale_handler({}, None))
+
+
+if __name__ == "__main__":
+    main()
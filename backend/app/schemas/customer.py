@@ -46,8 +46,9 @@ class CustomerListResponse(BaseModel):
     items: list[CustomerResponse]
     page: int
     limit: int
-    total: int
+    total: int | None = None
     has_more: bool
+    next_cursor: str | None = None
 
 
 class CustomerUpdate(BaseModel):
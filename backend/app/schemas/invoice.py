@@ -20,6 +20,9 @@ class InvoiceCreate(BaseModel):
     payment_method: Literal["CASH", "UPI"] = "CASH"
     upi_ref: str | None = None
 
+    # Replaying a request with the same key returns the original invoice.
+    idempotency_key: str | None = Field(default=None, min_length=1, max_length=100)
+
 
 class InvoiceItemResponse(BaseModel):
     id: uuid.UUID
@@ -60,3 +63,31 @@ class InvoiceSummaryResponse(BaseModel):
     discount_paise: int
     total_paise: int
     payment_method: Literal["CASH", "UPI"]
+
+
+class InvoicePageResponse(BaseModel):
+    items: list[InvoiceSummaryResponse]
+    next_cursor: str | None = None
+
+
+class InvoiceBulkItem(InvoiceCreate):
+    idempotency_key: str = Field(min_length=1, max_length=100)
+
+
+class InvoiceBulkCreate(BaseModel):
+    invoices: list[InvoiceBulkItem] = Field(min_length=1, max_length=1000)
+
+
+class InvoiceBulkResult(BaseModel):
+    index: int
+    idempotency_key: str
+    status: Literal["created", "duplicate", "error"]
+    invoice_id: uuid.UUID | None = None
+    error: str | None = None
+
+
+class InvoiceBulkResponse(BaseModel):
+    created: int
+    duplicates: int
+    errors: int
+    results: list[InvoiceBulkResult]
@@ -1,5 +1,5 @@
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 
 from pydantic import BaseModel
 
@@ -30,6 +30,7 @@ class CustomerInsightsResponse(BaseModel):
 
     repeat_customers: list[CustomerInsightRow]
     top_customers: list[CustomerInsightRow]
+    lifetime_top_customers: list[CustomerInsightRow] = []
     dormant_customers: list[DormantCustomerRow]
 
 
@@ -41,11 +42,90 @@ class ServicePerformanceRow(BaseModel):
     revenue_paise: int
     invoice_count: int
 
+    # Share of the range's service revenue / quantity, in percent.
+    revenue_mix_pct: float = 0.0
+    qty_mix_pct: float = 0.0
+
 
 class ServicePerformanceResponse(BaseModel):
     start: datetime
     end: datetime
     limit: int
 
+    total_revenue_paise: int = 0
+    total_qty: int = 0
+
     top_by_revenue: list[ServicePerformanceRow]
     top_by_quantity: list[ServicePerformanceRow]
+
+
+class DailySalesRow(BaseModel):
+    day: date
+
+    gross_paise: int
+    discount_paise: int
+    net_paise: int
+    bill_count: int
+    avg_bill_paise: int
+    cash_net_paise: int
+    upi_net_paise: int
+
+
+class SalesSummaryResponse(BaseModel):
+    start: date
+    end: date
+    timezone: str
+
+    gross_paise: int
+    discount_paise: int
+    net_paise: int
+    bill_count: int
+    avg_bill_paise: int
+    cash_net_paise: int
+    upi_net_paise: int
+
+    days: list[DailySalesRow]
+
+
+class SalesHeatmapResponse(BaseModel):
+    start: date
+    end: date
+    timezone: str
+
+    # Rows follow `weekdays` (Monday first); columns are local hours 0-23.
+    weekdays: list[str]
+    net_paise: list[list[int]]
+    bill_count: list[list[int]]
+
+
+class PaymentMethodSplitRow(BaseModel):
+    method: str  # CASH|UPI
+    bill_count: int
+    net_paise: int
+
+
+class UpiTransactionRow(BaseModel):
+    invoice_id: uuid.UUID
+    issued_at: datetime
+    customer_name: str | None = None
+
+    payment_id: uuid.UUID
+    amount_paise: int
+    reference: str | None = None
+
+
+class PaymentsReportResponse(BaseModel):
+    start: datetime
+    end: datetime
+
+    methods: list[PaymentMethodSplitRow]
+    upi_transactions: list[UpiTransactionRow]
+    next_cursor: str | None = None
+
+
+class ReportCacheStatsResponse(BaseModel):
+    backend: str  # memory|redis|off
+    hits: int
+    misses: int
+    errors: int
+    entries: int | None = None
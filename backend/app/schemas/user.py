@@ -1,5 +1,8 @@
 import uuid
-from pydantic import BaseModel, EmailStr
+from datetime import datetime
+from zoneinfo import available_timezones
+
+from pydantic import BaseModel, EmailStr, Field, field_validator
 
 
 class UserMeResponse(BaseModel):
@@ -7,3 +10,18 @@ class UserMeResponse(BaseModel):
     email: EmailStr
     shop_id: uuid.UUID
     shop_name: str
+    timezone: str
+    # Set while reports are being re-bucketed after a zone change.
+    rollups_stale_since: datetime | None = None
+
+
+class ShopSettingsUpdate(BaseModel):
+    timezone: str = Field(min_length=1, max_length=64)
+
+    @field_validator("timezone")
+    @classmethod
+    def known_timezone(cls, v: str) -> str:
+        v = v.strip()
+        if v not in available_timezones():
+            raise ValueError("Unknown IANA timezone")
+        return v
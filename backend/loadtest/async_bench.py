@@ -0,0 +1,112 @@
+"""Sync vs async database path under the same concurrent load.
+
+The sync side is what `def` routes get: N threadpool slots, each holding a
+Session from `make_engine`. The async side is what `async def` routes get:
+N tasks on one event loop sharing an engine from `make_async_engine`. Both
+use the same pool size and run the same query, which holds its connection
+for --hold-ms. Compare req/s and tail latency at each concurrency level.
+
+    cd backend
+    python -m loadtest.async_bench --concurrency 10,50,200 --pool-size 10 --seconds 10
+"""
+
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import PoolProfile, make_async_engine, make_engine
+
+
+QUERY = text("SELECT pg_sleep(:s)")
+
+
+def _summary(mode: str, concurrency: int, latencies: list[float], elapsed: float) -> dict:
+    latencies.sort()
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)] if latencies else 0.0
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": (statistics.median(latencies) if latencies else 0.0) * 1000,
+        "p99_ms": p99 * 1000,
+    }
+
+
+def run_sync(profile: PoolProfile, concurrency: int, seconds: float, hold_ms: float) -> dict:
+    engine = make_engine(profile)
+    Session = sessionmaker(bind=engine)
+    stop_at = time.perf_counter() + seconds
+    latencies: list[list[float]] = [[] for _ in range(concurrency)]
+
+    def worker(n: int) -> None:
+        while time.perf_counter() < stop_at:
+            t0 = time.perf_counter()
+            with Session() as db:
+                db.execute(QUERY, {"s": hold_ms / 1000})
+            latencies[n].append(time.perf_counter() - t0)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+    return _summary("sync", concurrency, [x for xs in latencies for x in xs], elapsed)
+
+
+async def _run_async(profile: PoolProfile, concurrency: int, seconds: float, hold_ms: float) -> dict:
+    engine = make_async_engine(profile)
+    Session = async_sessionmaker(engine)
+    stop_at = time.perf_counter() + seconds
+    latencies: list[float] = []
+
+    async def worker() -> None:
+        while time.perf_counter() < stop_at:
+            t0 = time.perf_counter()
+            async with Session() as db:
+                await db.execute(QUERY, {"s": hold_ms / 1000})
+            latencies.append(time.perf_counter() - t0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+    return _summary("async", concurrency, latencies, elapsed)
+
+
+def run_async(profile: PoolProfile, concurrency: int, seconds: float, hold_ms: float) -> dict:
+    return asyncio.run(_run_async(profile, concurrency, seconds, hold_ms))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m loadtest.async_bench")
+    parser.add_argument("--concurrency", default="10,50,200")
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--hold-ms", type=float, default=5)
+    args = parser.parse_args(argv)
+
+    # Same pool for both sides; the timeout is generous so queueing shows up
+    # as latency rather than errors.
+    profile = PoolProfile(pool_size=args.pool_size, max_overflow=0, pool_timeout=120)
+    print(f"{'mode':>6} {'conc':>5} {'requests':>9} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        for run in (run_sync, run_async):
+            r = run(profile, concurrency, args.seconds, args.hold_ms)
+            print(
+                f"{r['mode']:>6} {r['concurrency']:>5} {r['requests']:>9} {r['rps']:>9.1f} "
+                f"{r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
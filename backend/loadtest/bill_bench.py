@@ -0,0 +1,110 @@
+"""Bill-creation throughput with concurrent writers.
+
+Runs `create_invoice` in-process from --concurrency tasks, each with its own
+session, for --seconds per (concurrency, lines) pair. Writers are spread
+over the first --shops seeded shops, since bills of one shop queue on the
+same rollup rows. Reports bills/s, p50/p99 latency and statements per bill,
+which should not grow with the number of lines.
+
+The bills are committed, like the driver's create_bill scenario, so point it
+at a load-test database (python -m loadtest.seed).
+
+    cd backend
+    python -m loadtest.bill_bench --concurrency 1,10,50 --lines 1,10 --seconds 10
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import select
+
+from app.api.deps import Principal
+from app.api.routes.invoices import create_invoice
+from app.db import query_stats
+from app.db.session import AsyncSessionLocal, async_engine
+from app.models.service import Service
+from app.models.shop import Shop
+from app.schemas.invoice import InvoiceCreate
+
+
+async def _writers(shops: list[tuple[Principal, list]], concurrency: int, lines: int, seconds: float) -> dict:
+    latencies: list[float] = []
+    statements: list[int] = []
+    errors = 0
+    stop_at = time.perf_counter() + seconds
+
+    async def writer(n: int) -> None:
+        nonlocal errors
+        principal, service_ids = shops[n % len(shops)]
+        payload = InvoiceCreate(
+            items=[{"service_id": service_ids[i % len(service_ids)]} for i in range(lines)],
+            payment_method="UPI" if n % 3 == 0 else "CASH",
+        )
+        while time.perf_counter() < stop_at:
+            stats, token = query_stats.start()
+            t0 = time.perf_counter()
+            try:
+                async with AsyncSessionLocal() as db:
+                    await create_invoice(payload, db, principal)
+            except Exception:
+                errors += 1
+            finally:
+                query_stats.stop(token)
+            latencies.append(time.perf_counter() - t0)
+            statements.append(stats.statements)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(writer(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "lines": lines,
+        "bills": len(latencies),
+        "bills_per_s": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000 if latencies else 0.0,
+        "statements": statistics.mean(statements) if statements else 0.0,
+        "errors": errors,
+    }
+
+
+async def main_async(args) -> list[dict]:
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(select(Shop).order_by(Shop.created_at).limit(args.shops))).scalars().all()
+        shops = []
+        for shop in rows:
+            service_ids = list(await db.scalars(select(Service.id).where(Service.shop_id == shop.id)))
+            if service_ids:
+                shops.append((Principal(id=shop.user_id, shop_id=shop.id), service_ids))
+    if not shops:
+        raise SystemExit("no shop with services found; seed some with python -m loadtest.seed")
+
+    results = []
+    for lines in (int(n) for n in args.lines.split(",")):
+        for concurrency in (int(n) for n in args.concurrency.split(",")):
+            results.append(await _writers(shops, concurrency, lines, args.seconds))
+    await async_engine.dispose()
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m loadtest.bill_bench")
+    parser.add_argument("--concurrency", default="1,10,50")
+    parser.add_argument("--lines", default="1,10")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--shops", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'lines':>5} {'writers':>7} {'bills':>7} {'bills/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'stmts':>6} {'errors':>6}")
+    for r in asyncio.run(main_async(args)):
+        print(
+            f"{r['lines']:>5} {r['concurrency']:>7} {r['bills']:>7} {r['bills_per_s']:>8.0f} "
+            f"{r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['statements']:>6.1f} {r['errors']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
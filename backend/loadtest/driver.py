@@ -0,0 +1,286 @@
+"""Replay a billing-counter traffic mix against a running API.
+
+Each virtual user logs in as one of the seeded shops (loadtest.seed), loads
+its services and a page of customers, then loops over a weighted mix of
+bill creation, invoice listing, reports and the occasional re-login until
+--seconds is up. Latency is recorded per scenario and reported as
+p50/p95/p99 with error counts and throughput.
+
+--save NAME stores the run under loadtest/baselines/NAME.json; --compare
+NAME prints the change against a stored run and exits 1 if any scenario's
+p95 is more than --tolerance worse.
+
+    cd backend
+    python -m loadtest.driver --base-url http://localhost:8000 --users 20 --seconds 60 --save main
+    python -m loadtest.driver --base-url http://localhost:8000 --users 20 --seconds 60 --compare main
+
+Uses only the standard library (urllib in threads), so it can run from a
+machine without the backend's dependencies installed.
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from http.cookies import SimpleCookie
+from pathlib import Path
+
+
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+
+# (scenario, weight); login is also timed once per user at start-up.
+MIX = (
+    ("create_bill", 30),
+    ("list_invoices", 20),
+    ("search_customers", 10),
+    ("report_summary", 12),
+    ("report_services", 8),
+    ("report_customers", 5),
+    ("report_heatmap", 5),
+    ("report_payments", 5),
+    ("login", 5),
+)
+
+
+class Client:
+    """One virtual user: its own cookies, shop data and RNG."""
+
+    def __init__(self, base_url: str, email: str, password: str, rng: random.Random, timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.email = email
+        self.password = password
+        self.rng = rng
+        self.timeout = timeout
+        self.cookies: dict[str, str] = {}
+        self.service_ids: list[str] = []
+        self.customer_ids: list[str] = []
+
+    def request(self, method: str, path: str, body: dict | None = None) -> tuple[int, bytes]:
+        req = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(body).encode("utf-8") if body is not None else None,
+            method=method,
+            headers={"Content-Type": "application/json"},
+        )
+        if self.cookies:
+            req.add_header("Cookie", "; ".join(f"{k}={v}" for k, v in self.cookies.items()))
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                status, payload, headers = resp.status, resp.read(), resp.headers
+        except urllib.error.HTTPError as e:
+            status, payload, headers = e.code, e.read(), e.headers
+        for header in headers.get_all("Set-Cookie") or []:
+            cookie = SimpleCookie(header)
+            for key, morsel in cookie.items():
+                # The refresh cookie is scoped to /api/auth; only the
+                # access token matters here.
+                if key == "access_token":
+                    self.cookies[key] = morsel.value
+        return status, payload
+
+    def login(self) -> int:
+        status, _ = self.request("POST", "/api/auth/login", {"email": self.email, "password": self.password})
+        return status
+
+    def prepare(self) -> None:
+        status, body = self.request("GET", "/api/services/")
+        if status != 200:
+            raise RuntimeError(f"{self.email}: GET /api/services/ returned {status}")
+        self.service_ids = [s["id"] for s in json.loads(body) if s["active"]]
+        if not self.service_ids:
+            raise RuntimeError(f"{self.email}: shop has no active services")
+        status, body = self.request("GET", "/api/customers/?paginate=true&limit=200")
+        if status == 200:
+            self.customer_ids = [c["id"] for c in json.loads(body)["items"]]
+
+    def _range(self, days: int) -> tuple[str, str]:
+        end = datetime.now(timezone.utc)
+        return (end - timedelta(days=days)).isoformat(), end.isoformat()
+
+    def run(self, scenario: str) -> int:
+        rng = self.rng
+        if scenario == "login":
+            return self.login()
+        if scenario == "create_bill":
+            lines = min(rng.choice((1, 1, 1, 2)), len(self.service_ids))
+            bill = {
+                "items": [{"service_id": sid} for sid in rng.sample(self.service_ids, k=lines)],
+                "payment_method": rng.choice(("CASH", "UPI")),
+                "idempotency_key": str(uuid.uuid4()),
+            }
+            if self.customer_ids and rng.random() < 0.7:
+                bill["customer_id"] = rng.choice(self.customer_ids)
+            return self.request("POST", "/api/invoices/", bill)[0]
+        if scenario == "list_invoices":
+            return self.request("GET", "/api/invoices/?paginate=true&limit=50")[0]
+        if scenario == "search_customers":
+            term = rng.choice(("ra", "sha", "kum", "pri", "98", "9000"))
+            return self.request("GET", f"/api/customers/?q={term}&paginate=true&limit=20")[0]
+        if scenario == "report_summary":
+            end = date.today() + timedelta(days=1)
+            start = end - timedelta(days=rng.choice((7, 30, 365)))
+            return self.request("GET", f"/api/reports/summary?start={start}&end={end}")[0]
+        if scenario == "report_heatmap":
+            end = date.today() + timedelta(days=1)
+            return self.request("GET", f"/api/reports/heatmap?start={end - timedelta(days=90)}&end={end}")[0]
+        start, end = self._range(rng.choice((7, 30, 90)))
+        query = urllib.parse.urlencode({"start": start, "end": end})
+        path = {
+            "report_services": "/api/reports/services",
+            "report_customers": "/api/reports/customers",
+            "report_payments": "/api/reports/payments",
+        }[scenario]
+        return self.request("GET", f"{path}?{query}")[0]
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run(args) -> dict:
+    names, weights = zip(*MIX)
+    samples: dict[str, list[float]] = {name: [] for name in names}
+    errors: dict[str, int] = {name: 0 for name in names}
+    failed_users: list[str] = []
+    lock = threading.Lock()
+
+    def record(scenario: str, seconds: float, status: int) -> None:
+        with lock:
+            samples[scenario].append(seconds)
+            if status >= 400:
+                errors[scenario] += 1
+
+    def user(n: int, stop_at: float) -> None:
+        shop = n % args.shops + 1
+        rng = random.Random(args.seed * 1000 + n)
+        client = Client(args.base_url, f"{args.prefix}-{shop}@example.com", args.password, rng, args.timeout)
+        t0 = time.perf_counter()
+        try:
+            status = client.login()
+            problem = None if status == 200 else f"{client.email}: login returned {status}"
+        except Exception as e:
+            status, problem = 599, f"{client.email}: login failed: {e!r}"
+        record("login", time.perf_counter() - t0, status)
+        if problem is None:
+            try:
+                client.prepare()
+            except Exception as e:
+                problem = str(e) if isinstance(e, RuntimeError) else f"{client.email}: {e!r}"
+        if problem is not None:
+            # Reported with the results, rather than the thread dying and
+            # the run quietly measuring fewer users.
+            with lock:
+                failed_users.append(f"user {n}: {problem}")
+            return
+        while time.perf_counter() < stop_at:
+            scenario = rng.choices(names, weights)[0]
+            t0 = time.perf_counter()
+            try:
+                status = client.run(scenario)
+            except Exception:
+                # Connection errors, timeouts, unreadable responses.
+                status = 599
+            record(scenario, time.perf_counter() - t0, status)
+            if args.think_ms:
+                time.sleep(rng.expovariate(1000 / args.think_ms))
+
+    started = time.perf_counter()
+    stop_at = started + args.seconds
+    threads = [threading.Thread(target=user, args=(n, stop_at)) for n in range(args.users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for name in names:
+        values = sorted(samples[name])
+        results[name] = {
+            "count": len(values),
+            "errors": errors[name],
+            "rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+        }
+    return {
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "config": {"base_url": args.base_url, "users": args.users, "seconds": args.seconds, "think_ms": args.think_ms},
+        "failed_users": failed_users,
+        "results": results,
+    }
+
+
+def print_report(run_result: dict, baseline: dict | None, tolerance: float) -> list[str]:
+    """Print the table; return scenarios whose p95 regressed past tolerance."""
+    print(f"{'scenario':>17} {'count':>7} {'errors':>6} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  vs baseline p95")
+    regressed = []
+    for name, r in run_result["results"].items():
+        line = (
+            f"{name:>17} {r['count']:>7} {r['errors']:>6} {r['rps']:>7.1f} "
+            f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}"
+        )
+        base = (baseline or {}).get("results", {}).get(name)
+        if base and base["p95_ms"] and r["count"]:
+            change = r["p95_ms"] / base["p95_ms"] - 1
+            line += f"  {change:+.0%}"
+            if change > tolerance:
+                line += "  REGRESSED"
+                regressed.append(name)
+        print(line)
+    failed = run_result["failed_users"]
+    if failed:
+        print(f"\n{len(failed)} of {run_result['config']['users']} users never started:", file=sys.stderr)
+        for message in failed:
+            print(f"  {message}", file=sys.stderr)
+    return regressed
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m loadtest.driver")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--think-ms", type=float, default=0, help="mean pause between a user's requests")
+    parser.add_argument("--shops", type=int, default=3, help="seeded shops to spread users over")
+    parser.add_argument("--prefix", default="loadtest")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", metavar="NAME", help="store this run as a baseline")
+    parser.add_argument("--compare", metavar="NAME", help="compare against a stored baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 regression, as a fraction")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        baseline = json.loads((BASELINE_DIR / f"{args.compare}.json").read_text())
+
+    result = run(args)
+    regressed = print_report(result, baseline, args.tolerance)
+
+    if result["failed_users"]:
+        raise SystemExit(f"{len(result['failed_users'])} users failed to start; not a usable run")
+    if args.save:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        path = BASELINE_DIR / f"{args.save}.json"
+        path.write_text(json.dumps(result, indent=2) + "\n")
+        print(f"saved baseline {path}")
+    if regressed:
+        raise SystemExit(f"p95 regressed by more than {args.tolerance:.0%}: {', '.join(regressed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Memory use of the CSV exports on a million-row shop.
+
+COPYs a throwaway shop with --rows invoices (one item and one payment each)
+spread over the past year, then streams /api/exports/invoices.csv,
+invoice-items.csv and payments.csv through the ASGI app in-process,
+discarding the body as it arrives. Resident memory is sampled at every
+chunk. Exits non-zero if it grows more than --budget-mib over the
+warmed-up process, or if an export is missing rows.
+
+That is the uvicorn path. On Lambda the body is buffered whole, so it then
+requests invoices.csv as the Lambda app would and expects a 413 when the
+shop is over EXPORT_MAX_BUFFERED_BYTES, a 200 otherwise. The shop is
+deleted afterwards.
+
+    cd backend
+    python -m loadtest.export_rss --rows 1000000 --budget-mib 64
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.api.deps import Principal, get_current_user
+from app.api.routes import exports
+from app.core.config import settings
+from app.db.session import engine
+from app.main import app
+from app.partitions import ensure_partitions
+from loadtest.seed import INVOICE_COLUMNS, ITEM_COLUMNS, PAYMENT_COLUMNS, _Copier
+
+
+EXPORTS = ("invoices.csv", "invoice-items.csv", "payments.csv")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def _rss_mib() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * PAGE_SIZE / 2**20
+
+
+def _bills(rows: int, now: datetime):
+    """(invoice id, issued_at) for each bill, the same sequence on every call.
+
+    Regenerated per table rather than held in lists, so seeding a million
+    rows does not inflate the baseline the exports are measured against.
+    """
+    rng = random.Random(1)
+    for _ in range(rows):
+        yield uuid.UUID(int=rng.getrandbits(128), version=4), now - timedelta(seconds=rng.uniform(0, 365 * 86400))
+
+
+def seed(rows: int) -> Principal:
+    now = datetime.now(timezone.utc)
+    user_id, shop_id, service_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    with Session(engine) as db:
+        ensure_partitions(db, (now - timedelta(days=366)).date(), now.date())
+    raw = engine.raw_connection()
+    try:
+        copier = _Copier(raw.driver_connection)
+        copier.copy("users", ("id", "email", "password_hash", "created_at"), [(user_id, f"export-rss-{shop_id}@example.com", "-", now)])
+        copier.copy(
+            "shops",
+            ("id", "user_id", "name", "pan", "timezone", "created_at"),
+            [(shop_id, user_id, "Export RSS", shop_id.hex[:20], "Asia/Kolkata", now)],
+        )
+        copier.copy(
+            "services",
+            ("id", "shop_id", "name", "price_paise", "active", "created_at", "updated_at"),
+            [(service_id, shop_id, "Haircut", 15000, True, now, now)],
+        )
+        copier.copy(
+            "invoices",
+            INVOICE_COLUMNS,
+            ((i, shop_id, None, at, "paid", 15000, 0, 15000, "cash", at) for i, at in _bills(rows, now)),
+        )
+        copier.copy(
+            "invoice_items",
+            ITEM_COLUMNS,
+            ((uuid.uuid4(), i, at, service_id, "Haircut", 1, 15000, 15000, at) for i, at in _bills(rows, now)),
+        )
+        copier.copy(
+            "payments",
+            PAYMENT_COLUMNS,
+            ((uuid.uuid4(), i, at, "cash", 15000, None, at) for i, at in _bills(rows, now)),
+        )
+        copier.copy("invoice_locators", ("id", "issued_at"), _bills(rows, now))
+        copier.conn.commit()
+    finally:
+        raw.close()
+    return Principal(id=user_id, shop_id=shop_id)
+
+
+def cleanup(principal: Principal) -> None:
+    with engine.begin() as conn:
+        for table in ("payments", "invoice_items"):
+            conn.execute(
+                text(f"DELETE FROM {table} t USING invoices i WHERE i.id = t.invoice_id AND i.shop_id = :shop"),
+                {"shop": principal.shop_id},
+            )
+        conn.execute(
+            text("DELETE FROM invoice_locators l USING invoices i WHERE i.id = l.id AND i.shop_id = :shop"),
+            {"shop": principal.shop_id},
+        )
+        for table in ("invoices", "services"):
+            conn.execute(text(f"DELETE FROM {table} WHERE shop_id = :shop"), {"shop": principal.shop_id})
+        conn.execute(text("DELETE FROM shops WHERE id = :shop"), {"shop": principal.shop_id})
+        conn.execute(text("DELETE FROM users WHERE id = :user"), {"user": principal.id})
+
+
+async def export(name: str, query: str = "") -> dict:
+    """Stream one export; return its size, row count and peak RSS."""
+    path = f"/api/exports/{name}"
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    result = {"status": 0, "bytes": 0, "lines": 0, "peak_mib": _rss_mib()}
+    requested = False
+    done = asyncio.Event()
+
+    async def receive():
+        # The request body once, then block like a server does until the
+        # client goes away; StreamingResponse polls this for a disconnect.
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            result["bytes"] += len(body)
+            result["lines"] += body.count(b"\n")
+            result["peak_mib"] = max(result["peak_mib"], _rss_mib())
+
+    started = time.perf_counter()
+    try:
+        await app(scope, receive, send)
+    finally:
+        done.set()
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m loadtest.export_rss")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--budget-mib", type=float, default=64)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    principal = seed(args.rows)
+    print(f"seeded {args.rows} invoices in {time.perf_counter() - started:.1f}s")
+    app.dependency_overrides[get_current_user] = lambda: principal
+    failures = []
+    try:
+        # Warm up imports, pools and the first partitions before measuring.
+        asyncio.run(export("payments.csv", "start=" + datetime.now(timezone.utc).date().isoformat()))
+        baseline = _rss_mib()
+        print(f"baseline RSS {baseline:.1f} MiB\n")
+        print(f"{'export':>18} {'rows':>9} {'MiB out':>8} {'seconds':>8} {'RSS growth':>11}")
+        for name in EXPORTS:
+            r = asyncio.run(export(name))
+            growth = r["peak_mib"] - baseline
+            print(f"{name:>18} {r['lines'] - 1:>9} {r['bytes'] / 2**20:>8.1f} {r['seconds']:>8.1f} {growth:>9.1f} MiB")
+            if r["status"] != 200 or r["lines"] - 1 != args.rows:
+                failures.append(f"{name}: status {r['status']}, {r['lines'] - 1} rows, expected {args.rows}")
+            if growth > args.budget_mib:
+                failures.append(f"{name}: RSS grew {growth:.1f} MiB, over the {args.budget_mib:.0f} MiB budget")
+
+        exports.BUFFERED_RESPONSE = True
+        try:
+            r = asyncio.run(export("invoices.csv"))
+        finally:
+            exports.BUFFERED_RESPONSE = False
+        expected = 413 if args.rows > settings.export_max_buffered_bytes // exports.ROW_BYTES["invoices.csv"] else 200
+        print(f"\n{'invoices.csv':>18} as on Lambda: {r['status']} in {r['seconds']:.2f}s")
+        if r["status"] != expected:
+            failures.append(f"invoices.csv as on Lambda: status {r['status']}, expected {expected}")
+    finally:
+        app.dependency_overrides.clear()
+        cleanup(principal)
+    if failures:
+        print("\n" + "\n".join(failures))
+        raise SystemExit(1)
+    print("\nexports stayed within the memory budget")
+
+
+if __name__ == "__main__":
+    main()
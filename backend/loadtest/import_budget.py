@@ -0,0 +1,85 @@
+"""Import-time budget for `import app.main` (the Lambda cold-start path).
+
+Runs `python -X importtime -c "import app.main"` in fresh interpreters,
+takes the fastest run, and exits non-zero if it is over --budget-ms or if a
+module that should load lazily (route modules, models, passlib/argon2,
+python-jose) was imported at startup. Prints the slowest imports either
+way, so a regression points at its cause.
+
+    cd backend
+    python -m loadtest.import_budget --budget-ms 1300
+"""
+
+import argparse
+import subprocess
+import sys
+
+
+# Prefixes that must not be imported by `import app.main`; see app/api/router.py
+# and app/core/security.py.
+LAZY_MODULES = (
+    "app.api.routes",
+    "app.api.deps",
+    "app.models",
+    "app.schemas",
+    "app.rollups",
+    "passlib",
+    "argon2",
+    "jose",
+    "cryptography",
+    "redis",
+)
+
+
+def measure(module: str) -> tuple[float, dict[str, float]]:
+    """Return (total ms, {module: cumulative ms}) for one cold import."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(proc.stderr)
+    cumulative: dict[str, float] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = line.split("|")
+        if cum.strip().isdigit():
+            cumulative[name.strip()] = int(cum) / 1000
+    return cumulative.get(module, 0.0), cumulative
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m loadtest.import_budget")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=1300)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    # The fastest run is the least disturbed by the rest of the machine.
+    total, cumulative = min((measure(args.module) for _ in range(args.runs)), key=lambda r: r[0])
+
+    print(f"{'cumulative ms':>14}  module")
+    for name, ms in sorted(cumulative.items(), key=lambda kv: kv[1], reverse=True)[: args.top]:
+        print(f"{ms:>14.1f}  {name}")
+
+    eager = sorted(
+        name for name in cumulative if any(name == p or name.startswith(p + ".") for p in LAZY_MODULES)
+    )
+    failed = False
+    if eager:
+        print(f"\nimported at startup but should be lazy: {', '.join(eager)}")
+        failed = True
+    if total > args.budget_ms:
+        print(f"\nimport {args.module}: {total:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    else:
+        print(f"\nimport {args.module}: {total:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Bill-creation latency with and without a concurrent login storm.
+
+Phase one runs --billers virtual users creating bills on their own. Phase
+two runs the same billers while --stormers threads log in as fast as they
+can, the way a shop-opening rush or a credential-stuffing run would. With
+argon2 on its own bounded pool (app.core.security.hash_pool), create_bill
+p95/p99 should stay close to the quiet phase and excess logins should come
+back as 503 rather than queueing behind the billers.
+
+    cd backend
+    python -m loadtest.seed --shops 3
+    python -m loadtest.login_storm --base-url http://localhost:8000 --billers 8 --stormers 32 --seconds 30
+
+Uses loadtest.driver's client, so it also only needs the standard library.
+"""
+
+import argparse
+import random
+import threading
+import time
+
+from loadtest.driver import Client, percentile
+
+
+def _phase(args, stormers: int) -> dict[str, dict]:
+    samples: dict[str, list[float]] = {"create_bill": [], "login": []}
+    statuses: dict[str, dict[int, int]] = {"create_bill": {}, "login": {}}
+    lock = threading.Lock()
+
+    def record(scenario: str, seconds: float, status: int) -> None:
+        with lock:
+            samples[scenario].append(seconds)
+            statuses[scenario][status] = statuses[scenario].get(status, 0) + 1
+
+    def client(n: int) -> Client:
+        shop = n % args.shops + 1
+        return Client(
+            args.base_url, f"{args.prefix}-{shop}@example.com", args.password, random.Random(args.seed * 1000 + n),
+            args.timeout,
+        )
+
+    # Billers log in and load their menus before the clock starts.
+    billers = [client(n) for n in range(args.billers)]
+    for biller in billers:
+        if biller.login() != 200:
+            raise SystemExit(f"{biller.email}: login failed; seed the database with loadtest.seed first")
+        biller.prepare()
+
+    stop_at = time.perf_counter() + args.seconds
+
+    def bill(biller: Client) -> None:
+        while time.perf_counter() < stop_at:
+            t0 = time.perf_counter()
+            try:
+                status = biller.run("create_bill")
+            except OSError:
+                status = 599
+            record("create_bill", time.perf_counter() - t0, status)
+
+    def storm(stormer: Client) -> None:
+        while time.perf_counter() < stop_at:
+            t0 = time.perf_counter()
+            try:
+                status = stormer.login()
+            except OSError:
+                status = 599
+            record("login", time.perf_counter() - t0, status)
+
+    threads = [threading.Thread(target=bill, args=(b,)) for b in billers]
+    threads += [threading.Thread(target=storm, args=(client(args.billers + n),)) for n in range(stormers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    results = {}
+    for name, values in samples.items():
+        values.sort()
+        results[name] = {
+            "count": len(values),
+            "statuses": dict(sorted(statuses[name].items())),
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+        }
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m loadtest.login_storm")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--billers", type=int, default=8)
+    parser.add_argument("--stormers", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=30, help="per phase")
+    parser.add_argument("--shops", type=int, default=3)
+    parser.add_argument("--prefix", default="loadtest")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    quiet = _phase(args, stormers=0)
+    stormed = _phase(args, stormers=args.stormers)
+
+    print(f"{'phase':>7} {'scenario':>12} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses")
+    for phase, results in (("quiet", quiet), ("storm", stormed)):
+        for name, r in results.items():
+            if not r["count"]:
+                continue
+            print(
+                f"{phase:>7} {name:>12} {r['count']:>7} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}"
+                f"  {r['statuses']}"
+            )
+    if quiet["create_bill"]["p95_ms"]:
+        change = stormed["create_bill"]["p95_ms"] / quiet["create_bill"]["p95_ms"] - 1
+        print(f"\ncreate_bill p95 under the storm: {change:+.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Per-request overhead of MetricsMiddleware and ServerTimingMiddleware.
+
+Drives a trivial ASGI app directly (no server, no sockets) with and
+without each middleware and reports the difference per request, which is
+what they add to every real request. Route labels come from a fake matched
+route, as the router would set it.
+
+    cd backend
+    python -m loadtest.metrics_bench --requests 200000
+"""
+
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+from app.api.metrics import MetricsMiddleware, RequestMetrics
+from app.api.server_timing import ServerTimingMiddleware
+
+
+ROUTE = SimpleNamespace(path="/{invoice_id}")
+START = {"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]}
+BODY = {"type": "http.response.body", "body": b'{"ok":true}'}
+
+
+async def endpoint(scope, receive, send) -> None:
+    scope["route"] = ROUTE
+    scope["root_path"] = "/api/invoices"
+    await send(dict(START))
+    await send(BODY)
+
+
+async def _receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def _send(message) -> None:
+    pass
+
+
+async def _per_request_us(app, requests: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/api/invoices/x"}
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), _receive, _send)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+async def _run(requests: int, rounds: int) -> None:
+    apps = {
+        "bare": endpoint,
+        "metrics": MetricsMiddleware(endpoint, RequestMetrics()),
+        "server-timing": ServerTimingMiddleware(endpoint),
+        "both": MetricsMiddleware(ServerTimingMiddleware(endpoint), RequestMetrics()),
+    }
+    # Best of several rounds, to keep scheduler noise out of a few-µs figure.
+    best = {name: min([await _per_request_us(app, requests) for _ in range(rounds)]) for name, app in apps.items()}
+    print(f"{'stack':>14} {'us/request':>11} {'overhead us':>12}")
+    for name, us in best.items():
+        print(f"{name:>14} {us:>11.2f} {us - best['bare']:>12.2f}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m loadtest.metrics_bench")
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args(argv)
+    asyncio.run(_run(args.requests, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Throughput of concurrent requests against pool size.
+
+Each worker thread plays one uvicorn threadpool slot: check a connection
+out, run a query that holds it for --hold-ms, check it back in, repeat.
+With the old hard-coded pool of one, throughput stays flat however many
+threads there are; it should scale with the pool until the database or
+the thread count becomes the limit.
+
+    cd backend
+    python -m loadtest.pool_bench --threads 40 --sizes 1,5,10,20 --seconds 10
+"""
+
+import argparse
+import threading
+import time
+
+from sqlalchemy import text
+
+from app.db.pool import pool_stats
+from app.db.session import PoolProfile, make_engine
+
+
+def run(pool_size: int, threads: int, seconds: float, hold_ms: float) -> dict:
+    engine = make_engine(PoolProfile(pool_size=pool_size, max_overflow=0, pool_timeout=60))
+    pool_stats.reset()
+    stop_at = time.perf_counter() + seconds
+    done = [0] * threads
+    query = text("SELECT pg_sleep(:s)")
+
+    def worker(n: int) -> None:
+        while time.perf_counter() < stop_at:
+            with engine.connect() as conn:
+                conn.execute(query, {"s": hold_ms / 1000})
+            done[n] += 1
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    stats = pool_stats.snapshot()
+    return {
+        "pool_size": pool_size,
+        "requests": sum(done),
+        "rps": sum(done) / elapsed,
+        "wait_avg_ms": stats["wait_seconds_avg"] * 1000,
+        "wait_max_ms": stats["wait_seconds_max"] * 1000,
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m loadtest.pool_bench")
+    parser.add_argument("--threads", type=int, default=40)
+    parser.add_argument("--sizes", default="1,5,10,20")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--hold-ms", type=float, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'pool':>5} {'requests':>9} {'req/s':>9} {'wait avg ms':>12} {'wait max ms':>12}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        r = run(size, args.threads, args.seconds, args.hold_ms)
+        print(
+            f"{r['pool_size']:>5} {r['requests']:>9} {r['rps']:>9.1f} "
+            f"{r['wait_avg_ms']:>12.2f} {r['wait_max_ms']:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
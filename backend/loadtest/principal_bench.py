@@ -0,0 +1,153 @@
+"""Requests/sec on GET /api/services/ with and without the principal cache.
+
+Calls the ASGI app in-process (no HTTP server, so the numbers are the app
+and the database) from --concurrency tasks for --seconds per mode:
+
+- lookup: the dependency as it was before the cache, loading the user and
+  then its shop (two queries before the route's own);
+- uncached: get_current_user with the principal cache disabled (one
+  users JOIN shops query);
+- cached: get_current_user as deployed (no query once warm).
+
+Each mode reports req/s, p50/p99 latency and queries per request (read from
+the Server-Timing header). Run against a seeded database:
+
+    cd backend
+    python -m loadtest.principal_bench --concurrency 10 --seconds 10
+"""
+
+import argparse
+import asyncio
+import re
+import statistics
+import time
+import uuid
+
+from fastapi import Cookie, Depends
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.api.deps import Principal, get_current_user
+from app.core.security import create_access_token, decode_access_token
+from app.db.session import AsyncSessionLocal, get_async_db
+from app.main import app
+from app.models.shop import Shop
+from app.models.user import User
+
+
+PATH = "/api/services/"
+QUERIES = re.compile(rb'desc="(\d+) queries"')
+
+
+async def lookup_principal(
+    db: AsyncSession = Depends(get_async_db),
+    access_token: str | None = Cookie(default=None),
+) -> Principal:
+    # get_current_user before the principal cache: the user, then its shop.
+    user = await db.get(User, uuid.UUID(decode_access_token(access_token)["sub"]))
+    shop = await db.scalar(select(Shop).where(Shop.user_id == user.id))
+    return Principal(id=user.id, shop_id=shop.id)
+
+
+async def _get(path: str, cookie: bytes) -> tuple[int, int]:
+    """(status, queries) for one GET through the whole middleware stack."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"cookie", cookie)],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    result = {"status": 0, "queries": 0}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+            for name, value in message.get("headers", []):
+                match = QUERIES.search(value) if name == b"server-timing" else None
+                if match:
+                    result["queries"] = int(match[1])
+
+    await app(scope, receive, send)
+    return result["status"], result["queries"]
+
+
+async def run_mode(mode: str, cookie: bytes, concurrency: int, seconds: float) -> dict:
+    app.dependency_overrides.clear()
+    deps._principal_cache.clear()
+    deps._principal_cache.maxsize = deps.settings.principal_cache_size
+    if mode == "lookup":
+        app.dependency_overrides[get_current_user] = lookup_principal
+    elif mode == "uncached":
+        deps._principal_cache.maxsize = 0
+
+    await _get(PATH, cookie)  # warm: route import, pool, cache
+    latencies: list[float] = []
+    queries: list[int] = []
+    errors = 0
+    stop_at = time.perf_counter() + seconds
+
+    async def worker() -> None:
+        nonlocal errors
+        while time.perf_counter() < stop_at:
+            t0 = time.perf_counter()
+            status, n = await _get(PATH, cookie)
+            latencies.append(time.perf_counter() - t0)
+            queries.append(n)
+            errors += status != 200
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "mode": mode,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000,
+        "queries": statistics.mean(queries),
+        "errors": errors,
+    }
+
+
+async def main_async(args) -> list[dict]:
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(text("SELECT user_id, id FROM shops ORDER BY created_at LIMIT 1"))).one_or_none()
+    if row is None:
+        raise SystemExit("no shop found; seed one with python -m loadtest.seed")
+    token, _ = create_access_token(subject=str(row.user_id), shop_id=str(row.id))
+    cookie = f"access_token={token}".encode()
+    try:
+        return [await run_mode(mode, cookie, args.concurrency, args.seconds) for mode in args.modes.split(",")]
+    finally:
+        app.dependency_overrides.clear()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m loadtest.principal_bench")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--modes", default="lookup,uncached,cached")
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'queries':>8} {'errors':>7}")
+    for r in asyncio.run(main_async(args)):
+        print(
+            f"{r['mode']:>9} {r['rps']:>8.0f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+            f"{r['queries']:>8.1f} {r['errors']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Statement counts for creating and loading an invoice, by number of items.
+
+Runs `create_invoice` and `get_invoice` under a `QueryStats` (the same
+counter the Server-Timing middleware uses) for bills of 1, 5 and 25 lines,
+and exits non-zero unless every size costs the same number of statements,
+loading costs exactly one, and nothing lazy-loads. Everything runs inside a
+transaction that is rolled back, so it can point at any migrated database
+with at least one shop.
+
+    cd backend
+    python -m loadtest.query_counts [--shop-id UUID]
+"""
+
+import argparse
+import asyncio
+import uuid
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import Principal
+from app.api.routes.invoices import create_invoice, get_invoice
+from app.db import query_stats
+from app.db.session import async_engine
+from app.models.service import Service
+from app.models.shop import Shop
+from app.schemas.invoice import InvoiceCreate
+
+
+SIZES = (1, 5, 25)
+LOAD_STATEMENTS = 1
+
+# Statements the savepoint harness adds, which a real request does not run.
+_harness = {"statements": 0}
+
+
+def _count_savepoints(conn, cursor, statement, parameters, context, executemany) -> None:
+    if statement.startswith(("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")):
+        _harness["statements"] += 1
+
+
+async def _counted(call) -> tuple[object, query_stats.QueryStats]:
+    stats, token = query_stats.start()
+    before = _harness["statements"]
+    try:
+        result = await call
+    finally:
+        query_stats.stop(token)
+    stats.statements -= _harness["statements"] - before
+    return result, stats
+
+
+async def measure(shop_id: uuid.UUID | None) -> dict[int, tuple[int, int, list[str]]]:
+    """{items: (create statements, load statements, lazy loads)}."""
+    event.listen(async_engine.sync_engine, "before_cursor_execute", _count_savepoints)
+    async with async_engine.connect() as conn:
+        await conn.begin()
+        # Route commits become savepoint releases inside the outer
+        # transaction, which is rolled back at the end.
+        db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+        shop = await db.scalar(select(Shop).where(Shop.id == shop_id) if shop_id else select(Shop).limit(1))
+        if shop is None:
+            raise SystemExit("no shop found; seed one with python -m loadtest.seed")
+        service_ids = list(await db.scalars(select(Service.id).where(Service.shop_id == shop.id)))
+        if not service_ids:
+            raise SystemExit(f"shop {shop.id} has no services")
+        user = Principal(id=shop.user_id, shop_id=shop.id)
+
+        counts = {}
+        for size in SIZES:
+            payload = InvoiceCreate(items=[{"service_id": service_ids[n % len(service_ids)]} for n in range(size)])
+            created, create_stats = await _counted(create_invoice(payload, db, user))
+            db.expunge_all()
+            _, load_stats = await _counted(get_invoice(created.id, db, user))
+            counts[size] = (
+                create_stats.statements,
+                load_stats.statements,
+                create_stats.lazy_loads + load_stats.lazy_loads,
+            )
+        await db.close()
+        await conn.rollback()
+    await async_engine.dispose()
+    return counts
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m loadtest.query_counts")
+    parser.add_argument("--shop-id", type=uuid.UUID, default=None)
+    args = parser.parse_args(argv)
+
+    counts = asyncio.run(measure(args.shop_id))
+    print(f"{'items':>6}  {'create':>6}  {'load':>6}")
+    for size, (create, load, _) in counts.items():
+        print(f"{size:>6}  {create:>6}  {load:>6}")
+
+    failures = []
+    if len({create for create, _, _ in counts.values()}) > 1:
+        failures.append("creating an invoice costs more statements as it gets more items")
+    if any(load != LOAD_STATEMENTS for _, load, _ in counts.values()):
+        failures.append(f"loading an invoice should take {LOAD_STATEMENTS} statement")
+    lazy = sorted({name for _, _, names in counts.values() for name in names})
+    if lazy:
+        failures.append(f"lazy loads: {', '.join(lazy)}")
+    if failures:
+        print("\n" + "\n".join(failures))
+        raise SystemExit(1)
+    print("\nstatement counts are constant")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Report day and hour bucketing in a DST-free and a DST zone.
+
+For Asia/Kolkata (no DST) and America/New_York (DST), bills a throwaway
+shop through `create_invoice` at instants either side of local midnight and
+of both DST changes, then checks that:
+
+- Postgres and Python's zoneinfo (the pinned tzdata) put every instant at
+  the same local time, since rollups bucket with the former and schemas and
+  reports with the latter;
+- /api/reports/summary has the bills on the local days zoneinfo gives, and
+  names the shop's zone (read from `shops`, not the principal);
+- /api/reports/heatmap has them on the local weekday and hour;
+- /api/reports/services counts exactly the lines inside a range that starts
+  and ends mid-day (partial days from line items, whole days from rollups).
+
+Exits non-zero on any difference. Everything runs inside a transaction that
+is rolled back, so it can point at any migrated database.
+
+    cd backend
+    python -m loadtest.report_zone_check
+"""
+
+import argparse
+import asyncio
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import Principal
+from app.api.routes.invoices import create_invoice
+from app.api.routes.reports import sales_heatmap, sales_summary, service_performance
+from app.core.config import settings
+from app.db.session import async_engine
+from app.models.service import Service
+from app.models.shop import Shop
+from app.models.user import User
+from app.schemas.invoice import InvoiceCreate
+
+
+def _utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+PRICE_PAISE = 15000
+
+ZONES = {
+    # 23:59 and 00:00 IST, then mid-morning the next day.
+    "Asia/Kolkata": (_utc(2025, 11, 2, 18, 29), _utc(2025, 11, 2, 18, 30), _utc(2025, 11, 3, 5, 30)),
+    "America/New_York": (
+        # Spring forward, 2025-03-09: 01:59 EST, then 03:00 EDT.
+        _utc(2025, 3, 9, 6, 59), _utc(2025, 3, 9, 7, 0),
+        # Fall back, 2025-11-02: 23:59 and 00:00 EDT, then 01:30 twice.
+        _utc(2025, 11, 2, 3, 59), _utc(2025, 11, 2, 4, 0), _utc(2025, 11, 2, 5, 30), _utc(2025, 11, 2, 6, 30),
+    ),
+}
+
+
+async def _check_zone(db: AsyncSession, zone: str, instants: tuple[datetime, ...]) -> list[str]:
+    failures = []
+    tz = ZoneInfo(zone)
+    local = [at.astimezone(tz) for at in instants]
+
+    for at, expected in zip(instants, local):
+        got = await db.scalar(text("SELECT CAST(:at AS timestamptz) AT TIME ZONE :zone"), {"at": at, "zone": zone})
+        if got != expected.replace(tzinfo=None):
+            failures.append(f"{zone}: Postgres puts {at.isoformat()} at {got}, zoneinfo at {expected}")
+
+    user = User(email=f"report-zone-check-{uuid.uuid4().hex}@example.com", password_hash="-")
+    db.add(user)
+    await db.flush()
+    shop = Shop(user_id=user.id, name="Report zone check", pan=uuid.uuid4().hex[:20], timezone=zone)
+    db.add(shop)
+    await db.flush()
+    service = Service(shop_id=shop.id, name="Cut", price_paise=PRICE_PAISE)
+    db.add(service)
+    await db.commit()
+    principal = Principal(id=user.id, shop_id=shop.id)
+    for at in instants:
+        await create_invoice(InvoiceCreate(issued_at=at, items=[{"service_id": service.id}]), db, principal)
+
+    first, last = min(at.date() for at in local), max(at.date() for at in local)
+    start, end = first, last + timedelta(days=1)
+
+    expected_days = Counter(at.date() for at in local)
+    summary = await sales_summary(start, end, db, principal)
+    got_days = Counter({row.day: row.bill_count for row in summary.days if row.bill_count})
+    if got_days != expected_days:
+        failures.append(f"{zone}: summary bills per day {dict(got_days)} != zoneinfo {dict(expected_days)}")
+    if summary.timezone != zone:
+        failures.append(f"{zone}: summary reports zone {summary.timezone}")
+    if summary.net_paise != PRICE_PAISE * len(instants):
+        failures.append(f"{zone}: summary net {summary.net_paise} != {PRICE_PAISE * len(instants)}")
+
+    expected_cells = Counter((at.weekday(), at.hour) for at in local)
+    heatmap = await sales_heatmap(start, end, db, principal)
+    got_cells = Counter(
+        {(wd, hour): n for wd, hours in enumerate(heatmap.bill_count) for hour, n in enumerate(hours) if n}
+    )
+    if got_cells != expected_cells:
+        failures.append(f"{zone}: heatmap bills per (weekday, hour) {dict(got_cells)} != zoneinfo {dict(expected_cells)}")
+
+    # Local noon before the first bill to one minute after the second to
+    # last: a partial day at either end and whole local days in between.
+    span_start = datetime.combine(first - timedelta(days=1), datetime.min.time(), tz).replace(hour=12)
+    span_end = instants[-2] + timedelta(minutes=1)
+    expected_qty = sum(span_start <= at < span_end for at in instants)
+    services = await service_performance(span_start, span_end, 10, db, principal)
+    if services.total_qty != expected_qty:
+        failures.append(f"{zone}: services report counts {services.total_qty} lines in range, expected {expected_qty}")
+
+    if not failures:
+        print(f"{zone}: {len(instants)} bills on {len(expected_days)} local days match zoneinfo")
+    return failures
+
+
+async def check() -> list[str]:
+    async with async_engine.connect() as conn:
+        await conn.begin()
+        # Route commits become savepoint releases inside the outer
+        # transaction, which is rolled back at the end.
+        db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+        failures: list[str] = []
+        for zone, instants in ZONES.items():
+            failures += await _check_zone(db, zone, instants)
+        await db.close()
+        await conn.rollback()
+    await async_engine.dispose()
+    return failures
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m loadtest.report_zone_check")
+    parser.parse_args(argv)
+
+    # The instants are fixed dates in 2025; let create_invoice accept them.
+    earliest = min(at for instants in ZONES.values() for at in instants)
+    settings.invoice_max_backdate_days = (datetime.now(timezone.utc) - earliest).days + 1
+    settings.invoice_retention_months = None
+
+    failures = asyncio.run(check())
+    if failures:
+        print("\n" + "\n".join(failures))
+        raise SystemExit(1)
+    print("\nreports bucket bills on the shop's local days and hours")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Rollups against a full scan of invoices, across zone boundaries.
+
+Bills one throwaway shop through `create_invoice` at instants around DST
+changes (America/New_York) and local midnight (Asia/Kolkata), switches the
+shop's zone the way PATCH /api/users/me/shop does (marking the rollups
+stale, then re-bucketing them a month per transaction), then bills again. After each step shop_daily_sales, shop_hourly_sales and
+service_daily_stats must equal a GROUP BY over invoices, and the hourly
+bill counts must match the local hours Python's zoneinfo gives each bill.
+Exits non-zero on any difference. Everything runs inside a transaction that
+is rolled back, so it can point at any migrated database.
+
+    cd backend
+    python -m loadtest.rollup_check
+"""
+
+import argparse
+import asyncio
+import uuid
+from collections import Counter
+from datetime import date, datetime, timezone
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import Principal
+from app.api.routes.invoices import create_invoice
+from app.core.config import settings
+from app.db.session import async_engine
+from app.models.service import Service
+from app.models.shop import Shop
+from app.models.user import User
+from app.rollups import rebuild_stale_zone
+from app.schemas.invoice import InvoiceCreate
+
+
+def _utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+# (zone the shop is in while billing, instants billed).
+STEPS = (
+    (
+        "America/New_York",
+        (
+            # Spring forward, 2025-03-09: 01:59 EST, then 03:00 EDT.
+            _utc(2025, 3, 9, 6, 59), _utc(2025, 3, 9, 7, 0),
+            # Fall back, 2025-11-02: 23:59 and 00:00 EDT, then 01:30 twice.
+            _utc(2025, 11, 2, 3, 59), _utc(2025, 11, 2, 4, 0), _utc(2025, 11, 2, 5, 30), _utc(2025, 11, 2, 6, 30),
+            # 18:29 / 18:30 UTC: either side of midnight in Kolkata.
+            _utc(2025, 11, 2, 18, 29), _utc(2025, 11, 2, 18, 30),
+        ),
+    ),
+    (
+        "Asia/Kolkata",
+        (_utc(2025, 11, 3, 18, 29), _utc(2025, 11, 3, 18, 30), _utc(2025, 11, 2, 5, 30)),
+    ),
+)
+
+SCANS = {
+    "shop_daily_sales": (
+        """
+        SELECT (i.issued_at AT TIME ZONE s.timezone)::date, sum(i.subtotal_paise), sum(i.discount_paise),
+               sum(i.total_paise), count(*),
+               coalesce(sum(i.total_paise) FILTER (WHERE i.payment_method = 'cash'), 0),
+               coalesce(sum(i.total_paise) FILTER (WHERE i.payment_method = 'upi'), 0)
+        FROM invoices i JOIN shops s ON s.id = i.shop_id
+        WHERE i.shop_id = :shop GROUP BY 1
+        """,
+        """
+        SELECT day, gross_paise, discount_paise, net_paise, bill_count, cash_net_paise, upi_net_paise
+        FROM shop_daily_sales WHERE shop_id = :shop
+        """,
+    ),
+    "shop_hourly_sales": (
+        """
+        SELECT (i.issued_at AT TIME ZONE s.timezone)::date,
+               extract(hour FROM i.issued_at AT TIME ZONE s.timezone), sum(i.total_paise), count(*)
+        FROM invoices i JOIN shops s ON s.id = i.shop_id
+        WHERE i.shop_id = :shop GROUP BY 1, 2
+        """,
+        "SELECT day, hour, net_paise, bill_count FROM shop_hourly_sales WHERE shop_id = :shop",
+    ),
+    "service_daily_stats": (
+        """
+        SELECT (i.issued_at AT TIME ZONE s.timezone)::date, it.service_id, sum(it.qty), sum(it.total_paise),
+               count(DISTINCT it.invoice_id)
+        FROM invoice_items it
+        JOIN invoices i ON i.id = it.invoice_id AND i.issued_at = it.issued_at
+        JOIN shops s ON s.id = i.shop_id
+        WHERE i.shop_id = :shop AND it.service_id IS NOT NULL GROUP BY 1, 2
+        """,
+        "SELECT day, service_id, qty, revenue_paise, invoice_count FROM service_daily_stats WHERE shop_id = :shop",
+    ),
+}
+
+
+def _local_hours(instants: list[datetime], zone: str) -> Counter:
+    """Bills per (local day, hour): two per instant."""
+    local = Counter()
+    for instant in instants:
+        at = instant.astimezone(ZoneInfo(zone))
+        local[(at.date(), at.hour)] += 2
+    return local
+
+
+def _normalise(rows) -> set[tuple]:
+    return {tuple(v if isinstance(v, (date, uuid.UUID)) else int(v) for v in row) for row in rows}
+
+
+async def _compare(db: AsyncSession, shop_id: uuid.UUID, expected_hours: Counter, label: str) -> list[str]:
+    failures = []
+    for table, (scan, rollup) in SCANS.items():
+        want = _normalise(await db.execute(text(scan), {"shop": shop_id}))
+        got = _normalise(await db.execute(text(rollup), {"shop": shop_id}))
+        if want != got:
+            failures.append(f"{label}: {table} differs from the scan: missing {sorted(want - got)}, extra {sorted(got - want)}")
+        else:
+            print(f"{label}: {table} matches ({len(got)} rows)")
+    hours = Counter(
+        {
+            (day, int(hour)): int(count)
+            for day, hour, _, count in await db.execute(text(SCANS["shop_hourly_sales"][1]), {"shop": shop_id})
+        }
+    )
+    if hours != expected_hours:
+        failures.append(f"{label}: hourly bill counts {dict(hours)} != zoneinfo {dict(expected_hours)}")
+    return failures
+
+
+async def check() -> list[str]:
+    async with async_engine.connect() as conn:
+        await conn.begin()
+        # Route commits become savepoint releases inside the outer
+        # transaction, which is rolled back at the end.
+        db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+        user = User(email=f"rollup-check-{uuid.uuid4().hex}@example.com", password_hash="-")
+        db.add(user)
+        await db.flush()
+        shop = Shop(user_id=user.id, name="Rollup check", pan=uuid.uuid4().hex[:20], timezone=STEPS[0][0])
+        db.add(shop)
+        await db.flush()
+        services = [
+            Service(shop_id=shop.id, name="Cut", price_paise=15000),
+            Service(shop_id=shop.id, name="Beard", price_paise=8000),
+        ]
+        db.add_all(services)
+        await db.commit()
+
+        failures: list[str] = []
+        instants: list[datetime] = []
+        for zone, step_instants in STEPS:
+            if zone != shop.timezone:
+                # What PATCH /api/users/me/shop does on a zone change.
+                shop.timezone = zone
+                shop.rollups_stale_since = datetime.now(timezone.utc)
+                await db.commit()
+                await db.run_sync(rebuild_stale_zone, shop.id)
+                if await db.scalar(select(Shop.rollups_stale_since).where(Shop.id == shop.id)) is not None:
+                    failures.append(f"rebuild in {zone} left the shop's rollups marked stale")
+                failures += await _compare(db, shop.id, _local_hours(instants, zone), f"rebuilt in {zone}")
+
+            principal = Principal(id=user.id, shop_id=shop.id)
+            for n, instant in enumerate(step_instants):
+                # A cash bill with one line and a discounted UPI bill with two.
+                await create_invoice(
+                    InvoiceCreate(issued_at=instant, items=[{"service_id": services[0].id}]), db, principal
+                )
+                await create_invoice(
+                    InvoiceCreate(
+                        issued_at=instant,
+                        items=[{"service_id": services[0].id, "qty": 2}, {"service_id": services[1].id}],
+                        discount_paise=1000 * (n + 1),
+                        payment_method="UPI",
+                    ),
+                    db,
+                    principal,
+                )
+            instants += step_instants
+            failures += await _compare(db, shop.id, _local_hours(instants, zone), f"billed in {zone}")
+
+        await db.close()
+        await conn.rollback()
+    await async_engine.dispose()
+    return failures
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m loadtest.rollup_check")
+    parser.parse_args(argv)
+
+    # The instants are fixed dates in 2025; let create_invoice accept them.
+    settings.invoice_max_backdate_days = (datetime.now(timezone.utc) - STEPS[0][1][0]).days + 1
+    settings.invoice_retention_months = None
+
+    failures = asyncio.run(check())
+    if failures:
+        print("\n" + "\n".join(failures))
+        raise SystemExit(1)
+    print("\nrollups match the scan")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Customer search on a 100k-customer shop: ILIKE scan against pg_trgm.
+
+Inserts a throwaway shop with --customers customers (names from the seed's
+name lists, phones 9000000000 upwards), then runs each search term --runs
+times three ways:
+
+- before: the search as it was before the trigram indexes, a
+  `name ILIKE '%term%'` COUNT plus first page with
+  ix_customers_name_trgm and ix_customers_phone_digits_trgm dropped;
+- recent: `list_customers` as deployed (name or phone digits, newest first);
+- relevance: `list_customers` with sort=relevance (adds fuzzy name matches).
+
+Reports p50/p99 latency and matches per term. Everything runs inside a
+transaction that is rolled back, indexes included, but dropping them holds
+a lock on customers until then, so point it at a load-test database that
+is migrated to head (which needs the pg_trgm extension).
+
+    cd backend
+    python -m loadtest.search_bench --customers 100000 --runs 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import Principal
+from app.api.routes.customers import list_customers
+from app.db.session import async_engine
+from app.models.customer import Customer
+from app.models.shop import Shop
+from app.models.user import User
+from loadtest.seed import FIRST_NAMES, LAST_NAMES
+
+
+# A common surname, a full name, a misspelling and a phone fragment.
+TERMS = ("sharma", "priya nair", "kapor", "0004321")
+PAGE = 20
+TRGM_INDEXES = ("ix_customers_name_trgm", "ix_customers_phone_digits_trgm")
+
+
+async def _timed(runs: int, call) -> tuple[list[float], int]:
+    latencies, matches = [], 0
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        matches = await call()
+        latencies.append(time.perf_counter() - t0)
+    latencies.sort()
+    return latencies, matches
+
+
+async def _before(db: AsyncSession, shop_id: uuid.UUID, term: str) -> int:
+    # list_customers before the trigram indexes: name only, unescaped.
+    query = select(Customer).where(Customer.shop_id == shop_id, Customer.name.ilike(f"%{term}%"))
+    total = await db.scalar(query.with_only_columns(func.count()))
+    await db.scalars(query.order_by(Customer.created_at.desc(), Customer.id.desc()).limit(PAGE + 1))
+    return total
+
+
+async def _deployed(db: AsyncSession, principal: Principal, term: str, sort: str) -> int:
+    result = await list_customers(
+        q=term, name=None, page=1, limit=PAGE, paginate=False, cursor=None, include_total=None,
+        sort=sort, db=db, user=principal,
+    )
+    return result.total
+
+
+async def main_async(args) -> list[dict]:
+    async with async_engine.connect() as conn:
+        missing = [
+            name for name in TRGM_INDEXES if await conn.scalar(text("SELECT to_regclass(:name)"), {"name": name}) is None
+        ]
+        if missing:
+            raise SystemExit(f"missing {', '.join(missing)}; run alembic upgrade head (needs pg_trgm)")
+        await conn.rollback()
+
+        await conn.begin()
+        db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+        user = User(email=f"search-bench-{uuid.uuid4().hex}@example.com", password_hash="-")
+        db.add(user)
+        await db.flush()
+        shop = Shop(user_id=user.id, name="Search bench", pan=uuid.uuid4().hex[:20])
+        db.add(shop)
+        await db.flush()
+        await db.execute(
+            text(
+                """
+                INSERT INTO customers (id, shop_id, name, phone, marketing_consent, whatsapp_opt_in, created_at, updated_at)
+                SELECT gen_random_uuid(), :shop, first[1 + i % cardinality(first)] || ' '
+                       || last[1 + (i / cardinality(first)) % cardinality(last)],
+                       '9' || lpad(i::text, 9, '0'), true, true,
+                       now() - i * interval '1 minute', now() - i * interval '1 minute'
+                FROM generate_series(1, :n) AS i, CAST(:first AS text[]) AS first, CAST(:last AS text[]) AS last
+                """
+            ),
+            {"shop": shop.id, "first": FIRST_NAMES, "last": LAST_NAMES, "n": args.customers},
+        )
+        await db.execute(text("ANALYZE customers"))
+        principal = Principal(id=user.id, shop_id=shop.id)
+
+        results = []
+        for term in TERMS:
+            row = {"term": term}
+            for mode in ("recent", "relevance"):
+                await _deployed(db, principal, term, mode)  # warm up
+                row[mode] = await _timed(args.runs, lambda: _deployed(db, principal, term, mode))
+            results.append(row)
+
+        for name in TRGM_INDEXES:
+            await db.execute(text(f"DROP INDEX {name}"))
+        for row in results:
+            await _before(db, shop.id, row["term"])
+            row["before"] = await _timed(args.runs, lambda: _before(db, shop.id, row["term"]))
+
+        await db.close()
+        await conn.rollback()
+    await async_engine.dispose()
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m loadtest.search_bench")
+    parser.add_argument("--customers", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(main_async(args))
+    print(f"{'term':>12} {'mode':>10} {'matches':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for row in results:
+        for mode in ("before", "recent", "relevance"):
+            latencies, matches = row[mode]
+            p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+            print(
+                f"{row['term']:>12} {mode:>10} {matches:>8} "
+                f"{statistics.median(latencies) * 1000:>8.2f} {p99 * 1000:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
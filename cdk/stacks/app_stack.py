@@ -9,6 +9,8 @@ from aws_cdk import (
     aws_cloudfront as cloudfront,
     aws_cloudfront_origins as origins,
     aws_ec2 as ec2,
+    aws_events as events,
+    aws_events_targets as events_targets,
     aws_lambda as _lambda,
     aws_s3 as s3,
     aws_s3_deployment as s3_deployment,
@@ -66,12 +68,26 @@ class AppStack(cdk.Stack):
             description="Allow Lambda SG to reach Aurora (5432)",
         )
 
+        metrics_token_secret = secretsmanager.Secret(
+            self,
+            "MetricsTokenSecret",
+            description="Bearer token for the Barber API's /metrics and /health/pool",
+            generate_secret_string=secretsmanager.SecretStringGenerator(
+                exclude_punctuation=True,
+                password_length=40,
+            ),
+        )
+
         lambda_env = {
             # These resolve as CloudFormation dynamic references, not plaintext.
             "DATABASE_URL": app_secret.secret_value_from_json("database_url").to_string(),
             "JWT_SECRET": app_secret.secret_value_from_json("jwt_secret").to_string(),
             "CORS_ORIGINS": app_secret.secret_value_from_json("cors_origins").to_string(),
             "ENVIRONMENT": app_secret.secret_value_from_json("environment").to_string(),
+            # Bearer token for /metrics and /health/pool, which are off
+            # without one. Its own generated secret, so deploying never
+            # rewrites the hand-edited values in app_secret.
+            "METRICS_TOKEN": metrics_token_secret.secret_value.to_string(),
         }
 
         # Bundle backend + dependencies into a single Lambda zip.
@@ -150,12 +166,50 @@ class AppStack(cdk.Stack):
             environment=lambda_env,
         )
 
-        app_secret.grant_read(api_function)
-        app_secret.grant_read(migration_function)
-        if db_cluster.secret is not None:
-            db_cluster.secret.grant_read(api_function)
-            db_cluster.secret.grant_read(migration_function)
+        # Database upkeep, run from the API bundle. Times are UTC; 22:00 is
+        # 03:30 IST, after the shops have closed.
+        scheduled_functions = []
+        for name, handler, schedule, concurrency in (
+            # Deletes expired refresh-token sessions.
+            ("SessionPurge", "app.auth_sessions.handler", events.Schedule.cron(minute="0", hour="22"), None),
+            # Creates upcoming monthly invoice partitions, detaches old ones.
+            ("PartitionMaintenance", "app.partitions.handler", events.Schedule.cron(minute="15", hour="22"), None),
+            # Re-buckets the rollups of shops whose timezone changed; the API
+            # cannot, as a Lambda does nothing once its response is returned.
+            # One at a time, so runs never redo each other's shops.
+            ("RollupRebuild", "app.rollups.rebuild_stale_handler", events.Schedule.rate(Duration.minutes(1)), 1),
+        ):
+            function = _lambda.Function(
+                self,
+                f"{name}Function",
+                runtime=_lambda.Runtime.PYTHON_3_12,
+                handler=handler,
+                code=api_code,
+                architecture=_lambda.Architecture.ARM_64,
+                memory_size=512,
+                timeout=Duration.minutes(5),
+                reserved_concurrent_executions=concurrency,
+                vpc=vpc,
+                security_groups=[lambda_sg],
+                environment=lambda_env,
+            )
+            events.Rule(
+                self,
+                f"{name}Schedule",
+                schedule=schedule,
+                targets=[events_targets.LambdaFunction(function)],
+            )
+            scheduled_functions.append(function)
+
+        for function in (api_function, migration_function, *scheduled_functions):
+            app_secret.grant_read(function)
+            if db_cluster.secret is not None:
+                db_cluster.secret.grant_read(function)
 
+        # The API is served straight from API Gateway, not through the
+        # CloudFront distribution below: its responses are per shop (cookie
+        # auth) and sent as `Cache-Control: private, no-cache` with ETags, so
+        # only the browser caches them and revalidates with If-None-Match.
         http_api = apigwv2.HttpApi(
             self,
             "HttpApi",